@@ -3,12 +3,31 @@
 import asyncio
 import streamlit as st
 from pipelex.pipelex import Pipelex
-from pipelex.pipeline.execute import execute_pipeline
 from social_content.social_content_struct import (
     CompanyInput,
-    SocialMediaContent,
     MarketResearch,
 )
+from social_content.image_derivation import CropFormat
+from social_content.prompt_index import get_prompt_index
+from social_content.http_pool import get_connection_stats
+from social_content.media_download import get_download_stats
+from social_content.media_backend import IMAGE_MODEL
+from social_content.media_scheduler import (
+    INSTAGRAM_VOICEOVERS_JOB,
+    PLATFORM_IMAGES_JOB,
+    MediaJobName,
+    MediaResult,
+    PlatformImages,
+    stream_social_content_with_media,
+)
+from social_content.rate_limiter import get_rate_limiter
+from social_content.research_cache import get_research_cache
+from social_content.runner import (
+    PLATFORM_RESULT_NAMES,
+    StreamedResultName,
+    assemble_streamed_results,
+)
+from social_content.ui_render import render_post_preview, render_research
 
 import os
 os.environ["REPLICATE_API_TOKEN"]=""
@@ -101,9 +120,11 @@ with st.sidebar:
     
     st.subheader("Optional Features")
     generate_audio = st.checkbox("🎵 Generate Audio for Instagram", help="Generate voiceover for Instagram posts (experimental)")
+    refresh_research = st.checkbox("🔄 Refresh competitor research", help="Redo the research even if a recent one is cached")
     
     generate_button = st.button("🎨 Generate Content", type="primary", use_container_width=True)
 
+
 # Main content area
 if generate_button:
     if not company_name or not topic:
@@ -119,10 +140,6 @@ if generate_button:
         
         research_container = st.container()
         
-        # Step 2: Generate content
-        status_text.markdown('<div class="step-header">✍️ Generating Content...</div>', unsafe_allow_html=True)
-        progress_bar.progress(40)
-        
         try:
             # Create input
             company_input = CompanyInput(
@@ -131,144 +148,80 @@ if generate_button:
                 brand_voice=brand_voice
             )
             
-            # Execute pipeline
-            async def run_pipeline():
-                return await execute_pipeline(
-                    pipe_code="generate_social_content",
-                    inputs={
-                        "company_input": {
-                            "concept": "social_content.CompanyInput",
-                            "content": company_input,
-                        }
-                    },
-                )
-            
-            pipe_output = asyncio.run(run_pipeline())
-            progress_bar.progress(60)
-            
-            # Extract results
-            working_memory = pipe_output.working_memory
-            
-            # Get research data
-            research_stuff = working_memory.get_stuff("research")
-            research: MarketResearch = research_stuff.content
-            
-            # Get individual content pieces directly from working memory
-            instagram_stuff = working_memory.get_stuff("instagram_posts")
-            twitter_stuff = working_memory.get_stuff("twitter")
-            linkedin_stuff = working_memory.get_stuff("linkedin_posts")
-            
-            # Extract lists properly from ListContent
-            from pipelex.core.stuffs.list_content import ListContent
+            # Tabs are laid out up front and each one fills in as soon as its branch lands
+            st.markdown("---")
+            st.markdown("## 📱 Generated Content")
             
-            # Handle ListContent properly
-            if isinstance(instagram_stuff.content, ListContent):
-                instagram_posts = instagram_stuff.content.items
-            else:
-                instagram_posts = [instagram_stuff.content]
+            tab1, tab2, tab3 = st.tabs(["📸 Instagram", "🐦 Twitter", "💼 LinkedIn"])
+            tab_placeholders = {}
+            for tab, result_name in zip((tab1, tab2, tab3), PLATFORM_RESULT_NAMES):
+                with tab:
+                    tab_placeholders[result_name] = st.empty()
+                    tab_placeholders[result_name].info("⏳ Writing posts...")
             
-            if isinstance(linkedin_stuff.content, ListContent):
-                linkedin_posts = linkedin_stuff.content.items
-            else:
-                linkedin_posts = [linkedin_stuff.content]
+            # Stream results as they land (cached research skips straight to the platform step),
+            # media jobs start as soon as the posts they need are written
+            media_jobs = [PLATFORM_IMAGES_JOB, INSTAGRAM_VOICEOVERS_JOB] if generate_audio else [PLATFORM_IMAGES_JOB]
             
-            # Convert Pydantic models to dicts for proper validation
-            result = SocialMediaContent(
-                instagram=[post.model_dump() for post in instagram_posts],
-                twitter=twitter_stuff.content.model_dump(),
-                linkedin=[post.model_dump() for post in linkedin_posts]
-            )
-            
-            # Display research results
-            progress_bar.progress(65)
+            async def stream_results():
+                streamed_results = {}
+                media_results = {}
+                async for streamed in stream_social_content_with_media(company_input, force_refresh=refresh_research, jobs=media_jobs):
+                    if isinstance(streamed, MediaResult):
+                        media_results[streamed.name] = streamed
+                        progress_bar.progress(min(90, 20 + 10 * (len(streamed_results) + len(media_results))))
+                        continue
+                    streamed_results[streamed.name] = streamed.content
+                    progress_bar.progress(min(90, 20 + 10 * (len(streamed_results) + len(media_results))))
+                    if streamed.name == StreamedResultName.RESEARCH:
+                        with research_container:
+                            render_research(streamed.content, from_cache=streamed.from_cache, digest=streamed.digest)
+                        # Step 2: Generate content
+                        status_text.markdown('<div class="step-header">✍️ Generating Content...</div>', unsafe_allow_html=True)
+                    else:
+                        with tab_placeholders[streamed.name].container():
+                            render_post_preview(streamed.name, streamed.content)
+                # Packaged by the same combine_content pipe as the one-shot pipeline
+                return streamed_results, media_results, await assemble_streamed_results(streamed_results)
             
-            with research_container:
-                st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                st.markdown("### 🎯 Competitor Research Complete!")
-                st.markdown(f"**Analyzed {len(research.insights)} top competitors in your industry**")
-                st.markdown('</div>', unsafe_allow_html=True)
-                
-                # Show competitors
-                st.markdown("#### 📊 Competitors Analyzed:")
-                cols = st.columns(min(3, len(research.insights)))
-                for idx, insight in enumerate(research.insights):
-                    with cols[idx % 3]:
-                        st.markdown(f"""
-                        <div class="competitor-card">
-                            <strong>{insight.competitor_name}</strong><br>
-                            <small><em>{insight.content_style[:80]}...</em></small>
-                        </div>
-                        """, unsafe_allow_html=True)
-                
-                # Key trends
-                with st.expander("🔑 Key Trends & Recommendations", expanded=False):
-                    st.markdown(f"**Key Trends:**\n{research.key_trends}")
-                    st.markdown(f"**Recommendations:**\n{research.recommendations}")
+            nb_reuses_before = len(get_prompt_index().reuses)
+            streamed_results, media_results, result = asyncio.run(stream_results())
+            research: MarketResearch = streamed_results[StreamedResultName.RESEARCH]
+            voiceovers_result = media_results.get(MediaJobName.INSTAGRAM_VOICEOVERS)
+            st.session_state['instagram_voiceovers'] = voiceovers_result.content if voiceovers_result and voiceovers_result.content else []
             
             # Generate images using Replicate
-            status_text.markdown('<div class="step-header">🎨 Generating AI Images...</div>', unsafe_allow_html=True)
-            progress_bar.progress(70)
+            status_text.markdown('<div class="step-header">🎨 Preparing AI Images...</div>', unsafe_allow_html=True)
+            progress_bar.progress(95)
             
             # Initialize session state for images
             st.session_state['instagram_images'] = []
             st.session_state['linkedin_images'] = []
+            st.session_state['twitter_images'] = []
             st.session_state['image_error'] = None
             
             try:
-                import replicate
-                
-                # Generate Instagram images (first 2 variations only)
-                instagram_images = []
-                for idx in range(min(2, len(result.instagram))):
-                    post = result.instagram[idx]
-                    if post.image_prompt and post.image_prompt.strip() and post.image_prompt.lower() != 'none':
-                        try:
-                            output = replicate.run(
-                                "bytedance/seedream-4",
-                                input={
-                                    "size": "2K",
-                                    "width": 1024,
-                                    "height": 1024,
-                                    "prompt": post.image_prompt,
-                                    "max_images": 1,
-                                    "aspect_ratio": "1:1",
-                                    "enhance_prompt": True,
-                                }
-                            )
-                            if output and len(output) > 0:
-                                image_url = output[0].url if hasattr(output[0], 'url') else str(output[0])
-                                instagram_images.append(ImageContent(url=image_url))
-                        except Exception as e:
-                            st.warning(f"Image {idx+1} generation failed: {str(e)}")
-                
-                st.session_state['instagram_images'] = instagram_images
-                progress_bar.progress(85)
+                # Rendered while the other posts were written: one master per concept, cropped locally per platform
+                images_result = media_results[MediaJobName.PLATFORM_IMAGES]
+                if images_result.error is not None:
+                    raise RuntimeError(images_result.error)
+                platform_images: PlatformImages = images_result.content
+                for platform_label, concepts in (("Instagram", platform_images.instagram), ("LinkedIn", platform_images.linkedin)):
+                    for idx, crops in enumerate(concepts, 1):
+                        if crops is None:
+                            st.warning(f"{platform_label} image {idx} generation failed")
+                for reuse in get_prompt_index().reuses[nb_reuses_before:]:
+                    st.info(f"♻️ Reused an earlier render of a {reuse.similarity:.0%} similar prompt: {reuse.matched_prompt[:80]}")
+                st.caption(
+                    f"🖼️ {platform_images.nb_master_renders} master renders, "
+                    f"{platform_images.nb_derived_crops} platform crops derived locally"
+                )
                 
-                # Generate LinkedIn images (first variation only)
-                linkedin_images = []
-                if len(result.linkedin) > 0:
-                    post = result.linkedin[0]
-                    if post.image_prompt and post.image_prompt.strip():
-                        try:
-                            output = replicate.run(
-                                "bytedance/seedream-4",
-                                input={
-                                    "size": "2K",
-                                    "width": 1024,
-                                    "height": 576,
-                                    "prompt": post.image_prompt,
-                                    "max_images": 1,
-                                    "aspect_ratio": "16:9",
-                                    "enhance_prompt": True,
-                                }
-                            )
-                            if output and len(output) > 0:
-                                image_url = output[0].url if hasattr(output[0], 'url') else str(output[0])
-                                linkedin_images.append(ImageContent(url=image_url))
-                        except Exception as e:
-                            st.warning(f"LinkedIn image generation failed: {str(e)}")
+                st.session_state['instagram_images'] = [crops[CropFormat.SQUARE] for crops in platform_images.instagram if crops is not None]
                 
-                st.session_state['linkedin_images'] = linkedin_images
+                # LinkedIn shows its own concept, or a cut of a near-identical Instagram one; Twitter reuses the first concept
+                st.session_state['linkedin_images'] = [crops[CropFormat.LANDSCAPE] for crops in platform_images.linkedin if crops is not None]
+                st.session_state['twitter_images'] = [platform_images.twitter] if platform_images.twitter is not None else []
                 
             except Exception as e:
                 st.session_state['image_error'] = str(e)
@@ -277,14 +230,10 @@ if generate_button:
             progress_bar.progress(100)
             status_text.markdown('<div class="step-header">✅ Complete!</div>', unsafe_allow_html=True)
             
-            # Display results in tabs
-            st.markdown("---")
-            st.markdown("## 📱 Generated Content")
-            
-            tab1, tab2, tab3 = st.tabs(["📸 Instagram", "🐦 Twitter", "💼 LinkedIn"])
+            # Replace the previews with the full posts and their images
             
             # Instagram Tab
-            with tab1:
+            with tab_placeholders[StreamedResultName.INSTAGRAM_POSTS].container():
                 st.markdown("### Instagram Posts (3 Variations)")
                 
                 for idx, post in enumerate(result.instagram, 1):
@@ -337,21 +286,21 @@ if generate_button:
                                     st.success("Copied to clipboard!")
                             
                             with col_b:
-                                if generate_audio and post.image_prompt and post.image_prompt.lower() != "none":
-                                    if st.button(f"🎵 Generate Audio", key=f"audio_ig_{idx}"):
-                                        st.info("🎵 Audio generation coming soon! (Replicate integration)")
+                                instagram_voiceovers = st.session_state.get('instagram_voiceovers', [])
+                                if generate_audio and idx <= len(instagram_voiceovers) and instagram_voiceovers[idx-1] is not None:
+                                    st.audio(str(instagram_voiceovers[idx-1]), format="audio/mp3")
             
             # Twitter Tab
-            with tab2:
+            with tab_placeholders[StreamedResultName.TWITTER].container():
                 st.markdown("### Twitter Post")
                 
                 col1, col2 = st.columns([1, 2])
                 
                 with col1:
-                    # Twitter uses first Instagram image
-                    instagram_images = st.session_state.get('instagram_images', [])
-                    if instagram_images:
-                        st.image(instagram_images[0].url, caption="AI Generated Twitter Image")
+                    # Twitter uses the first concept, cropped to 16:9
+                    twitter_images = st.session_state.get('twitter_images', [])
+                    if twitter_images:
+                        st.image(twitter_images[0].url, caption="AI Generated Twitter Image")
                     else:
                         st.image("https://via.placeholder.com/400x400?text=Generating...", 
                                 caption="Twitter Image")
@@ -385,7 +334,7 @@ if generate_button:
                         st.success("Copied to clipboard!")
             
             # LinkedIn Tab
-            with tab3:
+            with tab_placeholders[StreamedResultName.LINKEDIN_POSTS].container():
                 st.markdown("### LinkedIn Posts (3 Variations)")
                 
                 for idx, post in enumerate(result.linkedin, 1):
@@ -435,6 +384,10 @@ if generate_button:
                             st.success("Copied to clipboard!")
             
             # Summary
+            connection_stats = get_connection_stats()
+            download_stats = get_download_stats()
+            image_queue_stats = get_rate_limiter().stats(IMAGE_MODEL)
+            research_cache_stats = get_research_cache().stats()
             st.markdown("---")
             st.markdown("### 📊 Generation Summary")
             st.markdown(f"""
@@ -444,6 +397,10 @@ if generate_button:
             - **LinkedIn Posts:** 3 variations
             - **Total Content Pieces:** 7
             - **Brand Voice:** {brand_voice.title()}
+            - **Media HTTP Connections:** {connection_stats.connections_opened} opened, {connection_stats.reused_requests}/{connection_stats.requests} requests reused
+            - **Media Downloads:** {download_stats.files} files, {download_stats.bytes / (1024 * 1024):.1f} MB at {download_stats.megabytes_per_second:.1f} MB/s
+            - **Image Render Queue:** {image_queue_stats.waited}/{image_queue_stats.acquired} renders queued for {image_queue_stats.wait_seconds:.1f}s, max depth {image_queue_stats.max_queue_depth}
+            - **Research Cache:** {research_cache_stats.hits} hits, {research_cache_stats.misses} misses, {research_cache_stats.refreshes} forced refreshes
             """)
             st.markdown('</div>', unsafe_allow_html=True)
             
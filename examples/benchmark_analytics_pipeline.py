@@ -0,0 +1,93 @@
+"""Benchmark: parallel vs sequential campaign analytics pipeline.
+
+Runs the real pipeline, so it calls the configured LLMs and is billed. The pipe
+cache is bypassed so every round really runs every step, e.g.:
+
+    python examples/benchmark_analytics_pipeline.py
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pipelex.pipelex import Pipelex
+
+from social_media_analysis.analytics_struct import PostMetrics
+from social_media_analysis.runner import AnalyticsMode, run_campaign_analytics
+
+ROUNDS = 3
+
+ALL_POSTS = [
+    {
+        "post_id": "IG_001",
+        "platform": "Instagram",
+        "topic": "AI Technology",
+        "format": "image",
+        "timestamp": "2024-01-15T10:00:00",
+        "likes": 1250,
+        "comments": 85,
+        "shares": 42,
+        "impressions": 15000,
+        "clicks": 450,
+        "saves": 120,
+    },
+    {
+        "post_id": "IG_002",
+        "platform": "Instagram",
+        "topic": "AI Technology",
+        "format": "image",
+        "timestamp": "2024-01-18T10:00:00",
+        "likes": 980,
+        "comments": 61,
+        "shares": 30,
+        "impressions": 13200,
+        "clicks": 310,
+        "saves": 95,
+    },
+    {
+        "post_id": "LI_001",
+        "platform": "LinkedIn",
+        "topic": "AI Technology",
+        "format": "image",
+        "timestamp": "2024-01-16T09:00:00",
+        "likes": 650,
+        "comments": 32,
+        "shares": 78,
+        "impressions": 8500,
+        "clicks": 290,
+        "saves": 45,
+    },
+]
+
+
+async def benchmark_mode(mode: AnalyticsMode) -> list[float]:
+    """Analyze the first post ROUNDS times and return the wall times."""
+    post_metrics = PostMetrics(**ALL_POSTS[0])
+    all_posts_text = json.dumps(ALL_POSTS)
+    durations: list[float] = []
+    for _ in range(ROUNDS):
+        start_time = time.perf_counter()
+        await run_campaign_analytics(post_metrics, all_posts_text, use_cache=False, mode=mode)
+        durations.append(time.perf_counter() - start_time)
+    return durations
+
+
+async def main() -> None:
+    print(f"Analyzing {ALL_POSTS[0]['post_id']} x {ROUNDS} rounds per mode\n")
+    mean_durations: dict[AnalyticsMode, float] = {}
+    for mode in (AnalyticsMode.SEQUENTIAL, AnalyticsMode.PARALLEL):
+        durations = await benchmark_mode(mode)
+        mean_durations[mode] = sum(durations) / len(durations)
+        print(f"{mode.name.lower():>10}: mean {mean_durations[mode]:6.2f}s, worst {max(durations):6.2f}s")
+    speedup = mean_durations[AnalyticsMode.SEQUENTIAL] / mean_durations[AnalyticsMode.PARALLEL]
+    print(f"\nParallel stages are {speedup:.2f}x faster on average")
+
+
+if __name__ == "__main__":
+    Pipelex.make()
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+"""Benchmark: fan-out vs batched rendering of Instagram style variations.
+
+Runs offline against the local fake Replicate server, so it costs nothing. Tune the
+simulated latency with the FAKE_REPLICATE_* env variables, e.g.:
+
+    FAKE_REPLICATE_MEDIAN_SECONDS=20 FAKE_REPLICATE_PER_OUTPUT_SECONDS=4 python examples/benchmark_image_modes.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Use the fake backend and a throwaway cache so every round really renders
+os.environ["MEDIA_BACKEND"] = "fake"
+os.environ["MEDIA_CACHE_DIR"] = tempfile.mkdtemp(prefix="media-cache-bench-")
+os.environ.setdefault("FAKE_REPLICATE_MEDIAN_SECONDS", "2.0")
+os.environ.setdefault("FAKE_REPLICATE_SIGMA", "0.5")
+os.environ.setdefault("FAKE_REPLICATE_PER_OUTPUT_SECONDS", "0.3")
+
+from social_content.fake_replicate import get_local_fake_server
+from social_content.media_backend import ImageFormat
+from social_content.replicate_functions import INSTAGRAM_STYLE_VARIATIONS, ImageGenerationMode, render_style_variations
+
+ROUNDS = 5
+
+
+async def benchmark_mode(mode: ImageGenerationMode) -> tuple[list[float], int]:
+    """Render ROUNDS sets of variations and return the wall times and prediction count."""
+    server = get_local_fake_server()
+    predictions_before = server.nb_predictions
+    durations: list[float] = []
+    for index_round in range(ROUNDS):
+        # A fresh prompt per round and mode, so nothing comes from the cache
+        base_prompt = f"A cozy coffee shop at sunrise, round {index_round}, {mode}"
+        start_time = time.perf_counter()
+        images = await render_style_variations(base_prompt, INSTAGRAM_STYLE_VARIATIONS, ImageFormat.SQUARE, mode=mode)
+        durations.append(time.perf_counter() - start_time)
+        assert all(image is not None for image in images)
+    return durations, server.nb_predictions - predictions_before
+
+
+async def main() -> None:
+    print(f"Rendering {len(INSTAGRAM_STYLE_VARIATIONS)} variations x {ROUNDS} rounds per mode\n")
+    for mode in ImageGenerationMode:
+        durations, nb_predictions = await benchmark_mode(mode)
+        print(f"{mode:>8}: mean {sum(durations) / len(durations):6.2f}s, worst {max(durations):6.2f}s, {nb_predictions} predictions")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -10,9 +10,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from pipelex import pretty_print
 from pipelex.pipelex import Pipelex
-from pipelex.pipeline.execute import execute_pipeline
 from pipelex.core.stuffs.text_content import TextContent
 from social_media_analysis.analytics_struct import PostMetrics, AnalysisOutput
+from social_media_analysis.runner import run_campaign_analytics
 
 # Sample post data
 SAMPLE_POST = {
@@ -71,20 +71,8 @@ async def analyze_post() -> AnalysisOutput:
     # Create all posts data as text
     all_posts_text = json.dumps(ALL_POSTS, indent=2)
     
-    # Run the analytics pipeline
-    pipe_output = await execute_pipeline(
-        pipe_code="campaign_analytics",
-        inputs={
-            "post": {
-                "concept": "social_media_analysis.PostMetrics",
-                "content": post_metrics,
-            },
-            "all_posts": all_posts_text,  # Pass text directly
-        },
-    )
-    
-    # Extract the analysis output
-    return pipe_output.main_stuff_as(content_type=AnalysisOutput)
+    # Run the analytics pipeline (deterministic steps are reused when the post is unchanged)
+    return await run_campaign_analytics(post_metrics, all_posts_text)
 
 
 # Start Pipelex
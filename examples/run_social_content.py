@@ -9,8 +9,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from pipelex import pretty_print
 from pipelex.pipelex import Pipelex
-from pipelex.pipeline.execute import execute_pipeline
 
+from social_content.runner import run_social_content
 from social_content.social_content_struct import CompanyInput, SocialMediaContent
 
 
@@ -28,26 +28,18 @@ async def generate_content(
         brand_voice=brand_voice
     )
     
-    # Run the pipeline
-    pipe_output = await execute_pipeline(
-        pipe_code="generate_social_content",
-        inputs={
-            "company_input": {
-                "concept": "social_content.CompanyInput",
-                "content": company_input,
-            }
-        },
-    )
+    # Run the pipeline (competitor research is reused from the cache when fresh)
+    content_run = await run_social_content(company_input)
     
     # Return the result
-    return pipe_output.main_stuff_as(content_type=SocialMediaContent)
-
+    return content_run.content
 
-# Start Pipelex
-Pipelex.make()
 
 # Example usage
 if __name__ == "__main__":
+    # Start Pipelex
+    Pipelex.make()
+
     # Test with a sample company
     result = asyncio.run(
         generate_content(
@@ -1,11 +1,16 @@
 """Post Analysis page with campaign analytics."""
 
 import asyncio
-import json
+import tempfile
+from pathlib import Path
+
 import streamlit as st
 from pipelex.pipelex import Pipelex
-from pipelex.pipeline.execute import execute_pipeline
+from social_content.pipe_cache import get_pipe_cache
 from social_media_analysis.analytics_struct import PostMetrics, AnalysisOutput
+from social_media_analysis.baseline_engine import BaselineIndex
+from social_media_analysis.bulk import BulkPostStatus, run_bulk_analysis
+from social_media_analysis.runner import run_campaign_analytics
 from pipelex.core.stuffs.text_content import TextContent
 
 st.set_page_config(
@@ -121,16 +126,25 @@ DUMMY_POSTS = [
     }
 ]
 
+# Counts that can be corrected from the sidebar
+METRIC_FIELDS = ["likes", "comments", "shares", "saves", "clicks", "impressions"]
+
+# Posts of the session, and their baselines kept up to date as metrics are corrected
+if "posts" not in st.session_state:
+    st.session_state.posts = {post["post_id"]: dict(post) for post in DUMMY_POSTS}
+    st.session_state.baseline_index = BaselineIndex([PostMetrics(**post) for post in DUMMY_POSTS])
+baseline_index: BaselineIndex = st.session_state.baseline_index
+
 # Sidebar
 with st.sidebar:
     st.header("📊 Analysis Settings")
     
     # Select post
-    post_ids = [post["post_id"] for post in DUMMY_POSTS]
+    post_ids = list(st.session_state.posts)
     selected_post_id = st.selectbox("Select Post to Analyze", post_ids)
     
     # Show post details
-    selected_post = next(p for p in DUMMY_POSTS if p["post_id"] == selected_post_id)
+    selected_post = st.session_state.posts[selected_post_id]
     
     st.subheader("Post Details")
     st.write(f"**Platform:** {selected_post['platform']}")
@@ -138,9 +152,22 @@ with st.sidebar:
     st.write(f"**Format:** {selected_post['format']}")
     st.write(f"**Date:** {selected_post['timestamp'][:10]}")
     
+    # Corrected metrics replace the post's previous ones in the baselines
+    with st.expander("✏️ Update Metrics"):
+        with st.form(f"metrics_{selected_post_id}"):
+            updated_metrics = {
+                field: st.number_input(field.title(), min_value=0, value=int(selected_post[field]), step=1)
+                for field in METRIC_FIELDS
+            }
+            if st.form_submit_button("Save Metrics", use_container_width=True):
+                selected_post.update(updated_metrics)
+                baseline_index.ingest(PostMetrics(**selected_post))
+                st.success("✅ Metrics and baselines updated")
+    
     st.markdown("---")
     
     analyze_button = st.button("🔍 Analyze Post", type="primary", use_container_width=True)
+    analyze_all_button = st.button("📚 Analyze All Posts", use_container_width=True)
 
 # Main content
 if analyze_button:
@@ -149,29 +176,15 @@ if analyze_button:
             # Create PostMetrics
             post_metrics = PostMetrics(**selected_post)
             
-            # Create all posts data as text
-            all_posts_text = json.dumps(DUMMY_POSTS, indent=2)
-            
-            # Execute pipeline
-            async def run_analysis():
-                return await execute_pipeline(
-                    pipe_code="campaign_analytics",
-                    inputs={
-                        "post": {
-                            "concept": "social_media_analysis.PostMetrics",
-                            "content": post_metrics,
-                        },
-                        "all_posts": all_posts_text,  # Pass text directly
-                    },
-                )
-            
-            pipe_output = asyncio.run(run_analysis())
-            
-            # Extract analysis
-            analysis: AnalysisOutput = pipe_output.main_stuff_as(content_type=AnalysisOutput)
+            # Execute pipeline against the session baselines (an unchanged post comes from the pipe cache if opted in)
+            pipe_cache_before = get_pipe_cache().stats()
+            analysis: AnalysisOutput = asyncio.run(run_campaign_analytics(post_metrics, baseline_index))
+            pipe_cache_after = get_pipe_cache().stats()
         
         # Display results
         st.success("✅ Analysis Complete!")
+        if pipe_cache_after.hits > pipe_cache_before.hits:
+            st.caption("⚡ Analysis served from the pipe cache, the post and its baselines being unchanged")
             
         # KPIs Section
         st.markdown("## 📈 Key Performance Indicators")
@@ -256,6 +269,58 @@ if analyze_button:
         st.error(f"❌ Error analyzing post: {str(e)}")
         st.exception(e)
 
+elif analyze_all_button:
+    try:
+        posts = [PostMetrics(**post) for post in st.session_state.posts.values()]
+        progress_bar = st.progress(0.0, text=f"Analyzing {len(posts)} posts...")
+        bulk_records: list[dict] = []
+
+        def on_progress(report, record) -> None:
+            bulk_records.append(record)
+            progress_bar.progress(
+                report.nb_finished / report.nb_posts,
+                text=f"Analyzed {report.nb_finished}/{report.nb_posts} posts ({report.nb_failed} failed)",
+            )
+
+        # A temporary results file, so every post is analyzed against the current baselines and nothing piles up on disk
+        with tempfile.TemporaryDirectory(prefix="post_analysis_") as results_dir:
+            output_path = Path(results_dir) / "post_analysis.jsonl"
+            bulk_report = asyncio.run(run_bulk_analysis(posts, output_path, on_progress=on_progress, baseline_index=baseline_index))
+            results_jsonl = output_path.read_bytes()
+        progress_bar.empty()
+
+        st.success(f"✅ Analyzed {bulk_report.nb_done} posts in {bulk_report.duration_seconds:.0f}s")
+        if bulk_report.nb_failed:
+            st.warning(f"⚠️ {bulk_report.nb_failed} post(s) failed, see the results below")
+        st.download_button("⬇️ Download Results (JSONL)", results_jsonl, file_name="post_analysis.jsonl", mime="application/jsonl")
+
+        st.markdown("## 📈 All Posts")
+        rows = []
+        for record in sorted(bulk_records, key=lambda record: record["post_id"]):
+            if record["status"] != BulkPostStatus.OK:
+                rows.append({"Post": record["post_id"], "Status": record["error"]})
+                continue
+            bulk_analysis = AnalysisOutput.model_validate(record["analysis"])
+            rows.append({
+                "Post": record["post_id"],
+                "Status": "✅",
+                "Engagement %": round(bulk_analysis.post_kpis.engagement_rate, 2),
+                "Platform Avg %": round(bulk_analysis.platform_baselines.platform_avg_engagement, 2),
+                "Cohort Avg %": round(bulk_analysis.platform_baselines.cohort_avg_engagement, 2),
+                "CTR %": round(bulk_analysis.post_kpis.click_through_rate, 2),
+                "Recommendations": len(bulk_analysis.recommendations),
+            })
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
+        for record in sorted(bulk_records, key=lambda record: record["post_id"]):
+            if record["status"] == BulkPostStatus.OK:
+                with st.expander(f"📋 {record['post_id']} summary"):
+                    st.markdown(record["analysis"]["summary_md"])
+
+    except Exception as e:
+        st.error(f"❌ Error analyzing posts: {str(e)}")
+        st.exception(e)
+
 else:
     # Welcome message
     st.info("""
@@ -269,7 +334,7 @@ else:
     
     **Get Started:**
     1. Select a post from the sidebar
-    2. Click "Analyze Post"
+    2. Click "Analyze Post", or "Analyze All Posts" for every post at once
     3. Review the insights and recommendations
     """)
     
@@ -0,0 +1,216 @@
+"""Batch generation of social content for many companies, from a CSV or JSONL file of briefs.
+
+Each row holds the CompanyInput fields (company_name, topic, brand_voice) and an
+optional `id`. Rows are read as a stream and generated with bounded concurrency,
+and every finished row is appended to a JSONL results file right away, so an
+interrupted run resumes from where it stopped:
+
+    python -m social_content.batch briefs.csv --output results/briefs.jsonl --concurrency 8
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pipelex.pipelex import Pipelex
+from pipelex.types import StrEnum
+
+from social_content.resumable import append_jsonl_record, load_completed_ids, open_jsonl_for_append, run_with_workers
+from social_content.runner import run_social_content
+from social_content.social_content_struct import CompanyInput
+
+# Briefs generated at the same time
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+
+class BatchRowStatus(StrEnum):
+    OK = "ok"
+    ERROR = "error"
+
+
+@dataclass(frozen=True)
+class BatchRow:
+    """One brief of a batch input file, or the reason it could not be read."""
+
+    row_id: str
+    company_input: CompanyInput | None
+    error: str | None = None
+
+
+@dataclass
+class BatchReport:
+    """Outcome of a batch run."""
+
+    nb_done: int = 0
+    nb_failed: int = 0
+    nb_skipped: int = 0  # completed by a previous run
+    duration_seconds: float = 0.0
+
+
+def iter_batch_rows(input_path: Path) -> Iterator[BatchRow]:
+    """Read the briefs of a .csv or .jsonl file one at a time.
+
+    Rows without an `id` are identified by their position in the file, so they must
+    keep their order between a run and its resume. An id already taken by an earlier
+    row gets the position of its row as a suffix. A row that cannot be read comes
+    with its error instead of a CompanyInput, so the rest of the batch still runs.
+
+    Raises:
+        ValueError: The file extension is not supported
+    """
+    seen_row_ids: set[str] = set()
+    for index_row, row in _iter_raw_rows(input_path):
+        row_id = str(row.get("id") or index_row) if isinstance(row, dict) else str(index_row)
+        while row_id in seen_row_ids:
+            row_id = f"{row_id}#{index_row}"
+        seen_row_ids.add(row_id)
+        yield _make_batch_row(row_id, row)
+
+
+def _iter_raw_rows(input_path: Path) -> Iterator[tuple[int, dict[str, Any] | ValueError]]:
+    match input_path.suffix.lower():
+        case ".csv":
+            with input_path.open(newline="", encoding="utf-8") as input_file:
+                yield from enumerate(csv.DictReader(input_file))
+        case ".jsonl":
+            with input_path.open(encoding="utf-8") as input_file:
+                index_row = 0
+                for line in input_file:
+                    if not line.strip():
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        yield index_row, ValueError(f"Invalid JSON: {exc}")
+                    else:
+                        yield index_row, row if isinstance(row, dict) else ValueError("Expected a JSON object")
+                    index_row += 1
+        case _:
+            raise ValueError(f"Unsupported batch input '{input_path}': expected a .csv or .jsonl file")
+
+
+def _make_batch_row(row_id: str, row: dict[str, Any] | ValueError) -> BatchRow:
+    if isinstance(row, ValueError):
+        return BatchRow(row_id=row_id, company_input=None, error=str(row))
+    missing_fields = [field for field in ("company_name", "topic") if not str(row.get(field) or "").strip()]
+    if missing_fields:
+        return BatchRow(row_id=row_id, company_input=None, error=f"Missing {', '.join(missing_fields)}")
+    company_input = CompanyInput(
+        company_name=str(row["company_name"]).strip(),
+        topic=str(row["topic"]).strip(),
+        brand_voice=str(row.get("brand_voice") or "professional").strip(),
+    )
+    return BatchRow(row_id=row_id, company_input=company_input)
+
+
+def load_completed_row_ids(output_path: Path) -> set[str]:
+    """Return the ids of the rows already generated in a results file.
+
+    Failed rows are not completed and get retried. A line cut short by a crash is ignored.
+    """
+    return load_completed_ids(output_path, id_field="row_id", completed_status=BatchRowStatus.OK)
+
+
+async def _generate_row(row: BatchRow, force_refresh: bool) -> dict[str, Any]:
+    if row.company_input is None:
+        # Recorded like a failed generation, so it is retried once the input file is fixed
+        return {"row_id": row.row_id, "company_input": None, "status": BatchRowStatus.ERROR, "error": row.error, "duration_seconds": 0.0}
+    start_time = time.perf_counter()
+    record: dict[str, Any] = {"row_id": row.row_id, "company_input": row.company_input.model_dump()}
+    try:
+        content_run = await run_social_content(row.company_input, force_refresh=force_refresh)
+    except Exception as exc:
+        record.update(status=BatchRowStatus.ERROR, error=f"{type(exc).__name__}: {exc}")
+    else:
+        record.update(
+            status=BatchRowStatus.OK,
+            research_from_cache=content_run.research_from_cache,
+            content=content_run.content.model_dump(),
+        )
+        if content_run.digest is not None:
+            record.update(research_tokens_before=content_run.digest.tokens_before, research_tokens_after=content_run.digest.tokens_after)
+    record["duration_seconds"] = round(time.perf_counter() - start_time, 2)
+    return record
+
+
+async def run_batch(
+    input_path: Path,
+    output_path: Path,
+    concurrency: int = BATCH_CONCURRENCY,
+    force_refresh: bool = False,
+) -> BatchReport:
+    """Generate the content of every brief of `input_path` not yet in `output_path`.
+
+    A fixed set of workers pulls rows from a bounded queue, so memory stays flat
+    however long the input file is. Rows are appended to `output_path` in
+    completion order; a failed or unreadable row is recorded with its error and
+    retried on the next run. An error writing a result stops the run and is raised.
+
+    Args:
+        input_path: The .csv or .jsonl file of briefs
+        output_path: The JSONL results file, created or appended to
+        concurrency: Briefs generated at the same time
+        force_refresh: Redo the competitor research even if it is cached
+
+    Returns:
+        The counts of the run
+    """
+    start_time = time.perf_counter()
+    report = BatchReport()
+    completed_row_ids = load_completed_row_ids(output_path)
+
+    with open_jsonl_for_append(output_path) as output_file:
+
+        async def generate(row: BatchRow) -> None:
+            record = await _generate_row(row, force_refresh=force_refresh)
+            append_jsonl_record(output_file, record)
+            if record["status"] == BatchRowStatus.OK:
+                report.nb_done += 1
+            else:
+                report.nb_failed += 1
+                print(f"Row {row.row_id} failed: {record['error']}")
+            row_name = row.company_input.company_name if row.company_input is not None else f"Row {row.row_id}"
+            print(
+                f"[{report.nb_done} done, {report.nb_failed} failed, {report.nb_skipped} skipped] "
+                f"{row_name}: {record['status']} in {record['duration_seconds']:.1f}s"
+            )
+
+        def rows_to_generate() -> Iterator[BatchRow]:
+            for row in iter_batch_rows(input_path):
+                if row.row_id in completed_row_ids:
+                    report.nb_skipped += 1
+                    continue
+                yield row
+
+        await run_with_workers(rows_to_generate(), generate, concurrency=concurrency)
+
+    report.duration_seconds = time.perf_counter() - start_time
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate social content for every brief of a CSV or JSONL file")
+    parser.add_argument("input", type=Path, help="Briefs with company_name, topic, brand_voice and an optional id column")
+    parser.add_argument("--output", type=Path, help="JSONL results file, defaults to results/<input name>.jsonl")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Briefs generated at the same time")
+    parser.add_argument("--refresh-research", action="store_true", help="Redo the competitor research even if it is cached")
+    args = parser.parse_args()
+    output_path: Path = args.output or Path("results") / f"{args.input.stem}.jsonl"
+
+    Pipelex.make()
+    report = asyncio.run(run_batch(args.input, output_path, concurrency=args.concurrency, force_refresh=args.refresh_research))
+    print(
+        f"Batch finished in {report.duration_seconds:.0f}s: {report.nb_done} generated, {report.nb_failed} failed, "
+        f"{report.nb_skipped} already done. Results in {output_path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""Deterministic pipe functions assembling the social content package."""
+
+from pipelex.core.memory.working_memory import WorkingMemory
+from pipelex.system.registries.func_registry import pipe_func
+
+from social_content.social_content_struct import InstagramPost, LinkedInPost, SocialMediaContent, TwitterPost
+
+
+@pipe_func(name="assemble_social_content")
+def assemble_social_content(working_memory: WorkingMemory) -> SocialMediaContent:
+    """Package the generated posts into SocialMediaContent, without an LLM round trip."""
+
+    # The platform posts are already typed in working memory, they only need to be packaged
+    instagram_posts = working_memory.get_stuff_as_list("instagram_posts", item_type=InstagramPost).items
+    twitter = working_memory.get_stuff_as("twitter", content_type=TwitterPost)
+    linkedin_posts = working_memory.get_stuff_as_list("linkedin_posts", item_type=LinkedInPost).items
+
+    return SocialMediaContent(instagram=list(instagram_posts), twitter=twitter, linkedin=list(linkedin_posts))
@@ -0,0 +1,324 @@
+"""Local stand-in for the Replicate predictions API, for offline load tests and benchmarks.
+
+Run it standalone with:
+
+    python -m social_content.fake_replicate --port 8765 --median 20 --sigma 0.4
+
+then point the app at it with MEDIA_BACKEND=fake and FAKE_REPLICATE_URL=http://127.0.0.1:8765.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import struct
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+@dataclass
+class LatencyModel:
+    """Latency distribution of a fake prediction.
+
+    Latencies follow a log-normal distribution around `median_seconds`, plus
+    `per_output_seconds` for each generated file after the first one.
+    """
+
+    median_seconds: float = 0.5
+    sigma: float = 0.3
+    per_output_seconds: float = 0.1
+    seed: int = 0
+
+    def __post_init__(self) -> None:
+        self._random = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def make_from_env(cls) -> "LatencyModel":
+        """Read the latency settings from the FAKE_REPLICATE_* env variables."""
+        return cls(
+            median_seconds=float(os.getenv("FAKE_REPLICATE_MEDIAN_SECONDS", "0.5")),
+            sigma=float(os.getenv("FAKE_REPLICATE_SIGMA", "0.3")),
+            per_output_seconds=float(os.getenv("FAKE_REPLICATE_PER_OUTPUT_SECONDS", "0.1")),
+            seed=int(os.getenv("FAKE_REPLICATE_SEED", "0")),
+        )
+
+    def sample(self, nb_outputs: int) -> float:
+        with self._lock:
+            base_seconds = self.median_seconds * self._random.lognormvariate(0, self.sigma)
+        return base_seconds + self.per_output_seconds * max(0, nb_outputs - 1)
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def make_png(width: int, height: int, seed: bytes) -> bytes:
+    """Build a deterministic RGB PNG: a vertical gradient whose colors depend on `seed`."""
+    red, green, blue = seed[0], seed[1], seed[2]
+    raw_rows: list[bytes] = []
+    for index_row in range(height):
+        shade = index_row * 255 // max(1, height - 1)
+        pixel = bytes(((red + shade) % 256, (green + shade // 2) % 256, (blue + 255 - shade) % 256))
+        raw_rows.append(b"\x00" + pixel * width)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            _png_chunk(b"IHDR", header),
+            _png_chunk(b"IDAT", zlib.compress(b"".join(raw_rows), 6)),
+            _png_chunk(b"IEND", b""),
+        ]
+    )
+
+
+# MPEG-1 Layer III, 128 kbps, 32 kHz, mono: 576 bytes per frame, 36 ms of audio each
+_MP3_FRAME_HEADER = bytes((0xFF, 0xFB, 0x98, 0xC4))
+_MP3_FRAME_BYTES = 576
+_MP3_FRAME_SECONDS = 1152 / 32000
+
+
+def make_mp3(text: str, seed: bytes) -> bytes:
+    """Build deterministic MP3 frames, about as long as `text` would take to read aloud."""
+    duration_seconds = max(1.0, len(text) / 15)
+    nb_frames = int(duration_seconds / _MP3_FRAME_SECONDS)
+    payload = (seed * (_MP3_FRAME_BYTES // len(seed) + 1))[: _MP3_FRAME_BYTES - len(_MP3_FRAME_HEADER)]
+    return (_MP3_FRAME_HEADER + payload) * nb_frames
+
+
+@dataclass(frozen=True)
+class _FakeFile:
+    seed: bytes
+    model_input: dict[str, Any]
+    is_audio: bool
+
+    def render(self) -> bytes:
+        if self.is_audio:
+            return make_mp3(str(self.model_input.get("text", "")), self.seed)
+        width = int(self.model_input.get("width", 1024))
+        height = int(self.model_input.get("height", 1024))
+        return make_png(width, height, self.seed)
+
+
+class FakeReplicateServer:
+    """Threaded HTTP server answering the subset of the Replicate API used by the app.
+
+    - POST /v1/models/{owner}/{name}/predictions: creates a prediction that completes
+      after a sampled latency; with a `Prefer: wait` header the answer waits for it
+    - GET /v1/predictions/{id}: returns a stored prediction, succeeded once its latency has elapsed
+    - POST /v1/predictions/{id}/cancel: cancels a prediction that has not completed yet
+    - GET /files/{name}: returns deterministic PNG or MP3 bytes
+
+    Outputs only depend on the model and its input, like a seeded model would, so the
+    cache and near-duplicate logic can be exercised offline. A `failure_rate` share of
+    predictions fails, to exercise retries.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: LatencyModel | None = None, failure_rate: float = 0.0):
+        self.latency = latency or LatencyModel()
+        self.failure_rate = failure_rate
+        self.predictions: dict[str, dict[str, Any]] = {}
+        self.files: dict[str, _FakeFile] = {}
+        self.nb_predictions = 0
+        self.nb_cancelled = 0
+        self._completions: dict[str, tuple[float, Any, bool]] = {}
+        self._failure_random = random.Random(self.latency.seed + 1)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeReplicateServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-replicate", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeReplicateServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def create_prediction(self, model: str, model_input: dict[str, Any], wait_seconds: float = 0) -> dict[str, Any]:
+        is_audio = "text" in model_input
+        nb_outputs = 1
+        if not is_audio and model_input.get("sequential_image_generation") == "auto":
+            nb_outputs = max(1, int(model_input.get("max_images", 1)))
+        latency_seconds = self.latency.sample(nb_outputs)
+
+        canonical = json.dumps({"model": model, "input": model_input}, sort_keys=True)
+        digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        extension = "mp3" if is_audio else "png"
+        urls: list[str] = []
+        with self._lock:
+            for index_output in range(nb_outputs):
+                file_name = f"{digest[:24]}-{index_output}.{extension}"
+                seed = hashlib.sha256(f"{digest}-{index_output}".encode("utf-8")).digest()
+                self.files[file_name] = _FakeFile(seed=seed, model_input=model_input, is_audio=is_audio)
+                urls.append(f"{self.base_url}/files/{file_name}")
+
+            prediction_id = uuid.uuid4().hex
+            now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            prediction = {
+                "id": prediction_id,
+                "model": model,
+                "version": "fake",
+                "status": "starting",
+                "input": model_input,
+                "output": None,
+                "logs": "",
+                "error": None,
+                "metrics": {},
+                "created_at": now,
+                "started_at": now,
+                "completed_at": None,
+                "urls": {
+                    "get": f"{self.base_url}/v1/predictions/{prediction_id}",
+                    "cancel": f"{self.base_url}/v1/predictions/{prediction_id}/cancel",
+                },
+            }
+            is_failure = self._failure_random.random() < self.failure_rate
+            output = urls[0] if is_audio else urls
+            self._completions[prediction_id] = (time.monotonic() + latency_seconds, output, is_failure)
+            self.predictions[prediction_id] = prediction
+            self.nb_predictions += 1
+
+        if wait_seconds > 0:
+            time.sleep(min(latency_seconds, wait_seconds))
+        return self.get_prediction(prediction_id)
+
+    def get_prediction(self, prediction_id: str) -> dict[str, Any]:
+        """Return a prediction, completing it if its latency has elapsed."""
+        with self._lock:
+            prediction = self.predictions[prediction_id]
+            if prediction_id in self._completions:
+                ready_at, output, is_failure = self._completions[prediction_id]
+                if time.monotonic() < ready_at:
+                    prediction["status"] = "processing"
+                else:
+                    del self._completions[prediction_id]
+                    prediction["completed_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                    if is_failure:
+                        prediction["status"] = "failed"
+                        prediction["error"] = "Internal error (fake failure injected by FAKE_REPLICATE_FAILURE_RATE)"
+                    else:
+                        prediction["status"] = "succeeded"
+                        prediction["output"] = output
+            return dict(prediction)
+
+    def cancel_prediction(self, prediction_id: str) -> dict[str, Any]:
+        """Cancel a prediction that has not completed yet."""
+        prediction = self.get_prediction(prediction_id)
+        with self._lock:
+            if prediction["status"] in ("starting", "processing"):
+                self._completions.pop(prediction_id, None)
+                self.predictions[prediction_id]["status"] = "canceled"
+                self.nb_cancelled += 1
+            return dict(self.predictions[prediction_id])
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_json(self, status: int, payload: dict[str, Any]) -> None:
+                self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+            def _wait_seconds(self) -> float:
+                """Parse the `Prefer: wait` or `Prefer: wait=N` header."""
+                prefer = self.headers.get("Prefer", "")
+                if prefer == "wait":
+                    return 60.0
+                if prefer.startswith("wait="):
+                    return float(prefer.removeprefix("wait="))
+                return 0.0
+
+            def do_POST(self) -> None:
+                parts = self.path.strip("/").split("/")
+                body = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+                if len(parts) == 5 and parts[:2] == ["v1", "models"] and parts[4] == "predictions":
+                    model_input = json.loads(body or b"{}").get("input", {})
+                    prediction = server.create_prediction(f"{parts[2]}/{parts[3]}", model_input, wait_seconds=self._wait_seconds())
+                    self._send_json(201, prediction)
+                elif len(parts) == 4 and parts[:2] == ["v1", "predictions"] and parts[3] == "cancel" and parts[2] in server.predictions:
+                    self._send_json(200, server.cancel_prediction(parts[2]))
+                else:
+                    self._send_json(404, {"detail": f"Unknown endpoint {self.path}"})
+
+            def do_GET(self) -> None:
+                parts = self.path.strip("/").split("/")
+                if len(parts) == 3 and parts[:2] == ["v1", "predictions"] and parts[2] in server.predictions:
+                    self._send_json(200, server.get_prediction(parts[2]))
+                elif len(parts) == 2 and parts[0] == "files" and parts[1] in server.files:
+                    content_type = "audio/mpeg" if parts[1].endswith(".mp3") else "image/png"
+                    self._send(200, server.files[parts[1]].render(), content_type)
+                else:
+                    self._send_json(404, {"detail": f"Not found: {self.path}"})
+
+        return Handler
+
+
+_local_server: FakeReplicateServer | None = None
+_local_server_lock = threading.Lock()
+
+
+def get_local_fake_server() -> FakeReplicateServer:
+    """Return a fake server running in this process, starting it on first use."""
+    global _local_server
+    with _local_server_lock:
+        if _local_server is None:
+            _local_server = FakeReplicateServer(
+                latency=LatencyModel.make_from_env(),
+                failure_rate=float(os.getenv("FAKE_REPLICATE_FAILURE_RATE", "0")),
+            ).start()
+    return _local_server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local fake Replicate server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--median", type=float, default=0.5, help="Median prediction latency in seconds")
+    parser.add_argument("--sigma", type=float, default=0.3, help="Log-normal sigma of the latency")
+    parser.add_argument("--per-output", type=float, default=0.1, help="Extra seconds per additional output file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of predictions that fail")
+    args = parser.parse_args()
+
+    latency = LatencyModel(median_seconds=args.median, sigma=args.sigma, per_output_seconds=args.per_output, seed=args.seed)
+    server = FakeReplicateServer(host=args.host, port=args.port, latency=latency, failure_rate=args.failure_rate)
+    print(f"Fake Replicate server listening on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
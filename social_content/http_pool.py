@@ -0,0 +1,110 @@
+"""Process-wide keep-alive HTTP connection pool shared by media predictions and downloads."""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+# Pool sizing, overridable through the environment
+MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_POOL_KEEPALIVE_SECONDS", "60"))
+
+
+@dataclass(frozen=True)
+class ConnectionStats:
+    """Snapshot of the connection pool counters."""
+
+    requests: int
+    connections_opened: int
+    tls_handshakes: int
+
+    @property
+    def reused_requests(self) -> int:
+        """Requests served on an already open connection."""
+        return max(0, self.requests - self.connections_opened)
+
+    @property
+    def reuse_ratio(self) -> float:
+        if self.requests == 0:
+            return 0.0
+        return self.reused_requests / self.requests
+
+
+class MeteredTransport(httpx.BaseTransport):
+    """HTTP transport with a keep-alive pool that counts requests, connections and TLS handshakes.
+
+    Counting relies on the httpcore `trace` extension, which reports when a new TCP
+    connection is opened and when TLS is negotiated on it.
+    """
+
+    def __init__(self, max_connections: int = MAX_CONNECTIONS, keepalive_expiry: float = KEEPALIVE_EXPIRY_SECONDS):
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._transport = httpx.HTTPTransport(limits=limits)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._connections_opened = 0
+        self._tls_handshakes = 0
+
+    def _trace(self, event_name: str, info: dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self._connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            with self._lock:
+                self._tls_handshakes += 1
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self._requests += 1
+        request.extensions["trace"] = self._trace
+        return self._transport.handle_request(request)
+
+    def close(self) -> None:
+        self._transport.close()
+
+    def stats(self) -> ConnectionStats:
+        with self._lock:
+            return ConnectionStats(
+                requests=self._requests,
+                connections_opened=self._connections_opened,
+                tls_handshakes=self._tls_handshakes,
+            )
+
+
+_transport: MeteredTransport | None = None
+_http_client: httpx.Client | None = None
+_lock = threading.Lock()
+
+
+def get_shared_transport() -> MeteredTransport:
+    """Return the process-wide pooled transport.
+
+    Every client built on it (our download client, the Replicate client) shares the
+    same open connections, whatever thread or event loop it is used from.
+    """
+    global _transport
+    with _lock:
+        if _transport is None:
+            _transport = MeteredTransport()
+    return _transport
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide HTTP client used to download generated media."""
+    global _http_client
+    transport = get_shared_transport()
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(transport=transport, follow_redirects=True, timeout=httpx.Timeout(60.0, connect=10.0))
+    return _http_client
+
+
+def get_connection_stats() -> ConnectionStats:
+    """Return the connection reuse counters of the shared pool."""
+    return get_shared_transport().stats()
@@ -0,0 +1,274 @@
+"""Derive per-platform crops from one master render, locally, in a process pool."""
+
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+from collections.abc import Awaitable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, ImageOps
+from pipelex.core.memory.working_memory import WorkingMemory
+from pipelex.core.stuffs.image_content import ImageContent
+from pipelex.core.stuffs.list_content import ListContent
+from pipelex.system.registries.func_registry import pipe_func
+from pipelex.types import StrEnum
+
+from social_content.media_backend import ImageFormat
+from social_content.media_cache import MediaCache, get_media_cache
+from social_content.prompt_index import get_prompt_index, jaccard, shingles
+from social_content.replicate_functions import render_images
+from social_content.social_content_struct import InstagramPost, LinkedInPost, LocalImageContent
+
+# Aspect ratio of the paid master render of a concept shared by several platforms
+MASTER_IMAGE_FORMAT = ImageFormat.SQUARE
+
+# Concepts illustrated per platform: the first Instagram variations and the first LinkedIn post
+NB_INSTAGRAM_CONCEPTS = 2
+NB_LINKEDIN_CONCEPTS = 1
+
+# Number of worker processes doing the crop/resize work
+DERIVATION_WORKERS = int(os.getenv("IMAGE_DERIVATION_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+class CropFormat(StrEnum):
+    """Platform formats derived from a master image."""
+
+    SQUARE = "square"
+    LANDSCAPE = "landscape"
+    TWITTER = "twitter"
+
+    @property
+    def dimensions(self) -> tuple[int, int]:
+        match self:
+            case CropFormat.SQUARE:
+                return ImageFormat.SQUARE.dimensions
+            case CropFormat.LANDSCAPE:
+                return ImageFormat.LANDSCAPE.dimensions
+            case CropFormat.TWITTER:
+                # 16:9 like LANDSCAPE, at the size of a Twitter card
+                return 1200, 675
+
+
+def crop_image(master_path: str, width: int, height: int) -> bytes:
+    """Center-crop and resize an image to `width` x `height` (runs in a worker process).
+
+    Args:
+        master_path: Path of the master image
+        width: Target width in pixels
+        height: Target height in pixels
+
+    Returns:
+        The derived image as PNG bytes
+    """
+    with Image.open(master_path) as master:
+        derived = ImageOps.fit(master.convert("RGB"), (width, height), method=Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    derived.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_derivation_pool() -> ProcessPoolExecutor:
+    """Return the process pool running `crop_image`, starting it on first use.
+
+    Workers are spawned rather than forked, since the parent runs threads (HTTP pool,
+    Streamlit) that must not be copied mid-flight.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, DERIVATION_WORKERS), mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def derive_crop(master: ImageContent, crop_format: CropFormat) -> ImageContent:
+    """Derive one platform crop of a master image, or reuse the cached one.
+
+    Args:
+        master: Master image, pointing at its cached file
+        crop_format: Platform format to derive
+
+    Returns:
+        The derived image, captioned with its format
+    """
+    media_cache = get_media_cache()
+    master_path = Path(master.url)
+    width, height = crop_format.dimensions
+    cache_key = MediaCache.make_key("crop", {"master": master_path.name, "width": width, "height": height})
+
+    derived_path = await asyncio.to_thread(media_cache.get, cache_key)
+    if derived_path is None:
+        loop = asyncio.get_running_loop()
+        png_bytes = await loop.run_in_executor(get_derivation_pool(), crop_image, str(master_path), width, height)
+        derived_path = await asyncio.to_thread(media_cache.put, cache_key, png_bytes, ".png")
+
+    return LocalImageContent(url=str(derived_path), local_path=str(derived_path), source_prompt=master.source_prompt, caption=str(crop_format))
+
+
+@dataclass(frozen=True)
+class PlatformImages:
+    """Crops of the illustrated concepts of each platform, None for a concept whose master render failed.
+
+    Attributes:
+        instagram: Crops of each Instagram concept
+        linkedin: Crops of each LinkedIn concept, cut from an Instagram master when the prompts are near-duplicates
+        nb_master_renders: Master renders requested, at most that many paid predictions
+        nb_derived_crops: Crops cut locally from the masters
+    """
+
+    instagram: list[dict[CropFormat, ImageContent] | None]
+    linkedin: list[dict[CropFormat, ImageContent] | None]
+    nb_master_renders: int = 0
+    nb_derived_crops: int = 0
+
+    @property
+    def twitter(self) -> ImageContent | None:
+        """Twitter shares the first rendered concept, Instagram's before LinkedIn's, cut to its own ratio."""
+        for crops in self.instagram + self.linkedin:
+            if crops is not None:
+                return crops[CropFormat.TWITTER]
+        return None
+
+
+def has_image_prompt(image_prompt: str) -> bool:
+    return bool(image_prompt and image_prompt.strip() and image_prompt.lower() != "none")
+
+
+def concept_prompts(posts: Sequence[InstagramPost | LinkedInPost], nb_concepts: int) -> list[str]:
+    """Image prompts of the first `nb_concepts` posts, skipping text-only ones."""
+    return [post.image_prompt for post in posts[:nb_concepts] if has_image_prompt(post.image_prompt)]
+
+
+def match_shared_concept(prompt: str, master_prompts: list[str], threshold: float | None = None) -> int | None:
+    """Index of the master prompt that `prompt` is a near-duplicate of, if any.
+
+    Uses the word-shingle Jaccard similarity and threshold of the prompt index.
+
+    Args:
+        prompt: Prompt of the concept to illustrate
+        master_prompts: Prompts of the masters already being rendered
+        threshold: Minimum similarity, defaults to the prompt index's
+
+    Returns:
+        Index of the most similar master prompt clearing the threshold, or None
+    """
+    threshold = threshold if threshold is not None else get_prompt_index().threshold
+    if threshold > 1:
+        return None
+    prompt_shingles = shingles(prompt)
+    similarities = [jaccard(prompt_shingles, shingles(master_prompt)) for master_prompt in master_prompts]
+    if not similarities or max(similarities) < threshold:
+        return None
+    return similarities.index(max(similarities))
+
+
+async def _derive_platform_crops(
+    masters: list[ImageContent | None], crop_formats: list[list[CropFormat]], label: str
+) -> list[dict[CropFormat, ImageContent] | None]:
+    """Derive the crops of each master in parallel, None for a master that failed to render or crop."""
+
+    async def derive_all(master: ImageContent | None, master_crop_formats: list[CropFormat]) -> dict[CropFormat, ImageContent] | None:
+        if master is None:
+            return None
+        crops = await asyncio.gather(*(derive_crop(master, crop_format) for crop_format in master_crop_formats))
+        return dict(zip(master_crop_formats, crops, strict=True))
+
+    results = await asyncio.gather(
+        *(derive_all(master, master_crop_formats) for master, master_crop_formats in zip(masters, crop_formats, strict=True)),
+        return_exceptions=True,
+    )
+    platform_images: list[dict[CropFormat, ImageContent] | None] = []
+    for index_master, result in enumerate(results):
+        if isinstance(result, BaseException):
+            print(f"Error deriving {label} image {index_master + 1}: {result}")
+            platform_images.append(None)
+        else:
+            platform_images.append(result)
+    return platform_images
+
+
+async def render_post_images(
+    instagram_posts: Sequence[InstagramPost], linkedin_posts: Awaitable[Sequence[LinkedInPost]]
+) -> PlatformImages:
+    """Render one master per concept and cut every platform crop from it locally.
+
+    The first Instagram variations get 1:1 masters, which start right away. Once the
+    LinkedIn posts are in, a LinkedIn concept whose prompt is a near-duplicate of an
+    Instagram one is cut from that master, only the others get their own 16:9 master.
+
+    Args:
+        instagram_posts: Instagram posts, the first NB_INSTAGRAM_CONCEPTS are illustrated
+        linkedin_posts: LinkedIn posts, the first NB_LINKEDIN_CONCEPTS are illustrated
+
+    Returns:
+        The crops of each platform, with the number of master renders and derived crops
+    """
+    instagram_prompts = concept_prompts(instagram_posts, NB_INSTAGRAM_CONCEPTS)
+    instagram_renders = asyncio.ensure_future(render_images(instagram_prompts, MASTER_IMAGE_FORMAT, label="Instagram"))
+    try:
+        linkedin_prompts = concept_prompts(await linkedin_posts, NB_LINKEDIN_CONCEPTS)
+        shared_masters = [match_shared_concept(prompt, instagram_prompts) for prompt in linkedin_prompts]
+        own_prompts = [prompt for prompt, index_master in zip(linkedin_prompts, shared_masters, strict=True) if index_master is None]
+        instagram_masters, own_masters = await asyncio.gather(
+            instagram_renders, render_images(own_prompts, ImageFormat.LANDSCAPE, label="LinkedIn")
+        )
+    finally:
+        # Only still running if the LinkedIn posts never came
+        instagram_renders.cancel()
+
+    linkedin_crop_formats = [CropFormat.LANDSCAPE, CropFormat.TWITTER]
+    instagram_crop_formats = [
+        [CropFormat.SQUARE, CropFormat.TWITTER] + ([CropFormat.LANDSCAPE] if index_master in shared_masters else [])
+        for index_master in range(len(instagram_masters))
+    ]
+    instagram_images, own_images = await asyncio.gather(
+        _derive_platform_crops(instagram_masters, instagram_crop_formats, label="Instagram"),
+        _derive_platform_crops(own_masters, [linkedin_crop_formats] * len(own_masters), label="LinkedIn"),
+    )
+
+    remaining_own_images = iter(own_images)
+    linkedin_images: list[dict[CropFormat, ImageContent] | None] = []
+    for index_master in shared_masters:
+        if index_master is None:
+            linkedin_images.append(next(remaining_own_images))
+        else:
+            crops = instagram_images[index_master]
+            linkedin_images.append({crop_format: crops[crop_format] for crop_format in linkedin_crop_formats} if crops is not None else None)
+
+    nb_master_renders = len(instagram_prompts) + len(own_prompts)
+    nb_derived_crops = sum(len(crops) for crops in instagram_images + own_images if crops is not None)
+    nb_shared = len(linkedin_prompts) - len(own_prompts)
+    print(
+        f"Platform images: {nb_master_renders} master renders, {nb_derived_crops} local crops, "
+        f"{nb_shared} LinkedIn concepts cut from an Instagram master"
+    )
+    return PlatformImages(
+        instagram=instagram_images, linkedin=linkedin_images, nb_master_renders=nb_master_renders, nb_derived_crops=nb_derived_crops
+    )
+
+
+@pipe_func(name="generate_platform_images")
+async def generate_platform_images(working_memory: WorkingMemory) -> ListContent[ImageContent]:
+    """Render the Instagram and LinkedIn concepts once and return the square, landscape and Twitter images."""
+
+    # Get the Instagram posts from working memory
+    instagram_posts = working_memory.get_stuff("instagram_posts").content.items
+
+    async def get_linkedin_posts() -> list[LinkedInPost]:
+        # LinkedIn illustrates its own concepts, when its posts are in working memory
+        linkedin_stuff = working_memory.get_optional_stuff("linkedin_posts")
+        return linkedin_stuff.content.items if linkedin_stuff is not None else []
+
+    platform_images = await render_post_images(instagram_posts, get_linkedin_posts())
+    images = [crops[CropFormat.SQUARE] for crops in platform_images.instagram if crops is not None]
+    images += [crops[CropFormat.LANDSCAPE] for crops in platform_images.linkedin if crops is not None]
+    if platform_images.twitter is not None:
+        images.append(platform_images.twitter)
+    return ListContent[ImageContent](items=images)
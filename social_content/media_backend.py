@@ -0,0 +1,245 @@
+"""Media generation backends (images and speech) behind a single interface."""
+
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from typing import Any
+
+import httpx
+import replicate
+from pipelex.types import StrEnum
+from replicate.exceptions import ModelError, ReplicateError
+
+from social_content.fake_replicate import get_local_fake_server
+from social_content.http_pool import get_shared_transport
+from social_content.media_download import iter_url_chunks
+from social_content.rate_limiter import RateLimiter, get_rate_limiter
+from social_content.resilience import CallCancelledError, ResilienceStats, ResilientCaller
+
+IMAGE_MODEL = "bytedance/seedream-4"
+SPEECH_MODEL = "minimax/speech-02-hd"
+
+# Maximum number of predictions running at the same time (per call)
+MAX_CONCURRENT_PREDICTIONS = int(os.getenv("REPLICATE_MAX_CONCURRENCY", "5"))
+
+
+class ImageFormat(StrEnum):
+    """Aspect ratios we render images in."""
+
+    SQUARE = "1:1"
+    LANDSCAPE = "16:9"
+
+    @property
+    def dimensions(self) -> tuple[int, int]:
+        match self:
+            case ImageFormat.SQUARE:
+                return 1024, 1024
+            case ImageFormat.LANDSCAPE:
+                return 1024, 576
+
+
+class MediaBackendKind(StrEnum):
+    """Available media backends, selected with the MEDIA_BACKEND env variable."""
+
+    REPLICATE = "replicate"
+    FAKE = "fake"
+
+
+def build_image_input(prompt: str, image_format: ImageFormat, max_images: int = 1) -> dict[str, Any]:
+    """Build the seedream-4 input dict for one prompt.
+
+    Args:
+        prompt: Image prompt
+        image_format: Aspect ratio of the image
+        max_images: Number of images to generate from the prompt
+
+    Returns:
+        The model input dict
+    """
+    width, height = image_format.dimensions
+    return {
+        "size": "2K",
+        "width": width,
+        "height": height,
+        "prompt": prompt,
+        "max_images": max_images,
+        "image_input": [],
+        "aspect_ratio": str(image_format),
+        "enhance_prompt": True,
+        "sequential_image_generation": "disabled" if max_images == 1 else "auto",
+    }
+
+
+def build_speech_input(text: str, voice_id: str = "Friendly_Person", emotion: str = "happy", speed: float = 1) -> dict[str, Any]:
+    """Build the speech-02-hd input dict for a script.
+
+    Args:
+        text: Text to synthesize
+        voice_id: Voice preset
+        emotion: Emotion of the voice
+        speed: Speaking speed multiplier
+
+    Returns:
+        The model input dict
+    """
+    return {
+        "text": text,
+        "pitch": 0,
+        "speed": speed,
+        "volume": 1,
+        "bitrate": 128000,
+        "channel": "mono",
+        "emotion": emotion,
+        "voice_id": voice_id,
+        "sample_rate": 32000,
+        "language_boost": "English",
+        "english_normalization": True,
+    }
+
+
+class MediaBackend(ABC):
+    """Runs media predictions and gives access to their output files.
+
+    All methods are blocking: async callers should run them in a worker thread.
+    """
+
+    @abstractmethod
+    def predict(self, model: str, model_input: dict[str, Any], cancel_event: threading.Event | None = None) -> list[str]:
+        """Run a prediction and return the URLs of its output files.
+
+        If `cancel_event` gets set while the prediction runs, the prediction is
+        cancelled and CallCancelledError is raised.
+        """
+
+    @abstractmethod
+    def iter_output(self, url: str) -> Iterator[bytes]:
+        """Yield the content of an output file in chunks."""
+
+
+class ReplicateBackend(MediaBackend):
+    """Media backend calling the Replicate HTTP API (or anything speaking its protocol).
+
+    The default client runs on the shared keep-alive transport, so predictions and
+    downloads reuse the same pooled connections. Prediction creations go through the
+    shared rate limiter, which queues them under the per-model limits.
+    """
+
+    def __init__(
+        self,
+        client: replicate.Client | None = None,
+        poll_interval: float | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.client = client or replicate.Client(transport=get_shared_transport())
+        self.poll_interval = poll_interval if poll_interval is not None else self.client.poll_interval
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+
+    def predict(self, model: str, model_input: dict[str, Any], cancel_event: threading.Event | None = None) -> list[str]:
+        # Wait for our turn in the machine-wide queue of this model rather than getting throttled
+        self.rate_limiter.acquire(model, cancel_event=cancel_event)
+        prediction = self.client.models.predictions.create(model=model, input=model_input)
+        while prediction.status not in ("succeeded", "failed", "canceled"):
+            # Waiting on the event rather than sleeping lets a cancellation interrupt the poll
+            if cancel_event is None:
+                time.sleep(self.poll_interval)
+            elif cancel_event.wait(self.poll_interval):
+                prediction.cancel()
+                raise CallCancelledError(f"Prediction {prediction.id} of {model} was cancelled")
+            prediction.reload()
+
+        if prediction.status != "succeeded":
+            raise ModelError(prediction)
+        output = prediction.output
+        if not output:
+            return []
+        if isinstance(output, str):
+            return [output]
+        return [str(url) for url in output]
+
+    def iter_output(self, url: str) -> Iterator[bytes]:
+        return iter_url_chunks(url)
+
+
+def make_media_backend(kind: MediaBackendKind) -> MediaBackend:
+    """Create a media backend.
+
+    The fake backend is the Replicate backend pointed at a local stand-in server:
+    FAKE_REPLICATE_URL if set, otherwise a server started in this process.
+    """
+    match kind:
+        case MediaBackendKind.REPLICATE:
+            return ReplicateBackend()
+        case MediaBackendKind.FAKE:
+            base_url = os.getenv("FAKE_REPLICATE_URL") or get_local_fake_server().base_url
+            return ReplicateBackend(
+                client=replicate.Client(api_token="fake-token", base_url=base_url, transport=get_shared_transport()),
+                poll_interval=0.05,
+            )
+
+
+# Failed predictions worth another attempt: the model crashed or ran out of resources, not the input was rejected
+_TRANSIENT_PREDICTION_ERROR = re.compile(
+    r"out of memory|timed? ?out|internal (?:server )?error|unexpected error|temporarily|unavailable|interrupted|try again later",
+    re.IGNORECASE,
+)
+
+
+def is_retryable_media_error(exc: BaseException) -> bool:
+    """Whether a media call failed in a way that another attempt may fix.
+
+    Network errors, rate limits and server errors are retried, and so are failed
+    predictions whose error is transient (out of memory, timeout, internal error).
+    Client errors such as an invalid input or token, and predictions rejected for
+    their content (e.g. flagged as sensitive), fail the same way every time and
+    are not.
+    """
+    if isinstance(exc, ReplicateError):
+        return exc.status is None or exc.status == 429 or exc.status >= 500
+    if isinstance(exc, ModelError):
+        return exc.prediction.status == "failed" and bool(_TRANSIENT_PREDICTION_ERROR.search(str(exc.prediction.error or "")))
+    return isinstance(exc, httpx.TransportError)
+
+
+class ResilientBackend(MediaBackend):
+    """Wraps a backend with bounded retries, jittered backoff, deadlines and optional hedging.
+
+    The policy comes from the MEDIA_* env variables (see ResiliencePolicy). Downloads
+    are delegated as is, since a partially consumed stream cannot be replayed.
+    """
+
+    def __init__(self, backend: MediaBackend, caller: ResilientCaller | None = None):
+        self.backend = backend
+        self.caller = caller or ResilientCaller(is_retryable=is_retryable_media_error)
+
+    def predict(self, model: str, model_input: dict[str, Any], cancel_event: threading.Event | None = None) -> list[str]:
+        return self.caller.call(
+            model,
+            lambda attempt_cancel_event: self.backend.predict(model, model_input, cancel_event=attempt_cancel_event),
+            cancel_event=cancel_event,
+        )
+
+    def iter_output(self, url: str) -> Iterator[bytes]:
+        return self.backend.iter_output(url)
+
+    def stats(self) -> ResilienceStats:
+        return self.caller.stats()
+
+
+_media_backend: MediaBackend | None = None
+
+
+def get_media_backend() -> MediaBackend:
+    """Return the process-wide media backend selected by MEDIA_BACKEND (default: replicate), with retries."""
+    global _media_backend
+    if _media_backend is None:
+        _media_backend = ResilientBackend(make_media_backend(MediaBackendKind(os.getenv("MEDIA_BACKEND", "replicate"))))
+    return _media_backend
+
+
+def set_media_backend(media_backend: MediaBackend) -> None:
+    """Replace the process-wide media backend, e.g. with a fake one for benchmarks."""
+    global _media_backend
+    _media_backend = media_backend
@@ -0,0 +1,148 @@
+"""Content-addressed on-disk cache for generated media."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections.abc import Iterable
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+from social_content.media_download import stream_to_file
+
+# Default location and size cap, overridable through the environment
+DEFAULT_CACHE_DIR = Path(os.getenv("MEDIA_CACHE_DIR", ".cache/media"))
+DEFAULT_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+
+class MediaCache:
+    """Caches model outputs on disk, keyed by model and input.
+
+    Entries map a request key (hash of the model name plus its full input dict) to a
+    blob stored under the hash of its bytes, so identical outputs are stored once.
+    The index lives in SQLite so it can be shared by threads and processes. When the
+    total size of the blobs exceeds `max_bytes`, the least recently used entries are
+    evicted.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.blobs_dir = cache_dir / "blobs"
+        self.max_bytes = max_bytes
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self._index_path = cache_dir / "index.sqlite"
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, blob TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._index_path, timeout=30)
+
+    @staticmethod
+    def make_key(model: str, model_input: dict[str, Any]) -> str:
+        """Build the cache key of a prediction.
+
+        Args:
+            model: Model reference, e.g. "bytedance/seedream-4"
+            model_input: Full input dict sent to the model
+
+        Returns:
+            Hex digest identifying the request
+        """
+        canonical = json.dumps({"model": model, "input": model_input}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Path | None:
+        """Return the cached file for a key and mark it as recently used."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT blob FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            blob_path = self.blobs_dir / row[0]
+            if not blob_path.exists():
+                # The blob was removed behind our back: forget the entry
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return blob_path
+
+    def put(self, key: str, data: bytes, suffix: str) -> Path:
+        """Store output bytes for a key.
+
+        Args:
+            key: Request key from `make_key`
+            data: Output bytes
+            suffix: File extension, e.g. ".png"
+
+        Returns:
+            Path of the stored blob
+        """
+        return self.put_stream(key, [data], suffix=suffix)
+
+    def put_stream(self, key: str, chunks: Iterable[bytes], suffix: str) -> Path:
+        """Stream output chunks to disk for a key, without holding the whole file in memory.
+
+        The chunks go to a temporary file that is atomically renamed to its content hash,
+        so readers never see a partially written blob.
+
+        Args:
+            key: Request key from `make_key`
+            chunks: Output content, e.g. from `iter_url_chunks`
+            suffix: File extension, e.g. ".png"
+
+        Returns:
+            Path of the stored blob
+        """
+        tmp_path, content_hash, size = stream_to_file(chunks, target_dir=self.blobs_dir, suffix=suffix)
+        blob_name = f"{content_hash}{suffix}"
+        blob_path = self.blobs_dir / blob_name
+        if blob_path.exists():
+            tmp_path.unlink(missing_ok=True)
+        else:
+            os.replace(tmp_path, blob_path)
+        self._record(key=key, blob_name=blob_name, size=size)
+        return blob_path
+
+    def _record(self, key: str, blob_name: str, size: int) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, blob, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob_name, size, time.time()),
+            )
+            self._evict(conn, keep_key=key)
+
+    def _total_bytes(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT blob, size FROM entries)").fetchone()
+        return int(row[0])
+
+    def _evict(self, conn: sqlite3.Connection, keep_key: str) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes (never `keep_key`)."""
+        total_bytes = self._total_bytes(conn)
+        while total_bytes > self.max_bytes:
+            row = conn.execute(
+                "SELECT key, blob, size FROM entries WHERE key != ? ORDER BY last_access ASC LIMIT 1", (keep_key,)
+            ).fetchone()
+            if row is None:
+                break
+            key, blob_name, size = row
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            still_used = conn.execute("SELECT 1 FROM entries WHERE blob = ? LIMIT 1", (blob_name,)).fetchone()
+            if still_used is None:
+                (self.blobs_dir / blob_name).unlink(missing_ok=True)
+                total_bytes -= size
+
+
+_media_cache: MediaCache | None = None
+
+
+def get_media_cache() -> MediaCache:
+    """Return the process-wide media cache."""
+    global _media_cache
+    if _media_cache is None:
+        _media_cache = MediaCache()
+    return _media_cache
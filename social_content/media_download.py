@@ -0,0 +1,119 @@
+"""Streamed, chunked download of generated media files."""
+
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from social_content.http_pool import get_http_client
+
+# Size of the chunks read from the network and written to disk
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class DownloadStats:
+    """Snapshot of the download throughput counters."""
+
+    files: int
+    bytes: int
+    seconds: float
+
+    @property
+    def megabytes_per_second(self) -> float:
+        if self.seconds <= 0:
+            return 0.0
+        return self.bytes / self.seconds / (1024 * 1024)
+
+
+class _DownloadCounters:
+    """Thread-safe running totals of completed downloads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._files = 0
+        self._bytes = 0
+        self._seconds = 0.0
+
+    def record(self, nb_bytes: int, seconds: float) -> None:
+        with self._lock:
+            self._files += 1
+            self._bytes += nb_bytes
+            self._seconds += seconds
+
+    def snapshot(self) -> DownloadStats:
+        with self._lock:
+            return DownloadStats(files=self._files, bytes=self._bytes, seconds=self._seconds)
+
+
+_counters = _DownloadCounters()
+
+
+def get_download_stats() -> DownloadStats:
+    """Return the download counters accumulated by this process."""
+    return _counters.snapshot()
+
+
+def iter_url_chunks(url: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the content of a URL in fixed-size chunks.
+
+    Args:
+        url: HTTP(S) URL or `data:` URI of the file
+        chunk_size: Size of the yielded chunks in bytes
+
+    Yields:
+        Chunks of the file content
+    """
+    if url.startswith("data:"):
+        _, encoded = url.split(",", 1)
+        yield base64.b64decode(encoded)
+        return
+
+    # The shared client keeps connections alive between downloads
+    with get_http_client().stream("GET", url) as response:
+        response.raise_for_status()
+        yield from response.iter_bytes(chunk_size=chunk_size)
+
+
+def iter_file_chunks(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the content of a local file in fixed-size chunks."""
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+def stream_to_file(chunks: Iterable[bytes], target_dir: Path, suffix: str) -> tuple[Path, str, int]:
+    """Write chunks to a temporary file in `target_dir`, hashing them on the way.
+
+    Only one chunk is held in memory at a time. The caller is expected to rename the
+    temporary file atomically (os.replace) once it knows the final name.
+
+    Args:
+        chunks: Content of the file
+        target_dir: Directory of the final file, so the rename stays on one filesystem
+        suffix: File extension, e.g. ".png"
+
+    Returns:
+        Tuple of (temporary file path, sha256 hex digest, size in bytes)
+    """
+    start_time = time.perf_counter()
+    digest = hashlib.sha256()
+    nb_bytes = 0
+    file_descriptor, tmp_name = tempfile.mkstemp(dir=target_dir, prefix=".download-", suffix=suffix)
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            for chunk in chunks:
+                digest.update(chunk)
+                file.write(chunk)
+                nb_bytes += len(chunk)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+    _counters.record(nb_bytes=nb_bytes, seconds=time.perf_counter() - start_time)
+    return Path(tmp_name), digest.hexdigest(), nb_bytes
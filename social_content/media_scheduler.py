@@ -0,0 +1,169 @@
+"""Dependency-driven scheduling of media jobs alongside the text pipeline.
+
+Each media job declares the text results it needs and starts the moment they are
+in, so the Instagram images render while the Twitter and LinkedIn posts are still
+being written, instead of after the whole text pipeline.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pipelex.types import StrEnum
+
+from social_content.image_derivation import PlatformImages, render_post_images
+from social_content.runner import StreamedResult, StreamedResultName, stream_social_content
+from social_content.social_content_struct import CompanyInput
+from social_content.voiceover import synthesize_voiceovers
+
+
+class MediaJobName(StrEnum):
+    PLATFORM_IMAGES = "platform_images"
+    INSTAGRAM_VOICEOVERS = "instagram_voiceovers"
+
+
+@dataclass(frozen=True)
+class MediaResult:
+    """Outcome of one media job, `content` is None if it failed."""
+
+    name: MediaJobName
+    content: Any
+    error: str | None = None
+
+
+@dataclass(frozen=True)
+class MediaJob:
+    """A media job and the text results it waits for.
+
+    Attributes:
+        name: Name of the job
+        needs: Results that must be in before the job starts
+        run: The job, taking the scheduler to read its inputs from
+    """
+
+    name: MediaJobName
+    needs: frozenset[StreamedResultName]
+    run: Callable[["MediaScheduler"], Awaitable[Any]]
+
+
+class MediaScheduler:
+    """Starts each job once the results it needs have been added, and reports its outcome."""
+
+    def __init__(self, jobs: list[MediaJob], on_done: Callable[[MediaResult], None]):
+        self._waiting_jobs = list(jobs)
+        self._on_done = on_done
+        self._results: dict[StreamedResultName, asyncio.Future[Any]] = {}
+        self._tasks: dict[MediaJobName, asyncio.Task[None]] = {}
+
+    def _future(self, name: StreamedResultName) -> asyncio.Future[Any]:
+        if name not in self._results:
+            self._results[name] = asyncio.get_running_loop().create_future()
+        return self._results[name]
+
+    def add_result(self, streamed: StreamedResult) -> None:
+        """Record a text result and start every job it unblocks."""
+        self._future(streamed.name).set_result(streamed.content)
+        available = {name for name, future in self._results.items() if future.done()}
+        ready_jobs = [job for job in self._waiting_jobs if job.needs <= available]
+        for job in ready_jobs:
+            self._waiting_jobs.remove(job)
+            self._tasks[job.name] = asyncio.create_task(self._run(job))
+
+    async def wait_for(self, name: StreamedResultName) -> Any:
+        """Return a text result, waiting for it if it is not in yet.
+
+        Jobs use this for optional inputs they do not declare in `needs`.
+        """
+        return await self._future(name)
+
+    async def _run(self, job: MediaJob) -> None:
+        try:
+            result = MediaResult(name=job.name, content=await job.run(self))
+        except Exception as exc:
+            print(f"Error running media job {job.name}: {exc}")
+            result = MediaResult(name=job.name, content=None, error=str(exc))
+        self._on_done(result)
+
+    @property
+    def nb_started(self) -> int:
+        return len(self._tasks)
+
+    def cancel(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+
+
+async def _render_post_images(scheduler: MediaScheduler) -> PlatformImages:
+    """Instagram masters start as soon as the Instagram posts are in, LinkedIn joins when its posts land."""
+    instagram_posts = await scheduler.wait_for(StreamedResultName.INSTAGRAM_POSTS)
+    return await render_post_images(instagram_posts, scheduler.wait_for(StreamedResultName.LINKEDIN_POSTS))
+
+
+async def _voice_instagram_posts(scheduler: MediaScheduler) -> list[Path | None]:
+    instagram_posts = await scheduler.wait_for(StreamedResultName.INSTAGRAM_POSTS)
+    return await synthesize_voiceovers([post.caption for post in instagram_posts])
+
+
+PLATFORM_IMAGES_JOB = MediaJob(
+    name=MediaJobName.PLATFORM_IMAGES,
+    needs=frozenset({StreamedResultName.INSTAGRAM_POSTS}),
+    run=_render_post_images,
+)
+INSTAGRAM_VOICEOVERS_JOB = MediaJob(
+    name=MediaJobName.INSTAGRAM_VOICEOVERS,
+    needs=frozenset({StreamedResultName.INSTAGRAM_POSTS}),
+    run=_voice_instagram_posts,
+)
+
+
+async def stream_social_content_with_media(
+    company_input: CompanyInput,
+    force_refresh: bool = False,
+    jobs: list[MediaJob] | None = None,
+) -> AsyncIterator[StreamedResult | MediaResult]:
+    """Like `stream_social_content`, also running media jobs as soon as their inputs exist.
+
+    Text and media results are yielded in completion order, interleaved.
+
+    Args:
+        company_input: Company, topic and brand voice
+        force_refresh: Redo the competitor research even if it is cached
+        jobs: Media jobs to run, defaults to the platform images
+
+    Yields:
+        Each text result, then each media result, as they land
+    """
+    jobs = jobs if jobs is not None else [PLATFORM_IMAGES_JOB]
+    events: asyncio.Queue[StreamedResult | MediaResult | BaseException | None] = asyncio.Queue()
+    scheduler = MediaScheduler(jobs, on_done=events.put_nowait)
+
+    async def pump_text_results() -> None:
+        try:
+            async for streamed in stream_social_content(company_input, force_refresh=force_refresh):
+                scheduler.add_result(streamed)
+                events.put_nowait(streamed)
+        except Exception as exc:
+            events.put_nowait(exc)
+        else:
+            # Marks the end of the text results
+            events.put_nowait(None)
+
+    pump_task = asyncio.create_task(pump_text_results())
+    try:
+        is_text_done = False
+        nb_media_done = 0
+        while not is_text_done or nb_media_done < scheduler.nb_started:
+            event = await events.get()
+            if event is None:
+                is_text_done = True
+                continue
+            if isinstance(event, BaseException):
+                raise event
+            if isinstance(event, MediaResult):
+                nb_media_done += 1
+            yield event
+    finally:
+        pump_task.cancel()
+        scheduler.cancel()
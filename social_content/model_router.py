@@ -0,0 +1,354 @@
+"""Latency-aware routing of LLM pipes to the fastest healthy backend serving their model.
+
+Pipelex resolves the backend of each model once, from the active routing profile
+of .pipelex/inference/routing_profiles.toml, when it builds its model deck. Every
+pipe call goes through `execute_routed_pipeline`, and every LLM call it makes,
+however deep in a sequence or parallel, is timed against the backend serving it.
+In latency mode (LLM_ROUTING=latency) the backend of each model of the pipe tree
+is picked from those recent latency and error statistics. The choice only applies
+to that run: the deck and the LLM workers are looked up through a context
+variable, so concurrent runs may be served by different backends.
+
+Statistics older than LLM_ROUTING_WINDOW_SECONDS are forgotten, and a share of
+the calls probes the other backends, so a recovered or sped up provider wins
+its traffic back.
+"""
+
+import os
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Awaitable, Callable, Mapping
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+from pipelex.hub import get_inference_manager, get_models_manager
+from pipelex.pipeline.execute import execute_pipeline
+from pipelex.types import StrEnum
+
+from social_content.plx_library import load_pipe_definitions
+
+
+class RoutingMode(StrEnum):
+    STATIC = "static"
+    LATENCY = "latency"
+
+
+LLM_ROUTING_MODE = RoutingMode(os.getenv("LLM_ROUTING", RoutingMode.STATIC))
+
+# Calls a backend needs before its latency is trusted
+LLM_ROUTING_MIN_SAMPLES = int(os.getenv("LLM_ROUTING_MIN_SAMPLES", "5"))
+
+# Share of calls probing another backend than the fastest healthy one
+LLM_ROUTING_EXPLORE_RATE = float(os.getenv("LLM_ROUTING_EXPLORE_RATE", "0.05"))
+
+# Recent error rate above which a backend is skipped
+LLM_ROUTING_MAX_ERROR_RATE = float(os.getenv("LLM_ROUTING_MAX_ERROR_RATE", "0.5"))
+
+# Age beyond which a call no longer counts in the statistics
+LLM_ROUTING_WINDOW_SECONDS = float(os.getenv("LLM_ROUTING_WINDOW_SECONDS", "600"))
+
+# Most recent calls per (backend, model) the statistics are computed on
+ROUTING_WINDOW = 50
+
+
+@dataclass(frozen=True)
+class BackendHealth:
+    """Recent statistics of one (backend, model) pair."""
+
+    backend: str
+    model: str
+    nb_samples: int
+    error_rate: float
+    median_seconds: float | None
+
+
+@dataclass(frozen=True)
+class _CallSample:
+    recorded_at: float
+    seconds: float
+    is_error: bool
+
+
+class ModelRouter:
+    """Recent per-(backend, model) statistics and the choice of backend they lead to."""
+
+    def __init__(
+        self,
+        min_samples: int = LLM_ROUTING_MIN_SAMPLES,
+        explore_rate: float = LLM_ROUTING_EXPLORE_RATE,
+        max_error_rate: float = LLM_ROUTING_MAX_ERROR_RATE,
+        window: int = ROUTING_WINDOW,
+        window_seconds: float = LLM_ROUTING_WINDOW_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        seed: int | None = None,
+    ):
+        self.min_samples = min_samples
+        self.explore_rate = explore_rate
+        self.max_error_rate = max_error_rate
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque[_CallSample]] = defaultdict(lambda: deque(maxlen=window))
+        self._random = random.Random(seed)
+
+    @staticmethod
+    def _key(backend: str, model: str) -> str:
+        return f"{backend}|{model}"
+
+    def record(self, backend: str, model: str, seconds: float, is_error: bool) -> None:
+        sample = _CallSample(recorded_at=self._clock(), seconds=seconds, is_error=is_error)
+        with self._lock:
+            self._samples[self._key(backend, model)].append(sample)
+
+    def health(self, backend: str, model: str) -> BackendHealth:
+        """Statistics of the calls recorded within the last `window_seconds`."""
+        oldest_recorded_at = self._clock() - self.window_seconds
+        with self._lock:
+            samples = self._samples[self._key(backend, model)]
+            while samples and samples[0].recorded_at < oldest_recorded_at:
+                samples.popleft()
+            recent_samples = list(samples)
+        latencies = [sample.seconds for sample in recent_samples if not sample.is_error]
+        return BackendHealth(
+            backend=backend,
+            model=model,
+            nb_samples=len(recent_samples),
+            error_rate=sum(sample.is_error for sample in recent_samples) / len(recent_samples) if recent_samples else 0.0,
+            median_seconds=statistics.median(latencies) if latencies else None,
+        )
+
+    def choose_backend(self, model: str, eligible_backends: list[str]) -> str:
+        """Pick the backend of the next call to `model`.
+
+        The fastest backend (median latency) among those with enough recent samples
+        and an error rate under the limit wins, except for a share `explore_rate` of
+        calls, which probe one of the other backends, failing ones included. With no
+        healthy backend, under-sampled ones are tried first, then the least failing one.
+
+        Args:
+            model: Model about to be called
+            eligible_backends: Enabled backends serving the model, preferred one first
+
+        Returns:
+            The backend to use
+        """
+        healths = [self.health(backend, model) for backend in eligible_backends]
+        healthy = [
+            health
+            for health in healths
+            if health.nb_samples >= self.min_samples and health.error_rate <= self.max_error_rate and health.median_seconds is not None
+        ]
+        if healthy:
+            best_backend = min(healthy, key=lambda health: health.median_seconds or 0.0).backend
+            other_backends = [backend for backend in eligible_backends if backend != best_backend]
+            if other_backends and self._random.random() < self.explore_rate:
+                return self._random.choice(other_backends)
+            return best_backend
+        unexplored = [health for health in healths if health.nb_samples < self.min_samples]
+        if unexplored:
+            return min(unexplored, key=lambda health: health.nb_samples).backend
+        return min(healths, key=lambda health: (health.error_rate, health.median_seconds or float("inf"))).backend
+
+
+# Backend chosen for each model by the pipeline running in the current context, None when nothing is routed
+_routed_model_specs: ContextVar[Mapping[str, Any] | None] = ContextVar("routed_model_specs", default=None)
+
+
+def _current_routes() -> Mapping[str, Any]:
+    return _routed_model_specs.get() or {}
+
+
+class _RoutedInferenceModels(dict[str, Any]):
+    """Inference models of the deck, overridden by the backend routed in the current context."""
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return _current_routes().get(key) or super().get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        return _current_routes().get(key) or super().__getitem__(key)
+
+
+class _TimedLLMWorker:
+    """LLM worker recording the latency and outcome of each of its calls against its backend."""
+
+    def __init__(self, llm_worker: Any, model: str, backend: str | None):
+        self._llm_worker = llm_worker
+        self._model = model
+        self._backend = backend
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._llm_worker, name)
+
+    async def gen_text(self, llm_job: Any) -> str:
+        return await self._timed(self._llm_worker.gen_text(llm_job=llm_job))
+
+    async def gen_object(self, llm_job: Any, schema: Any) -> Any:
+        return await self._timed(self._llm_worker.gen_object(llm_job=llm_job, schema=schema))
+
+    async def _timed(self, call: Awaitable[Any]) -> Any:
+        if self._backend is None:
+            return await call
+        start_time = time.monotonic()
+        try:
+            result = await call
+        except Exception:
+            get_model_router().record(self._backend, self._model, time.monotonic() - start_time, is_error=True)
+            raise
+        get_model_router().record(self._backend, self._model, time.monotonic() - start_time, is_error=False)
+        return result
+
+
+class _RoutedLLMWorkers(dict[str, Any]):
+    """LLM workers of the inference manager, one per model and backend.
+
+    Pipelex keeps one worker per model and builds it from the deck on first use, so
+    workers are looked up by the backend routed in the current context.
+    """
+
+    @staticmethod
+    def _worker_key(model: str) -> str:
+        return f"{model}|{current_backend(model)}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return super().get(self._worker_key(key), default)
+
+    def __getitem__(self, key: str) -> Any:
+        return super().__getitem__(self._worker_key(key))
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and super().__contains__(self._worker_key(key))
+
+    def __setitem__(self, key: str, llm_worker: Any) -> None:
+        super().__setitem__(self._worker_key(key), llm_worker)
+
+
+_deck_lock = threading.Lock()
+_model_specs: dict[tuple[str, str], Any] = {}
+
+
+def _routed_inference_models() -> _RoutedInferenceModels:
+    """Let the model deck see per-call routes, wrapping its inference models once per deck."""
+    model_deck: Any = get_models_manager().model_deck
+    with _deck_lock:
+        if not isinstance(model_deck.inference_models, _RoutedInferenceModels):
+            model_deck.inference_models = _RoutedInferenceModels(model_deck.inference_models)
+    return model_deck.inference_models
+
+
+def _install_routing() -> None:
+    """Wrap the deck and the LLM workers, again after a teardown replaced them."""
+    _routed_inference_models()
+    inference_manager: Any = get_inference_manager()
+    with _deck_lock:
+        llm_workers = inference_manager.llm_workers
+        if isinstance(llm_workers, _RoutedLLMWorkers):
+            return
+        inference_manager.llm_workers = routed_llm_workers = _RoutedLLMWorkers()
+        if "get_llm_worker" not in vars(inference_manager):
+            get_llm_worker = inference_manager.get_llm_worker
+
+            def get_timed_llm_worker(llm_handle: str) -> _TimedLLMWorker:
+                # The backend is read before the lookup, which may set up the worker of the routed one
+                backend = current_backend(llm_handle)
+                return _TimedLLMWorker(get_llm_worker(llm_handle=llm_handle), model=llm_handle, backend=backend)
+
+            inference_manager.get_llm_worker = get_timed_llm_worker
+    # Workers set up before routing serve the backend of the routing profile
+    for model, llm_worker in llm_workers.items():
+        routed_llm_workers[model] = llm_worker
+
+
+def pipe_models(pipe_code: str) -> list[str]:
+    """Models called by a pipe and by every pipe it runs, directly or through its steps."""
+    definitions = load_pipe_definitions()
+    models: list[str] = []
+    pending_pipe_codes = [pipe_code]
+    visited_pipe_codes: set[str] = set()
+    while pending_pipe_codes:
+        definition = definitions[pending_pipe_codes.pop(0)]
+        if definition.code in visited_pipe_codes:
+            continue
+        visited_pipe_codes.add(definition.code)
+        if definition.model_name is not None and definition.model_name not in models:
+            models.append(definition.model_name)
+        pending_pipe_codes.extend(definition.sub_pipe_codes)
+    return models
+
+
+def eligible_backends(model: str) -> list[str]:
+    """Enabled backends serving `model`, the one of the routing profile first."""
+    models_manager: Any = get_models_manager()
+    backends = list(models_manager.inference_backend_library.get_all_models_and_possible_backends().get(model, []))
+    backend = current_backend(model)
+    if backend in backends:
+        backends.remove(backend)
+        backends.insert(0, backend)
+    return backends
+
+
+def current_backend(model: str) -> str | None:
+    """Backend serving `model` in the current context: the routed one, else the one of the routing profile."""
+    model_spec = _current_routes().get(model) or dict.get(_routed_inference_models(), model)
+    return model_spec.backend_name if model_spec is not None else None
+
+
+def _model_spec(model: str, backend: str) -> Any:
+    with _deck_lock:
+        if (model, backend) not in _model_specs:
+            models_manager: Any = get_models_manager()
+            _model_specs[(model, backend)] = models_manager.get_required_inference_backend(backend).get_model_spec(model)
+        return _model_specs[(model, backend)]
+
+
+_model_router: ModelRouter | None = None
+_model_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide model router."""
+    global _model_router
+    with _model_router_lock:
+        if _model_router is None:
+            _model_router = ModelRouter()
+    return _model_router
+
+
+async def execute_routed_pipeline(pipe_code: str, inputs: dict[str, Any], routing_mode: RoutingMode = LLM_ROUTING_MODE) -> Any:
+    """Run a pipe with `execute_pipeline`, routing every model of its pipe tree in latency mode.
+
+    Each model called by the pipe or its steps gets its backend for this run. Statistics
+    are recorded per LLM call, in both modes, against the backend serving it.
+
+    Args:
+        pipe_code: Pipe to run
+        inputs: Pipeline inputs, as for `execute_pipeline`
+        routing_mode: LATENCY to pick the backends from the statistics
+
+    Returns:
+        The pipe output
+    """
+    _install_routing()
+    routed_model_specs = dict(_current_routes())
+    match routing_mode:
+        case RoutingMode.LATENCY:
+            for model in pipe_models(pipe_code):
+                backends = eligible_backends(model)
+                if len(backends) < 2:
+                    continue
+                model_spec = _model_spec(model, get_model_router().choose_backend(model, backends))
+                if model_spec is not None:
+                    routed_model_specs[model] = model_spec
+        case RoutingMode.STATIC:
+            pass
+
+    # Only this run, and the tasks it starts, see the routes
+    routes_token = _routed_model_specs.set(MappingProxyType(routed_model_specs))
+    try:
+        return await execute_pipeline(pipe_code=pipe_code, inputs=inputs)
+    finally:
+        _routed_model_specs.reset(routes_token)
@@ -0,0 +1,212 @@
+"""Disk-backed cache of pipe outputs, for pipes that are deterministic functions of their inputs.
+
+Low-temperature pipes give the same answer for the same inputs, so paying for
+them again on a re-run is waste. A cached pipe is keyed by its code, its PLX
+definition (prompt template and model settings, and those of the pipes it calls)
+and a canonical hash of its inputs, JSON text inputs being hashed by value so
+that formatting does not matter. Only the pipes listed in LLM_CACHE_PIPES are
+cached (`analyze_metrics` by default, so re-analyzing an unchanged post is served
+from disk), and the store evicts its least recently used entries beyond
+LLM_CACHE_MAX_MB.
+
+Pipelex still runs the pipe, sequences and parallels included: the cache only
+sits around the `execute_pipeline` call of a pipe run through
+`run_pipe_with_cache`, so only the pipes of CACHEABLE_PIPES can be opted in.
+Listing one of their steps, e.g. `diagnose_performance`, prints a warning.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pipelex.core.stuffs.list_content import ListContent
+from pydantic import BaseModel
+
+from social_content.media_cache import DEFAULT_CACHE_DIR
+from social_content.model_router import execute_routed_pipeline
+from social_content.plx_library import load_pipe_definitions
+
+# Pipes run through `run_pipe_with_cache`, the only ones whose outputs can be cached
+CACHEABLE_PIPES = frozenset({"campaign_analytics", "campaign_analytics_sequential", "analyze_metrics", "analyze_metrics_sequential"})
+
+# Pipes whose outputs are cached, opt-in (an empty value disables the cache)
+LLM_CACHE_PIPES = frozenset(
+    pipe_code.strip()
+    for pipe_code in os.getenv("LLM_CACHE_PIPES", "analyze_metrics").split(",")
+    if pipe_code.strip()
+)
+
+# Size of the store beyond which the least recently used entries are evicted
+LLM_CACHE_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+
+def _canonical_json(value: Any) -> str:
+    def to_data(item: Any) -> Any:
+        if isinstance(item, BaseModel):
+            return item.model_dump(mode="json")
+        if isinstance(item, dict):
+            return {str(key): to_data(sub_item) for key, sub_item in item.items()}
+        if isinstance(item, (list, tuple)):
+            return [to_data(sub_item) for sub_item in item]
+        if isinstance(item, str) and item.lstrip()[:1] in ("[", "{"):
+            try:
+                return to_data(json.loads(item))
+            except json.JSONDecodeError:
+                return item
+        return item
+
+    return json.dumps(to_data(value), sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def pipe_fingerprint(pipe_code: str) -> str:
+    """Hash of the PLX definition of a pipe and of every pipe it calls.
+
+    It changes whenever a prompt template or a model setting the pipe depends on changes.
+    """
+    definitions = load_pipe_definitions()
+    definition = definitions[pipe_code]
+    sub_fingerprints = [pipe_fingerprint(sub_pipe_code) for sub_pipe_code in definition.sub_pipe_codes]
+    fingerprint_source = _canonical_json({"domain": definition.domain, "blueprint": definition.blueprint, "sub_pipes": sub_fingerprints})
+    return hashlib.sha256(fingerprint_source.encode("utf-8")).hexdigest()
+
+
+def make_pipe_cache_key(pipe_code: str, inputs: dict[str, Any]) -> str:
+    """Cache key of a pipe run: pipe code, definition fingerprint and canonical inputs."""
+    key_source = _canonical_json({"pipe": pipe_code, "fingerprint": pipe_fingerprint(pipe_code), "inputs": inputs})
+    return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class PipeCacheStats:
+    """Snapshot of the pipe cache activity of this process."""
+
+    hits: int
+    misses: int
+    evictions: int
+
+
+class PipeCache:
+    """SQLite store of pipe outputs, evicting the least recently used beyond `max_bytes`."""
+
+    def __init__(self, db_path: Path = DEFAULT_CACHE_DIR / "pipes.sqlite", max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outputs ("
+                "key TEXT PRIMARY KEY, pipe_code TEXT NOT NULL, output TEXT NOT NULL, size INTEGER NOT NULL, last_used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS outputs_last_used_at ON outputs (last_used_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, key: str) -> Any | None:
+        """Return the stored output data of a key, or None."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT output FROM outputs WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE outputs SET last_used_at = ? WHERE key = ?", (time.time(), key))
+        with self._lock:
+            if row is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def put(self, key: str, pipe_code: str, output: Any) -> None:
+        serialized_output = json.dumps(output, ensure_ascii=False, default=str)
+        size = len(serialized_output.encode("utf-8"))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO outputs (key, pipe_code, output, size, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, pipe_code, serialized_output, size, time.time()),
+            )
+            nb_evicted = self._evict(conn)
+        if nb_evicted:
+            with self._lock:
+                self._evictions += nb_evicted
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        (total_size,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM outputs").fetchone()
+        nb_evicted = 0
+        if total_size <= self.max_bytes:
+            return nb_evicted
+        for key, size in conn.execute("SELECT key, size FROM outputs ORDER BY last_used_at").fetchall():
+            if total_size <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM outputs WHERE key = ?", (key,))
+            total_size -= size
+            nb_evicted += 1
+        return nb_evicted
+
+    def stats(self) -> PipeCacheStats:
+        with self._lock:
+            return PipeCacheStats(hits=self._hits, misses=self._misses, evictions=self._evictions)
+
+
+_pipe_cache: PipeCache | None = None
+_pipe_cache_lock = threading.Lock()
+
+
+def uncacheable_pipes(pipe_codes: frozenset[str]) -> list[str]:
+    """Pipes among `pipe_codes` that the cache never serves, not being run through `run_pipe_with_cache`."""
+    return sorted(pipe_codes - CACHEABLE_PIPES)
+
+
+def get_pipe_cache() -> PipeCache:
+    """Return the process-wide pipe cache, stored next to the media cache.
+
+    Opted-in pipes the cache cannot serve are reported when it is first opened.
+    """
+    global _pipe_cache
+    with _pipe_cache_lock:
+        if _pipe_cache is None:
+            for pipe_code in uncacheable_pipes(LLM_CACHE_PIPES):
+                print(f"LLM_CACHE_PIPES lists '{pipe_code}', which is not cached: only {', '.join(sorted(CACHEABLE_PIPES))} can be")
+            _pipe_cache = PipeCache()
+    return _pipe_cache
+
+
+async def run_pipe_with_cache(pipe_code: str, inputs: dict[str, Any], use_cache: bool = True) -> Any:
+    """Run a pipe with `execute_pipeline`, serving its output from the cache if it opted in.
+
+    Args:
+        pipe_code: Pipe to run
+        inputs: Pipeline inputs, as for `execute_pipeline`
+        use_cache: Set to False to run the pipe, without reading or writing the cache
+
+    Returns:
+        The main output of the pipe as data, a list for a list output
+    """
+    is_cached = use_cache and pipe_code in LLM_CACHE_PIPES
+    if is_cached:
+        pipe_cache = get_pipe_cache()
+        key = make_pipe_cache_key(pipe_code, inputs)
+        output = pipe_cache.get(key)
+        if output is not None:
+            return output
+
+    pipe_output = await execute_routed_pipeline(pipe_code=pipe_code, inputs=inputs)
+    content = pipe_output.main_stuff.content
+    if isinstance(content, ListContent):
+        output = [item.smart_dump() for item in content.items]
+    else:
+        output = content.smart_dump()
+    if is_cached:
+        pipe_cache.put(key, pipe_code, output)
+    return output
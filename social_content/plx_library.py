@@ -0,0 +1,43 @@
+"""Pipe definitions read straight from the project's PLX files."""
+
+import tomllib
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+# Pipelex library files, the same ones Pipelex.make() loads
+PLX_PATHS = sorted(Path(__file__).parent.parent.glob("*/*.plx"))
+
+
+@dataclass(frozen=True)
+class PipeDefinition:
+    """A pipe as declared in its PLX file."""
+
+    code: str
+    domain: str
+    blueprint: dict[str, Any]
+
+    @property
+    def model_name(self) -> str | None:
+        """Model pinned by the pipe, None if it does not call a model."""
+        model_setting = self.blueprint.get("model")
+        if isinstance(model_setting, dict):
+            return model_setting.get("model")
+        return model_setting
+
+    @property
+    def sub_pipe_codes(self) -> list[str]:
+        return [step["pipe"] for step in self.blueprint.get("steps", []) + self.blueprint.get("parallels", [])]
+
+
+@cache
+def load_pipe_definitions() -> dict[str, PipeDefinition]:
+    """Read every pipe of the project's PLX files."""
+    definitions: dict[str, PipeDefinition] = {}
+    for plx_path in PLX_PATHS:
+        with plx_path.open("rb") as plx_file:
+            library = tomllib.load(plx_file)
+        for pipe_code, blueprint in library.get("pipe", {}).items():
+            definitions[pipe_code] = PipeDefinition(code=pipe_code, domain=library["domain"], blueprint=blueprint)
+    return definitions
@@ -0,0 +1,181 @@
+"""MinHash index of past image prompts, to reuse the render of a near-duplicate prompt."""
+
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+from social_content.media_cache import DEFAULT_CACHE_DIR, MediaCache, get_media_cache
+
+# Minimum word-shingle Jaccard similarity for a past render to be reused (above 1 disables reuse)
+PROMPT_REUSE_THRESHOLD = float(os.getenv("PROMPT_REUSE_THRESHOLD", "0.85"))
+
+# MinHash signature layout: NB_BANDS bands of ROWS_PER_BAND hashes each, for locality-sensitive lookup
+NB_BANDS = 16
+ROWS_PER_BAND = 4
+SHINGLE_WORDS = 2
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_permutation_random = random.Random(20240611)
+_PERMUTATIONS = [
+    (_permutation_random.randrange(1, _MERSENNE_PRIME), _permutation_random.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NB_BANDS * ROWS_PER_BAND)
+]
+
+
+def shingles(prompt: str) -> set[str]:
+    """Word shingles of a normalized prompt (lowercase, punctuation dropped)."""
+    words = re.findall(r"[a-z0-9]+", prompt.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[index_word : index_word + SHINGLE_WORDS]) for index_word in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def jaccard(shingles_a: set[str], shingles_b: set[str]) -> float:
+    if not shingles_a or not shingles_b:
+        return 0.0
+    return len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+
+
+def minhash_signature(prompt_shingles: set[str]) -> list[int]:
+    """MinHash signature of a shingle set, one minimum per hash permutation."""
+    base_hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big") for shingle in prompt_shingles]
+    if not base_hashes:
+        return [_MERSENNE_PRIME] * len(_PERMUTATIONS)
+    return [min((multiplier * base_hash + offset) % _MERSENNE_PRIME for base_hash in base_hashes) for multiplier, offset in _PERMUTATIONS]
+
+
+def _band_buckets(signature: list[int]) -> list[str]:
+    """Hash each band of a signature: prompts sharing a bucket are reuse candidates."""
+    buckets: list[str] = []
+    for index_band in range(NB_BANDS):
+        band = signature[index_band * ROWS_PER_BAND : (index_band + 1) * ROWS_PER_BAND]
+        buckets.append(hashlib.blake2b(json.dumps(band).encode("utf-8"), digest_size=8).hexdigest())
+    return buckets
+
+
+@dataclass(frozen=True)
+class PromptReuse:
+    """A render reused for a near-duplicate prompt."""
+
+    prompt: str
+    matched_prompt: str
+    similarity: float
+    path: Path
+
+
+class PromptIndex:
+    """Persistent locality-sensitive index of rendered prompts.
+
+    Each rendered prompt is stored with the media cache key of its render, under a
+    scope (model and aspect ratio) outside of which renders are never reused. Lookup
+    uses MinHash banding to find candidates, then confirms them with the exact
+    Jaccard similarity of their word shingles.
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_CACHE_DIR / "prompts.sqlite", threshold: float = PROMPT_REUSE_THRESHOLD):
+        self.db_path = db_path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._reuses: list[PromptReuse] = []
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompts ("
+                "id INTEGER PRIMARY KEY, scope TEXT NOT NULL, prompt TEXT NOT NULL, cache_key TEXT NOT NULL, "
+                "created_at REAL NOT NULL, UNIQUE (scope, prompt))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS bands (bucket TEXT NOT NULL, prompt_id INTEGER NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS bands_bucket ON bands (bucket)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def add(self, scope: str, prompt: str, cache_key: str) -> None:
+        """Index a rendered prompt.
+
+        Args:
+            scope: Reuse scope, e.g. model and aspect ratio
+            prompt: Prompt that was rendered
+            cache_key: Media cache key of the render
+        """
+        buckets = _band_buckets(minhash_signature(shingles(prompt)))
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO prompts (scope, prompt, cache_key, created_at) VALUES (?, ?, ?, ?)",
+                (scope, prompt, cache_key, time.time()),
+            )
+            if cursor.rowcount == 0:
+                conn.execute("UPDATE prompts SET cache_key = ? WHERE scope = ? AND prompt = ?", (cache_key, scope, prompt))
+                return
+            conn.executemany(
+                "INSERT INTO bands (bucket, prompt_id) VALUES (?, ?)",
+                [(f"{scope}|{index_band}|{bucket}", cursor.lastrowid) for index_band, bucket in enumerate(buckets)],
+            )
+
+    def find_reusable(self, scope: str, prompt: str, media_cache: MediaCache | None = None) -> PromptReuse | None:
+        """Return the most similar past render of a prompt, if it clears the threshold.
+
+        Candidates whose render was evicted from the media cache are skipped. Every
+        reuse is printed and recorded, see `reuses`.
+
+        Args:
+            scope: Reuse scope, e.g. model and aspect ratio
+            prompt: Prompt about to be rendered
+            media_cache: Cache holding the renders, defaults to the process-wide one
+
+        Returns:
+            The reuse, or None if the prompt has to be rendered
+        """
+        if self.threshold > 1:
+            return None
+        media_cache = media_cache or get_media_cache()
+        prompt_shingles = shingles(prompt)
+        buckets = _band_buckets(minhash_signature(prompt_shingles))
+        keys = [f"{scope}|{index_band}|{bucket}" for index_band, bucket in enumerate(buckets)]
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT prompts.prompt, prompts.cache_key FROM bands JOIN prompts ON prompts.id = bands.prompt_id "
+                f"WHERE bands.bucket IN ({','.join('?' * len(keys))})",
+                keys,
+            ).fetchall()
+
+        candidates = sorted(((jaccard(prompt_shingles, shingles(candidate)), candidate, cache_key) for candidate, cache_key in rows), reverse=True)
+        for similarity, candidate, cache_key in candidates:
+            if similarity < self.threshold:
+                break
+            path = media_cache.get(cache_key)
+            if path is None:
+                continue
+            reuse = PromptReuse(prompt=prompt, matched_prompt=candidate, similarity=similarity, path=path)
+            with self._lock:
+                self._reuses.append(reuse)
+            print(f"Reusing render of a similar prompt ({similarity:.0%} similar): '{candidate[:60]}' for '{prompt[:60]}'")
+            return reuse
+        return None
+
+    @property
+    def reuses(self) -> list[PromptReuse]:
+        """Reuses made by this process, oldest first."""
+        with self._lock:
+            return list(self._reuses)
+
+
+_prompt_index: PromptIndex | None = None
+_prompt_index_lock = threading.Lock()
+
+
+def get_prompt_index() -> PromptIndex:
+    """Return the process-wide prompt index, stored next to the media cache."""
+    global _prompt_index
+    with _prompt_index_lock:
+        if _prompt_index is None:
+            _prompt_index = PromptIndex()
+    return _prompt_index
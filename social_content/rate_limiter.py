@@ -0,0 +1,209 @@
+"""Token-bucket rate limiter shared by every process on the machine, backed by SQLite."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+from social_content.media_cache import DEFAULT_CACHE_DIR
+from social_content.resilience import CallCancelledError
+
+# Waiters that have not polled for this long are considered dead and leave the queue
+STALE_WAITER_SECONDS = 15.0
+
+# Longest sleep between two polls of the bucket
+MAX_POLL_SECONDS = 0.5
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Sustained rate and burst size of one token bucket."""
+
+    per_minute: float
+    burst: float
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60
+
+
+DEFAULT_RATE_LIMIT = RateLimit(
+    per_minute=float(os.getenv("REPLICATE_RATE_PER_MINUTE", "600")),
+    burst=float(os.getenv("REPLICATE_RATE_BURST", "20")),
+)
+
+
+def load_rate_limits() -> dict[str, RateLimit]:
+    """Read per-model overrides from REPLICATE_RATE_LIMITS.
+
+    The variable holds JSON such as `{"bytedance/seedream-4": {"per_minute": 60, "burst": 5}}`.
+    """
+    raw_limits = json.loads(os.getenv("REPLICATE_RATE_LIMITS", "{}"))
+    return {name: RateLimit(per_minute=float(limit["per_minute"]), burst=float(limit["burst"])) for name, limit in raw_limits.items()}
+
+
+@dataclass(frozen=True)
+class RateLimiterStats:
+    """Snapshot of the limiter activity of this process for one bucket."""
+
+    acquired: int
+    waited: int  # acquisitions that had to queue
+    wait_seconds: float
+    max_queue_depth: int
+    queue_depth: int
+
+
+class RateLimiter:
+    """FIFO token buckets stored in SQLite, so all processes and sessions share one budget.
+
+    Callers take a ticket in a per-bucket queue and only the oldest ticket may take
+    a token, so requests wait their turn instead of failing or being dropped. Tickets
+    of processes that died are expired after STALE_WAITER_SECONDS without a poll.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = DEFAULT_CACHE_DIR / "rate_limits.sqlite",
+        limits: dict[str, RateLimit] | None = None,
+        default_limit: RateLimit = DEFAULT_RATE_LIMIT,
+    ):
+        self.db_path = db_path
+        self.limits = limits if limits is not None else load_rate_limits()
+        self.default_limit = default_limit
+        self._lock = threading.Lock()
+        self._acquired: dict[str, int] = defaultdict(int)
+        self._waited: dict[str, int] = defaultdict(int)
+        self._wait_seconds: dict[str, float] = defaultdict(float)
+        self._max_queue_depth: dict[str, int] = defaultdict(int)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS waiters (ticket INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, last_seen REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def limit_for(self, name: str) -> RateLimit:
+        return self.limits.get(name, self.default_limit)
+
+    def _try_take(self, conn: sqlite3.Connection, name: str, ticket: int) -> tuple[bool, float, int, int]:
+        """Take a token if `ticket` is first in line and the bucket has one.
+
+        A ticket expired while its caller stalled (e.g. a long pause or lock wait) is
+        replaced by a fresh one at the end of the queue.
+
+        Returns:
+            Tuple of (token taken, seconds until the next token, queue depth, ticket to poll with next)
+        """
+        limit = self.limit_for(name)
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Refresh our own ticket first, so the stale sweep below never removes it
+            if conn.execute("UPDATE waiters SET last_seen = ? WHERE ticket = ?", (now, ticket)).rowcount == 0:
+                print(f"Rate limit ticket {ticket} of {name} expired while waiting, queuing again")
+                ticket = conn.execute("INSERT INTO waiters (name, last_seen) VALUES (?, ?)", (name, now)).lastrowid
+            conn.execute("DELETE FROM waiters WHERE last_seen < ?", (now - STALE_WAITER_SECONDS,))
+            first_ticket, queue_depth = conn.execute("SELECT MIN(ticket), COUNT(*) FROM waiters WHERE name = ?", (name,)).fetchone()
+
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (name,)).fetchone()
+            tokens = limit.burst if row is None else min(limit.burst, row[0] + (now - row[1]) * limit.per_second)
+
+            is_taken = first_ticket == ticket and tokens >= 1
+            if is_taken:
+                tokens -= 1
+                conn.execute("DELETE FROM waiters WHERE ticket = ?", (ticket,))
+            conn.execute("INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)", (name, tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        seconds_to_token = max(0.0, (1 - tokens) / limit.per_second) if limit.per_second > 0 else MAX_POLL_SECONDS
+        return is_taken, seconds_to_token, queue_depth, ticket
+
+    def acquire(self, name: str, cancel_event: threading.Event | None = None) -> float:
+        """Wait in line for a token of bucket `name` (blocking).
+
+        Args:
+            name: Bucket name, e.g. the model reference
+            cancel_event: Set by the caller to leave the queue
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            CallCancelledError: `cancel_event` was set before a token was granted
+        """
+        start_time = time.monotonic()
+        nb_polls = 0
+        with closing(self._connect()) as conn:
+            ticket = conn.execute("INSERT INTO waiters (name, last_seen) VALUES (?, ?)", (name, time.time())).lastrowid
+            try:
+                while True:
+                    is_taken, seconds_to_token, queue_depth, ticket = self._try_take(conn, name, ticket)
+                    nb_polls += 1
+                    with self._lock:
+                        self._max_queue_depth[name] = max(self._max_queue_depth[name], queue_depth)
+                    if is_taken:
+                        break
+                    # Not our turn yet, or no token: wait a bit and ask again
+                    delay = min(MAX_POLL_SECONDS, max(0.01, seconds_to_token))
+                    if cancel_event is None:
+                        time.sleep(delay)
+                    elif cancel_event.wait(delay):
+                        raise CallCancelledError(f"Gave up waiting for a {name} rate limit token")
+            except BaseException:
+                conn.execute("DELETE FROM waiters WHERE ticket = ?", (ticket,))
+                raise
+
+        wait_seconds = time.monotonic() - start_time
+        with self._lock:
+            self._acquired[name] += 1
+            self._wait_seconds[name] += wait_seconds
+            if nb_polls > 1:
+                self._waited[name] += 1
+        return wait_seconds
+
+    def queue_depth(self, name: str) -> int:
+        """Number of requests of all processes currently waiting for bucket `name`."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM waiters WHERE name = ? AND last_seen >= ?", (name, time.time() - STALE_WAITER_SECONDS)
+            ).fetchone()
+        return int(row[0])
+
+    def stats(self, name: str) -> RateLimiterStats:
+        with self._lock:
+            acquired = self._acquired[name]
+            waited = self._waited[name]
+            wait_seconds = self._wait_seconds[name]
+            max_queue_depth = self._max_queue_depth[name]
+        return RateLimiterStats(
+            acquired=acquired,
+            waited=waited,
+            wait_seconds=wait_seconds,
+            max_queue_depth=max_queue_depth,
+            queue_depth=self.queue_depth(name),
+        )
+
+
+_rate_limiter: RateLimiter | None = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter, stored next to the media cache."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+    return _rate_limiter
@@ -1,186 +1,267 @@
 """Replicate API integration for image and audio generation."""
 
+import asyncio
 import os
-import replicate
-from pathlib import Path
+from typing import Any
 
-from pipelex.system.registries.func_registry import func_registry
-from pipelex.core.working_memory import WorkingMemory
+from pipelex.system.registries.func_registry import pipe_func
+from pipelex.core.memory.working_memory import WorkingMemory
 from pipelex.core.stuffs.image_content import ImageContent
+from pipelex.core.stuffs.list_content import ListContent
 from pipelex.core.stuffs.text_content import TextContent
+from pipelex.types import StrEnum
 
+from social_content.media_backend import (
+    IMAGE_MODEL,
+    MAX_CONCURRENT_PREDICTIONS,
+    ImageFormat,
+    build_image_input,
+    get_media_backend,
+)
+from social_content.media_cache import MediaCache, get_media_cache
+from social_content.prompt_index import get_prompt_index
+from social_content.social_content_struct import LocalImageContent
+from social_content.voiceover import synthesize_voiceovers
 
-@func_registry.register("generate_instagram_images")
-async def generate_instagram_images(working_memory: WorkingMemory) -> list[ImageContent]:
+
+# Style suffixes of the Instagram image variations ("" keeps the base prompt as is)
+INSTAGRAM_STYLE_VARIATIONS = [
+    "",
+    "vibrant colors, high contrast",
+    "soft lighting, pastel tones",
+    "dramatic lighting, bold composition",
+    "minimalist style, clean design",
+]
+
+
+class ImageGenerationMode(StrEnum):
+    """How style variations of one prompt are rendered, selected with INSTAGRAM_IMAGE_MODE.
+
+    FAN_OUT sends one `max_images: 1` prediction per variation, in parallel.
+    BATCHED asks seedream-4 for all variations in a single sequential-generation prediction.
+    """
+
+    FAN_OUT = "fan_out"
+    BATCHED = "batched"
+
+
+IMAGE_GENERATION_MODE = ImageGenerationMode(os.getenv("INSTAGRAM_IMAGE_MODE", ImageGenerationMode.FAN_OUT))
+
+
+def _render_image(prompt: str, model_input: dict[str, Any], variation: str = "") -> ImageContent | None:
+    """Render one seedream-4 image, or reuse the cached render of identical inputs or a near-duplicate prompt (blocking).
+
+    Args:
+        prompt: Image prompt sent to the model
+        model_input: Full input dict for the prediction
+        variation: Style variation the prompt belongs to, renders are only reused within the same one
+
+    Returns:
+        The image, pointing at its cached file, or None if the model returned no output
+    """
+    media_cache = get_media_cache()
+    cache_key = MediaCache.make_key(IMAGE_MODEL, model_input)
+
+    image_path = media_cache.get(cache_key)
+    if image_path is None:
+        # A near-duplicate prompt rendered before, in the same model, aspect ratio and style, is good enough.
+        # The style is part of the scope: a short style suffix barely moves the similarity of a long prompt.
+        prompt_index = get_prompt_index()
+        reuse_scope = f"{IMAGE_MODEL}|{model_input['aspect_ratio']}|{variation}"
+        prompt_reuse = prompt_index.find_reusable(reuse_scope, prompt, media_cache=media_cache)
+        if prompt_reuse is not None:
+            return LocalImageContent(
+                url=str(prompt_reuse.path),
+                local_path=str(prompt_reuse.path),
+                source_prompt=prompt_reuse.matched_prompt,
+                caption=f"Reused render of a {prompt_reuse.similarity:.0%} similar prompt",
+            )
+
+        media_backend = get_media_backend()
+        output_urls = media_backend.predict(IMAGE_MODEL, model_input)
+        if not output_urls:
+            return None
+        # Stream the file to disk in chunks rather than reading it whole
+        image_path = media_cache.put_stream(cache_key, media_backend.iter_output(output_urls[0]), suffix=".png")
+        prompt_index.add(reuse_scope, prompt, cache_key)
+
+    return LocalImageContent(url=str(image_path), local_path=str(image_path), source_prompt=prompt)
+
+
+async def render_images(
+    prompts: list[str],
+    image_format: ImageFormat,
+    label: str = "",
+    variations: list[str] | None = None,
+) -> list[ImageContent | None]:
+    """Render several images concurrently without blocking the event loop.
+
+    Each blocking prediction is offloaded to a worker thread, and at most
+    MAX_CONCURRENT_PREDICTIONS of them run at once. Failed renders are reported
+    and come back as None, so results stay aligned with the prompts.
+
+    Args:
+        prompts: Image prompts
+        image_format: Aspect ratio of all the images
+        label: Human readable name used in error messages
+        variations: Style variation of each prompt, so that no variation is served the render of another
+
+    Returns:
+        Rendered images (or None on failure), in the same order as the prompts
+    """
+    semaphore = asyncio.Semaphore(max(1, MAX_CONCURRENT_PREDICTIONS))
+    variations = variations if variations is not None else [""] * len(prompts)
+
+    async def render_one(index_prompt: int, prompt: str) -> ImageContent | None:
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(_render_image, prompt, build_image_input(prompt, image_format), variations[index_prompt])
+            except Exception as exc:
+                print(f"Error generating {label} image {index_prompt + 1}: {exc}")
+                # Continue with other images even if one fails
+                return None
+
+    return list(await asyncio.gather(*(render_one(index_prompt, prompt) for index_prompt, prompt in enumerate(prompts))))
+
+
+def style_prompt(base_prompt: str, style: str) -> str:
+    """Prompt of one style variation when rendered on its own."""
+    if not style:
+        return base_prompt
+    return f"{base_prompt}, {style}"
+
+
+def _batched_prompt(base_prompt: str, styles: list[str]) -> str:
+    """Single prompt describing every style variation, in output order."""
+    style_lines = [f"Image {index_style + 1}: {style or 'exactly as described'}" for index_style, style in enumerate(styles)]
+    return f"{base_prompt}\n\nGenerate {len(styles)} images of this same scene, one per style, in this order:\n" + "\n".join(style_lines)
+
+
+def _render_image_series(base_prompt: str, styles: list[str], image_format: ImageFormat) -> list[ImageContent | None]:
+    """Render all style variations with one multi-image prediction (blocking).
+
+    Output i is mapped back to style i. Each output is cached under the batched input plus
+    its index, so a re-run is served from disk. Slots the model did not fill come back as None.
+
+    Args:
+        base_prompt: Prompt shared by all variations
+        styles: Style suffix of each variation
+        image_format: Aspect ratio of all the images
+
+    Returns:
+        One image (or None) per style, in order
+    """
+    model_input = build_image_input(_batched_prompt(base_prompt, styles), image_format, max_images=len(styles))
+    media_cache = get_media_cache()
+    cache_keys = [MediaCache.make_key(IMAGE_MODEL, {**model_input, "output_index": index_style}) for index_style in range(len(styles))]
+
+    image_paths = [media_cache.get(cache_key) for cache_key in cache_keys]
+    if None in image_paths:
+        media_backend = get_media_backend()
+        output_urls = media_backend.predict(IMAGE_MODEL, model_input)
+        for index_output, output_url in enumerate(output_urls[: len(styles)]):
+            image_paths[index_output] = media_cache.put_stream(cache_keys[index_output], media_backend.iter_output(output_url), suffix=".png")
+
+    images: list[ImageContent | None] = []
+    for image_path, style in zip(image_paths, styles, strict=True):
+        if image_path is None:
+            images.append(None)
+        else:
+            images.append(LocalImageContent(url=str(image_path), local_path=str(image_path), source_prompt=style_prompt(base_prompt, style)))
+    return images
+
+
+async def render_style_variations(
+    base_prompt: str,
+    styles: list[str],
+    image_format: ImageFormat,
+    mode: ImageGenerationMode = IMAGE_GENERATION_MODE,
+    label: str = "",
+) -> list[ImageContent | None]:
+    """Render style variations of one prompt, either fanned out or batched.
+
+    In batched mode, variations the model did not return are rendered individually,
+    so both modes return one image per style.
+
+    Args:
+        base_prompt: Prompt shared by all variations
+        styles: Style suffix of each variation ("" for the plain prompt)
+        image_format: Aspect ratio of all the images
+        mode: Rendering strategy
+        label: Human readable name used in error messages
+
+    Returns:
+        One image (or None on failure) per style, in order
+    """
+    match mode:
+        case ImageGenerationMode.FAN_OUT:
+            return await render_images([style_prompt(base_prompt, style) for style in styles], image_format, label=label, variations=styles)
+        case ImageGenerationMode.BATCHED:
+            try:
+                images = await asyncio.to_thread(_render_image_series, base_prompt, styles, image_format)
+            except Exception as exc:
+                print(f"Error generating batched {label} images, falling back to one prediction per image: {exc}")
+                images = [None] * len(styles)
+
+            missing_indexes = [index_image for index_image, image in enumerate(images) if image is None]
+            if missing_indexes:
+                missing_prompts = [style_prompt(base_prompt, styles[index_image]) for index_image in missing_indexes]
+                missing_styles = [styles[index_image] for index_image in missing_indexes]
+                fallback_images = await render_images(missing_prompts, image_format, label=label, variations=missing_styles)
+                for index_image, image in zip(missing_indexes, fallback_images, strict=True):
+                    images[index_image] = image
+            return images
+
+
+@pipe_func(name="generate_instagram_images")
+async def generate_instagram_images(working_memory: WorkingMemory) -> ListContent[ImageContent]:
     """Generate 5 Instagram image variations using Replicate's bytedance/seedream-4."""
-    
+
     # Get the Instagram posts from working memory
     instagram_posts = working_memory.get_stuff("instagram_posts")
-    
-    # We'll generate images for the first 2 variations (with images)
-    # The 3rd variation will be text-only
-    images = []
-    
-    # Create output directory
-    output_dir = Path("generated_images")
-    output_dir.mkdir(exist_ok=True)
-    
-    # Generate 5 variations for the first Instagram post
-    base_prompt = instagram_posts.content[0].image_prompt
-    
-    # Create 5 slightly different prompts
-    prompt_variations = [
-        base_prompt,
-        f"{base_prompt}, vibrant colors, high contrast",
-        f"{base_prompt}, soft lighting, pastel tones",
-        f"{base_prompt}, dramatic lighting, bold composition",
-        f"{base_prompt}, minimalist style, clean design"
-    ]
-    
-    for i, prompt in enumerate(prompt_variations):
-        try:
-            # Run the model
-            output = replicate.run(
-                "bytedance/seedream-4",
-                input={
-                    "size": "2K",
-                    "width": 1024,
-                    "height": 1024,
-                    "prompt": prompt,
-                    "max_images": 1,
-                    "image_input": [],
-                    "aspect_ratio": "1:1",
-                    "enhance_prompt": True,
-                    "sequential_image_generation": "disabled"
-                }
-            )
-            
-            # Get the image URL
-            if output and len(output) > 0:
-                image_url = output[0].url()
-                
-                # Save the image locally
-                image_path = output_dir / f"instagram_{i+1}.png"
-                with open(image_path, "wb") as file:
-                    file.write(output[0].read())
-                
-                # Create ImageContent with both URL and local path
-                images.append(ImageContent(
-                    url=image_url,
-                    local_path=str(image_path)
-                ))
-        except Exception as e:
-            print(f"Error generating image {i+1}: {e}")
-            # Continue with other images even if one fails
-            continue
-    
-    return images
 
+    # Generate 5 slightly different variations for the first Instagram post
+    base_prompt = instagram_posts.content.items[0].image_prompt
+
+    # Fanned out or batched depending on INSTAGRAM_IMAGE_MODE, identical inputs come from the cache
+    images = await render_style_variations(base_prompt, INSTAGRAM_STYLE_VARIATIONS, ImageFormat.SQUARE, label="Instagram")
+    return ListContent[ImageContent](items=[image for image in images if image is not None])
 
-@func_registry.register("generate_linkedin_images")
-async def generate_linkedin_images(working_memory: WorkingMemory) -> list[ImageContent]:
+
+@pipe_func(name="generate_linkedin_images")
+async def generate_linkedin_images(working_memory: WorkingMemory) -> ListContent[ImageContent]:
     """Generate 2 LinkedIn images using Replicate's bytedance/seedream-4."""
-    
+
     # Get the LinkedIn posts from working memory
-    linkedin_posts = working_memory.get_stuff("linkedin_posts")
-    
-    images = []
-    
-    # Create output directory
-    output_dir = Path("generated_images")
-    output_dir.mkdir(exist_ok=True)
-    
+    linkedin_posts = working_memory.get_stuff("linkedin_posts").content.items
+
     # Generate images for the first 2 LinkedIn posts (3rd is text-only)
-    for i in range(2):
-        if i >= len(linkedin_posts.content):
-            break
-            
-        prompt = linkedin_posts.content[i].image_prompt
-        
-        if not prompt:
-            continue
-        
-        try:
-            # Run the model with 16:9 aspect ratio for LinkedIn
-            output = replicate.run(
-                "bytedance/seedream-4",
-                input={
-                    "size": "2K",
-                    "width": 1024,
-                    "height": 576,  # 16:9 ratio
-                    "prompt": prompt,
-                    "max_images": 1,
-                    "image_input": [],
-                    "aspect_ratio": "16:9",
-                    "enhance_prompt": True,
-                    "sequential_image_generation": "disabled"
-                }
-            )
-            
-            # Get the image URL
-            if output and len(output) > 0:
-                image_url = output[0].url()
-                
-                # Save the image locally
-                image_path = output_dir / f"linkedin_{i+1}.png"
-                with open(image_path, "wb") as file:
-                    file.write(output[0].read())
-                
-                # Create ImageContent
-                images.append(ImageContent(
-                    url=image_url,
-                    local_path=str(image_path)
-                ))
-        except Exception as e:
-            print(f"Error generating LinkedIn image {i+1}: {e}")
-            continue
-    
-    return images
+    prompts = [post.image_prompt for post in linkedin_posts[:2] if post.image_prompt]
 
+    # 16:9 aspect ratio for LinkedIn
+    images = await render_images(prompts, ImageFormat.LANDSCAPE, label="LinkedIn")
+    return ListContent[ImageContent](items=[image for image in images if image is not None])
 
-@func_registry.register("generate_instagram_audio")
+
+@pipe_func(name="generate_instagram_audio")
 async def generate_instagram_audio(working_memory: WorkingMemory) -> TextContent:
-    """Generate voiceover for Instagram post using Replicate's minimax/speech-02-hd."""
-    
+    """Generate voiceovers for all Instagram posts using Replicate's minimax/speech-02-hd."""
+
     # Get the Instagram posts from working memory
-    instagram_posts = working_memory.get_stuff("instagram_posts")
-    
-    # Use the caption from the first Instagram post as the script
-    script = instagram_posts.content[0].caption
-    
-    # Create output directory
-    output_dir = Path("generated_audio")
-    output_dir.mkdir(exist_ok=True)
-    
+    instagram_posts = working_memory.get_stuff("instagram_posts").content.items
+
+    # Use the caption of each Instagram post as its script
+    scripts = [post.caption for post in instagram_posts]
+
     try:
-        # Run the model
-        output = replicate.run(
-            "minimax/speech-02-hd",
-            input={
-                "text": script,
-                "pitch": 0,
-                "speed": 1,
-                "volume": 1,
-                "bitrate": 128000,
-                "channel": "mono",
-                "emotion": "happy",
-                "voice_id": "Friendly_Person",
-                "sample_rate": 32000,
-                "language_boost": "English",
-                "english_normalization": True
-            }
-        )
-        
-        # Get the audio URL
-        audio_url = output.url()
-        
-        # Save the audio locally
-        audio_path = output_dir / "instagram_voiceover.mp3"
-        with open(audio_path, "wb") as file:
-            file.write(output.read())
-        
-        return TextContent(text=f"Audio generated: {audio_url}")
-    
+        # Sentences are synthesized in parallel and cached, so an edited caption only re-synthesizes what changed
+        audio_paths = await synthesize_voiceovers(scripts)
     except Exception as e:
         print(f"Error generating audio: {e}")
         return TextContent(text=f"Audio generation error: {str(e)}")
+
+    lines = [
+        f"Post {index_post + 1}: {audio_path if audio_path is not None else 'audio generation failed'}"
+        for index_post, audio_path in enumerate(audio_paths)
+    ]
+    return TextContent(text="Audio generated:\n" + "\n".join(lines))
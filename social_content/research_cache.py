@@ -0,0 +1,114 @@
+"""Persistent TTL cache of competitor research, keyed by the normalized company input."""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+from social_content.media_cache import DEFAULT_CACHE_DIR
+from social_content.social_content_struct import CompanyInput, MarketResearch
+
+# How long a research result stays valid
+RESEARCH_CACHE_TTL_SECONDS = float(os.getenv("RESEARCH_CACHE_TTL_HOURS", "24")) * 3600
+
+# Bump when the research_competitors prompt or model changes, to invalidate older entries
+RESEARCH_CACHE_VERSION = 1
+
+
+def _normalize(text: str) -> str:
+    """Case- and whitespace-insensitive form of a field."""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+@dataclass(frozen=True)
+class ResearchCacheStats:
+    """Snapshot of the research cache counters of this process."""
+
+    hits: int
+    misses: int
+    refreshes: int
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+
+class ResearchCache:
+    """Stores MarketResearch per (company name, topic, brand voice), for `ttl_seconds`."""
+
+    def __init__(self, db_path: Path = DEFAULT_CACHE_DIR / "research.sqlite", ttl_seconds: float = RESEARCH_CACHE_TTL_SECONDS):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS research (key TEXT PRIMARY KEY, research TEXT NOT NULL, created_at REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def make_key(company_input: CompanyInput) -> str:
+        fields = {
+            "version": RESEARCH_CACHE_VERSION,
+            "company_name": _normalize(company_input.company_name),
+            "topic": _normalize(company_input.topic),
+            "brand_voice": _normalize(company_input.brand_voice),
+        }
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, company_input: CompanyInput) -> MarketResearch | None:
+        """Return the research of a company input if it is younger than the TTL."""
+        key = self.make_key(company_input)
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT research, created_at FROM research WHERE key = ?", (key,)).fetchone()
+            if row is not None and time.time() - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM research WHERE key = ?", (key,))
+                row = None
+        with self._lock:
+            if row is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        if row is None:
+            return None
+        return MarketResearch.model_validate_json(row[0])
+
+    def put(self, company_input: CompanyInput, research: MarketResearch, is_refresh: bool = False) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO research (key, research, created_at) VALUES (?, ?, ?)",
+                (self.make_key(company_input), research.model_dump_json(), time.time()),
+            )
+        if is_refresh:
+            with self._lock:
+                self._refreshes += 1
+
+    def stats(self) -> ResearchCacheStats:
+        with self._lock:
+            return ResearchCacheStats(hits=self._hits, misses=self._misses, refreshes=self._refreshes)
+
+
+_research_cache: ResearchCache | None = None
+_research_cache_lock = threading.Lock()
+
+
+def get_research_cache() -> ResearchCache:
+    """Return the process-wide research cache, stored next to the media cache."""
+    global _research_cache
+    with _research_cache_lock:
+        if _research_cache is None:
+            _research_cache = ResearchCache()
+    return _research_cache
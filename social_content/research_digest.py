@@ -0,0 +1,122 @@
+"""Deterministic compaction of competitor research before it is injected into the platform prompts.
+
+The research is pasted into the Instagram, Twitter and LinkedIn prompts, so its
+input tokens are paid three times per run. The digest keeps the same
+MarketResearch shape (the prompts are unchanged) but drops repeated sentences and
+keeps the leading sentences of each field, within a token budget.
+"""
+
+import math
+import os
+import re
+from dataclasses import dataclass
+
+from social_content.social_content_struct import CompetitorInsight, MarketResearch
+from social_content.voiceover import SENTENCE_BOUNDARY
+
+# Whether the platform prompts get the digest instead of the full research
+USE_RESEARCH_DIGEST = os.getenv("RESEARCH_DIGEST", "false").lower() in ("1", "true", "yes")
+
+# Token budget of the rendered digest
+RESEARCH_DIGEST_MAX_TOKENS = int(os.getenv("RESEARCH_DIGEST_MAX_TOKENS", "600"))
+
+# Competitors kept in the digest, in research order
+RESEARCH_DIGEST_MAX_COMPETITORS = 5
+
+# Character budgets per field before scaling down to the token budget
+_INSIGHT_FIELD_CHARS = 240
+_SUMMARY_FIELD_CHARS = 800
+
+# Budgets stop shrinking at this share of their initial size
+_MIN_BUDGET_SCALE = 0.1
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, about 4 characters per token for English."""
+    return math.ceil(len(text) / 4)
+
+
+def _sentence_key(sentence: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", sentence.casefold()).strip()
+
+
+def _compact_field(text: str, max_chars: int, seen_sentences: set[str]) -> str:
+    """Keep the leading sentences of a field that fit in `max_chars`, skipping ones already seen.
+
+    A first sentence longer than the budget is cut at a word boundary.
+    """
+    kept_sentences: list[str] = []
+    nb_chars = 0
+    for sentence in SENTENCE_BOUNDARY.split(text.strip()):
+        # List markers and extra spaces cost tokens without carrying content
+        sentence = re.sub(r"\s+", " ", sentence.lstrip("-•* ")).strip()
+        sentence_key = _sentence_key(sentence)
+        if not sentence_key or sentence_key in seen_sentences:
+            continue
+        if nb_chars + len(sentence) + 1 > max_chars:
+            if not kept_sentences:
+                kept_sentences.append(sentence[:max_chars].rsplit(" ", 1)[0] + "…")
+            break
+        seen_sentences.add(sentence_key)
+        kept_sentences.append(sentence)
+        nb_chars += len(sentence) + 1
+    return " ".join(kept_sentences)
+
+
+def _compact_research(research: MarketResearch, scale: float) -> MarketResearch:
+    seen_sentences: set[str] = set()
+    insight_chars = int(_INSIGHT_FIELD_CHARS * scale)
+    summary_chars = int(_SUMMARY_FIELD_CHARS * scale)
+    # Trends and recommendations go first, so a sentence they repeat is dropped from the insights instead
+    key_trends = _compact_field(research.key_trends, summary_chars, seen_sentences)
+    recommendations = _compact_field(research.recommendations, summary_chars, seen_sentences)
+    insights = [
+        CompetitorInsight(
+            competitor_name=insight.competitor_name.strip(),
+            content_style=_compact_field(insight.content_style, insight_chars, seen_sentences),
+            engagement_tactics=_compact_field(insight.engagement_tactics, insight_chars, seen_sentences),
+        )
+        for insight in research.insights[:RESEARCH_DIGEST_MAX_COMPETITORS]
+    ]
+    return MarketResearch(insights=insights, key_trends=key_trends, recommendations=recommendations)
+
+
+@dataclass(frozen=True)
+class ResearchDigest:
+    """Compacted research and its estimated size as rendered in the prompts."""
+
+    research: MarketResearch
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def saved_ratio(self) -> float:
+        if self.tokens_before == 0:
+            return 0.0
+        return 1 - self.tokens_after / self.tokens_before
+
+
+def compact_research(research: MarketResearch, max_tokens: int = RESEARCH_DIGEST_MAX_TOKENS) -> ResearchDigest:
+    """Compact research to fit `max_tokens`, the same input always giving the same digest.
+
+    Field budgets are scaled down until the rendered digest fits, or reach their floor.
+
+    Args:
+        research: Full competitor research
+        max_tokens: Token budget of the rendered digest
+
+    Returns:
+        The digest, with the estimated token counts before and after
+    """
+    tokens_before = estimate_tokens(research.rendered_plain())
+    scale = 1.0
+    while True:
+        digest_research = _compact_research(research, scale)
+        tokens_after = estimate_tokens(digest_research.rendered_plain())
+        if tokens_after <= max_tokens or scale <= _MIN_BUDGET_SCALE:
+            break
+        scale = max(_MIN_BUDGET_SCALE, scale * 0.8)
+    if tokens_after >= tokens_before:
+        # Already compact: keep the research as is
+        digest_research, tokens_after = research, tokens_before
+    return ResearchDigest(research=digest_research, tokens_before=tokens_before, tokens_after=tokens_after)
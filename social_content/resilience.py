@@ -0,0 +1,251 @@
+"""Bounded retries, jittered backoff, deadlines and hedged requests for slow remote calls."""
+
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import TypeVar
+
+ResultT = TypeVar("ResultT")
+
+# Number of recent latencies kept per key to estimate the hedging threshold
+LATENCY_WINDOW = 256
+
+# Longest uninterrupted wait, so a caller's cancellation is noticed promptly
+_POLL_SECONDS = 0.25
+
+
+class DeadlineExceededError(TimeoutError):
+    """The call did not succeed before its deadline, retries included."""
+
+
+class CallCancelledError(Exception):
+    """The call was cancelled by its caller, or lost a hedging race."""
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    """How hard to try before giving up on a call.
+
+    Attributes:
+        max_attempts: Attempts per call, the first one included
+        base_backoff_seconds: Backoff cap of the first retry, doubled on each following one
+        max_backoff_seconds: Upper bound of the backoff cap
+        deadline_seconds: Total time budget of a call, backoffs included
+        hedge: Whether to send a duplicate request once an attempt is slower than the hedge quantile
+        hedge_quantile: Latency quantile after which the duplicate is sent
+        min_latency_samples: Successful calls needed before the quantile is trusted
+    """
+
+    max_attempts: int = 3
+    base_backoff_seconds: float = 1.0
+    max_backoff_seconds: float = 20.0
+    deadline_seconds: float = 300.0
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    min_latency_samples: int = 20
+
+    @classmethod
+    def make_from_env(cls) -> "ResiliencePolicy":
+        """Read the policy from the MEDIA_* env variables."""
+        return cls(
+            max_attempts=int(os.getenv("MEDIA_MAX_ATTEMPTS", "3")),
+            base_backoff_seconds=float(os.getenv("MEDIA_BACKOFF_SECONDS", "1.0")),
+            max_backoff_seconds=float(os.getenv("MEDIA_MAX_BACKOFF_SECONDS", "20.0")),
+            deadline_seconds=float(os.getenv("MEDIA_DEADLINE_SECONDS", "300")),
+            hedge=os.getenv("MEDIA_HEDGE", "false").lower() in ("1", "true", "yes"),
+            hedge_quantile=float(os.getenv("MEDIA_HEDGE_QUANTILE", "0.95")),
+            min_latency_samples=int(os.getenv("MEDIA_HEDGE_MIN_SAMPLES", "20")),
+        )
+
+    def backoff_seconds(self, index_retry: int, rng: random.Random) -> float:
+        """Full-jitter backoff: uniform between 0 and an exponentially growing cap."""
+        cap = min(self.max_backoff_seconds, self.base_backoff_seconds * 2**index_retry)
+        return rng.uniform(0, cap)
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, per key (e.g. per model)."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies[key].append(seconds)
+
+    def quantile(self, key: str, quantile: float, min_samples: int = 1) -> float | None:
+        """Return the latency quantile of a key, or None if fewer than `min_samples` were recorded."""
+        with self._lock:
+            latencies = sorted(self._latencies[key])
+        if not latencies or len(latencies) < min_samples:
+            return None
+        index_quantile = min(len(latencies) - 1, int(quantile * len(latencies)))
+        return latencies[index_quantile]
+
+
+@dataclass(frozen=True)
+class ResilienceStats:
+    """Snapshot of what the resilience layer had to do."""
+
+    calls: int
+    retries: int
+    hedges: int
+    hedge_wins: int
+    deadlines_exceeded: int
+
+
+class ResilientCaller:
+    """Runs blocking calls with bounded retries, jittered backoff, a deadline and optional hedging.
+
+    Each attempt runs in a worker thread and receives a cancellation event: the
+    callee is expected to abort (and release remote resources) once it is set.
+    With hedging on, an attempt still running after the recent p95 latency of its
+    key gets a duplicate; the first one to succeed wins and the other is cancelled.
+    """
+
+    def __init__(
+        self,
+        is_retryable: Callable[[BaseException], bool],
+        policy: ResiliencePolicy | None = None,
+        latency_tracker: LatencyTracker | None = None,
+        max_workers: int = 64,
+    ):
+        self.is_retryable = is_retryable
+        self.policy = policy or ResiliencePolicy.make_from_env()
+        self.latency_tracker = latency_tracker or LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resilient-call")
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = defaultdict(int)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def stats(self) -> ResilienceStats:
+        with self._lock:
+            return ResilienceStats(
+                calls=self._counts["calls"],
+                retries=self._counts["retries"],
+                hedges=self._counts["hedges"],
+                hedge_wins=self._counts["hedge_wins"],
+                deadlines_exceeded=self._counts["deadlines_exceeded"],
+            )
+
+    def call(
+        self,
+        key: str,
+        func: Callable[[threading.Event], ResultT],
+        cancel_event: threading.Event | None = None,
+    ) -> ResultT:
+        """Run `func` until it succeeds, fails for good, or the deadline passes (blocking).
+
+        Args:
+            key: Name of the remote operation, latencies are tracked per key
+            func: The call, taking the cancellation event of its attempt
+            cancel_event: Set by the caller to abandon the call
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            DeadlineExceededError: No attempt succeeded within the deadline
+            CallCancelledError: The caller set `cancel_event`
+            Exception: The last error, if it is not retryable or attempts ran out
+        """
+        self._count("calls")
+        deadline = time.monotonic() + self.policy.deadline_seconds
+        max_attempts = max(1, self.policy.max_attempts)
+        for index_attempt in range(max_attempts):
+            try:
+                return self._attempt(key, func, deadline, cancel_event)
+            except (DeadlineExceededError, CallCancelledError):
+                raise
+            except Exception as exc:
+                if not self.is_retryable(exc) or index_attempt + 1 >= max_attempts:
+                    raise
+                delay = self.policy.backoff_seconds(index_attempt, self._random)
+                if time.monotonic() + delay >= deadline:
+                    self._count("deadlines_exceeded")
+                    raise DeadlineExceededError(f"{key}: no time left to retry after: {exc}") from exc
+                print(f"Retrying {key} in {delay:.1f}s (attempt {index_attempt + 2}/{max_attempts}) after error: {exc}")
+                self._count("retries")
+                if cancel_event is None:
+                    time.sleep(delay)
+                elif cancel_event.wait(delay):
+                    raise CallCancelledError(key) from exc
+        raise AssertionError("unreachable: the last attempt either returns or raises")
+
+    def _timed(self, key: str, func: Callable[[threading.Event], ResultT], attempt_cancel_event: threading.Event) -> ResultT:
+        start_time = time.monotonic()
+        result = func(attempt_cancel_event)
+        self.latency_tracker.record(key, time.monotonic() - start_time)
+        return result
+
+    def _attempt(
+        self,
+        key: str,
+        func: Callable[[threading.Event], ResultT],
+        deadline: float,
+        cancel_event: threading.Event | None,
+    ) -> ResultT:
+        """Run one attempt, plus its hedged duplicate if it gets slow."""
+        # Time at which a duplicate is sent if the attempt is still running, if hedging applies
+        hedge_at: float | None = None
+        if self.policy.hedge:
+            hedge_after = self.latency_tracker.quantile(key, self.policy.hedge_quantile, self.policy.min_latency_samples)
+            if hedge_after is not None:
+                hedge_at = time.monotonic() + hedge_after
+
+        attempt_cancel_events: list[threading.Event] = []
+        futures: list[Future[ResultT]] = []
+
+        def launch() -> None:
+            attempt_cancel_event = threading.Event()
+            attempt_cancel_events.append(attempt_cancel_event)
+            futures.append(self._executor.submit(self._timed, key, func, attempt_cancel_event))
+
+        launch()
+        pending: set[Future[ResultT]] = set(futures)
+        last_error: BaseException | None = None
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline:
+                    self._count("deadlines_exceeded")
+                    raise DeadlineExceededError(f"{key}: no result after {self.policy.deadline_seconds:.0f}s")
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CallCancelledError(key)
+
+                timeout = min(deadline - now, _POLL_SECONDS)
+                if hedge_at is not None:
+                    timeout = min(timeout, max(0.0, hedge_at - now))
+
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    error = future.exception()
+                    if error is None:
+                        if future is not futures[0]:
+                            self._count("hedge_wins")
+                        return future.result()
+                    last_error = error
+
+                if pending and hedge_at is not None and time.monotonic() >= hedge_at:
+                    # The attempt is a straggler: race a duplicate against it
+                    self._count("hedges")
+                    hedge_at = None
+                    launch()
+                    pending.add(futures[-1])
+        finally:
+            # Cancel whatever is still running: the slower twin, or everything on error
+            for attempt_cancel_event in attempt_cancel_events:
+                attempt_cancel_event.set()
+
+        assert last_error is not None
+        raise last_error
@@ -0,0 +1,95 @@
+"""Resumable runs over many items: a bounded pool of workers, and append-only JSONL results files.
+
+Both the batch generation and the bulk analysis feed a fixed set of workers from a
+bounded queue, so memory stays flat however long the input is, and write each
+finished item right away, so an interrupted run resumes from where it stopped.
+"""
+
+import asyncio
+import json
+import os
+from collections.abc import Awaitable, Callable, Iterable
+from pathlib import Path
+from typing import Any, TextIO, TypeVar
+
+ItemT = TypeVar("ItemT")
+
+
+async def run_with_workers(items: Iterable[ItemT], process: Callable[[ItemT], Awaitable[None]], concurrency: int) -> None:
+    """Process items with `concurrency` workers pulling from a bounded queue.
+
+    The producer and the workers are awaited together: if processing an item
+    raises, everything else is cancelled and the error is raised here, rather
+    than the producer waiting forever for room in the queue.
+
+    Args:
+        items: Items to process, read lazily, at most twice `concurrency` ahead of the workers
+        process: Coroutine processing one item
+        concurrency: Items processed at the same time
+    """
+    concurrency = max(1, concurrency)
+    # A worker stops at the first None it gets, the producer puts one per worker after the items
+    item_queue: asyncio.Queue[tuple[ItemT] | None] = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def produce() -> None:
+        for item in items:
+            await item_queue.put((item,))
+        for _ in range(concurrency):
+            await item_queue.put(None)
+
+    async def worker() -> None:
+        while (queued := await item_queue.get()) is not None:
+            await process(queued[0])
+
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def load_completed_ids(output_path: Path, id_field: str, completed_status: str) -> set[str]:
+    """Return the ids of the records of a JSONL results file that reached `completed_status`.
+
+    A line cut short by a crash is ignored.
+
+    Args:
+        output_path: The JSONL results file, which may not exist yet
+        id_field: Field holding the id of a record
+        completed_status: Status of a record that must not be redone
+    """
+    completed_ids: set[str] = set()
+    if not output_path.exists():
+        return completed_ids
+    with output_path.open(encoding="utf-8") as output_file:
+        for line in output_file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == completed_status:
+                completed_ids.add(str(record[id_field]))
+    return completed_ids
+
+
+def open_jsonl_for_append(output_path: Path) -> TextIO:
+    """Open a JSONL results file for appending, created with its folder if needed.
+
+    A last line a crash cut short is terminated, so the next record starts on its own line.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_file = output_path.open("a", encoding="utf-8")
+    if output_file.tell() > 0:
+        with output_path.open("rb") as written_file:
+            written_file.seek(-1, os.SEEK_END)
+            if written_file.read(1) != b"\n":
+                output_file.write("\n")
+    return output_file
+
+
+def append_jsonl_record(output_file: TextIO, record: dict[str, Any]) -> None:
+    """Append a record and flush it to disk before the next one."""
+    output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    output_file.flush()
+    os.fsync(output_file.fileno())
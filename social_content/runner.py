@@ -0,0 +1,239 @@
+"""Run the social content pipeline, reusing cached competitor research when possible."""
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from pipelex.core.pipes.pipe_output import PipeOutput
+from pipelex.types import StrEnum
+
+from social_content.model_router import execute_routed_pipeline
+from social_content.research_cache import get_research_cache
+from social_content.research_digest import USE_RESEARCH_DIGEST, ResearchDigest, compact_research
+from social_content.social_content_struct import (
+    CompanyInput,
+    InstagramPost,
+    LinkedInPost,
+    MarketResearch,
+    SocialMediaContent,
+    TwitterPost,
+)
+
+
+@dataclass
+class SocialContentRun:
+    """Outcome of one content generation."""
+
+    research: MarketResearch
+    research_from_cache: bool
+    pipe_output: PipeOutput
+    digest: ResearchDigest | None = None  # set when the platform prompts got the compacted research
+
+    @property
+    def content(self) -> SocialMediaContent:
+        return self.pipe_output.main_stuff_as(content_type=SocialMediaContent)
+
+
+async def get_research(company_input: CompanyInput, force_refresh: bool = False) -> tuple[MarketResearch, bool]:
+    """Return the competitor research of a company input, from the cache unless refreshed.
+
+    Args:
+        company_input: Company, topic and brand voice
+        force_refresh: Run research_competitors even if a fresh cached result exists
+
+    Returns:
+        Tuple of (research, whether it came from the cache)
+    """
+    research_cache = get_research_cache()
+    if not force_refresh:
+        research = research_cache.get(company_input)
+        if research is not None:
+            return research, True
+
+    pipe_output = await execute_routed_pipeline(
+        pipe_code="research_competitors",
+        inputs={
+            "company_input": {
+                "concept": "social_content.CompanyInput",
+                "content": company_input,
+            }
+        },
+    )
+    research = pipe_output.main_stuff_as(content_type=MarketResearch)
+    research_cache.put(company_input, research, is_refresh=force_refresh)
+    return research, False
+
+
+def get_platform_research(research: MarketResearch, compact: bool) -> tuple[MarketResearch, ResearchDigest | None]:
+    """Return the research to inject into the platform prompts, compacted if asked."""
+    if not compact:
+        return research, None
+    digest = compact_research(research)
+    print(
+        f"Research digest: {digest.tokens_before} -> {digest.tokens_after} estimated tokens "
+        f"per platform prompt ({digest.saved_ratio:.0%} saved)"
+    )
+    return digest.research, digest
+
+
+async def run_social_content(
+    company_input: CompanyInput,
+    force_refresh: bool = False,
+    compact: bool = USE_RESEARCH_DIGEST,
+) -> SocialContentRun:
+    """Generate the social media content of a company input.
+
+    On a research cache hit, this goes straight to the parallel platform step.
+    The working memory of the returned pipe output holds `research`,
+    `instagram_posts`, `twitter` and `linkedin_posts`, like `generate_social_content`.
+
+    Args:
+        company_input: Company, topic and brand voice
+        force_refresh: Redo the competitor research even if it is cached
+        compact: Give the platform prompts a token-bounded digest of the research
+
+    Returns:
+        The full research and the pipeline output, whose `research` is the digest if compacted
+    """
+    research, research_from_cache = await get_research(company_input, force_refresh=force_refresh)
+    platform_research, digest = get_platform_research(research, compact=compact)
+    pipe_output = await execute_routed_pipeline(
+        pipe_code="generate_content_from_research",
+        inputs={
+            "company_input": {
+                "concept": "social_content.CompanyInput",
+                "content": company_input,
+            },
+            "research": {
+                "concept": "social_content.MarketResearch",
+                "content": platform_research,
+            },
+        },
+    )
+    return SocialContentRun(research=research, research_from_cache=research_from_cache, pipe_output=pipe_output, digest=digest)
+
+
+class StreamedResultName(StrEnum):
+    """Named results yielded by `stream_social_content`, as in the pipeline working memory."""
+
+    RESEARCH = "research"
+    INSTAGRAM_POSTS = "instagram_posts"
+    TWITTER = "twitter"
+    LINKEDIN_POSTS = "linkedin_posts"
+
+    @property
+    def pipe_code(self) -> str:
+        """Pipe producing this result."""
+        match self:
+            case StreamedResultName.RESEARCH:
+                return "research_competitors"
+            case StreamedResultName.INSTAGRAM_POSTS:
+                return "generate_instagram"
+            case StreamedResultName.TWITTER:
+                return "generate_twitter"
+            case StreamedResultName.LINKEDIN_POSTS:
+                return "generate_linkedin"
+
+
+PlatformResultContent = list[InstagramPost] | TwitterPost | list[LinkedInPost]
+
+# How each platform result is read from the output of its pipe
+_PLATFORM_RESULT_READERS: dict[StreamedResultName, Callable[[PipeOutput], PlatformResultContent]] = {
+    StreamedResultName.INSTAGRAM_POSTS: lambda pipe_output: list(pipe_output.main_stuff_as_list(item_type=InstagramPost).items),
+    StreamedResultName.TWITTER: lambda pipe_output: pipe_output.main_stuff_as(content_type=TwitterPost),
+    StreamedResultName.LINKEDIN_POSTS: lambda pipe_output: list(pipe_output.main_stuff_as_list(item_type=LinkedInPost).items),
+}
+
+PLATFORM_RESULT_NAMES = list(_PLATFORM_RESULT_READERS)
+
+
+@dataclass
+class StreamedResult:
+    """One named result of a streamed generation."""
+
+    name: StreamedResultName
+    content: MarketResearch | PlatformResultContent
+    from_cache: bool = False
+    digest: ResearchDigest | None = None  # research result only, when the platform prompts got a digest
+
+
+async def _run_platform_pipe(
+    name: StreamedResultName,
+    read_result: Callable[[PipeOutput], PlatformResultContent],
+    company_input: CompanyInput,
+    research: MarketResearch,
+) -> StreamedResult:
+    pipe_output = await execute_routed_pipeline(
+        pipe_code=name.pipe_code,
+        inputs={
+            "company_input": {
+                "concept": "social_content.CompanyInput",
+                "content": company_input,
+            },
+            "research": {
+                "concept": "social_content.MarketResearch",
+                "content": research,
+            },
+        },
+    )
+    return StreamedResult(name=name, content=read_result(pipe_output))
+
+
+async def stream_social_content(
+    company_input: CompanyInput,
+    force_refresh: bool = False,
+    compact: bool = USE_RESEARCH_DIGEST,
+) -> AsyncIterator[StreamedResult]:
+    """Generate the social media content of a company input, yielding each result as soon as it lands.
+
+    The research comes first (from the cache when fresh), then each platform post set
+    in completion order, so callers can render the fastest branch without waiting for
+    the slowest. The platform pipes run concurrently as separate pipelines, which is
+    what `generate_all_content` does in one pipeline.
+
+    Args:
+        company_input: Company, topic and brand voice
+        force_refresh: Redo the competitor research even if it is cached
+        compact: Give the platform prompts a token-bounded digest of the research
+
+    Yields:
+        The research, then the Instagram, Twitter and LinkedIn results in completion order
+    """
+    research, research_from_cache = await get_research(company_input, force_refresh=force_refresh)
+    platform_research, digest = get_platform_research(research, compact=compact)
+    yield StreamedResult(name=StreamedResultName.RESEARCH, content=research, from_cache=research_from_cache, digest=digest)
+
+    tasks = [
+        asyncio.create_task(_run_platform_pipe(name, read_result, company_input, platform_research))
+        for name, read_result in _PLATFORM_RESULT_READERS.items()
+    ]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        # The consumer stopped early or a branch failed: do not leave the other branches running
+        for task in tasks:
+            task.cancel()
+
+
+async def assemble_streamed_results(results: dict[StreamedResultName, Any]) -> SocialMediaContent:
+    """Package the platform results of `stream_social_content` with the `combine_content` pipe."""
+    pipe_output = await execute_routed_pipeline(
+        pipe_code="combine_content",
+        inputs={
+            "instagram_posts": {
+                "concept": "social_content.InstagramPost",
+                "content": results[StreamedResultName.INSTAGRAM_POSTS],
+            },
+            "twitter": {
+                "concept": "social_content.TwitterPost",
+                "content": results[StreamedResultName.TWITTER],
+            },
+            "linkedin_posts": {
+                "concept": "social_content.LinkedInPost",
+                "content": results[StreamedResultName.LINKEDIN_POSTS],
+            },
+        },
+    )
+    return pipe_output.main_stuff_as(content_type=SocialMediaContent)
@@ -1,5 +1,6 @@
 """Structured content models for social media generation."""
 
+from pipelex.core.stuffs.image_content import ImageContent
 from pipelex.core.stuffs.structured_content import StructuredContent
 from pydantic import Field
 
@@ -58,3 +59,9 @@ class SocialMediaContent(StructuredContent):
     instagram: list[InstagramPost] = Field(description="Instagram post variations (3 versions)")
     twitter: TwitterPost = Field(description="Twitter post content")
     linkedin: list[LinkedInPost] = Field(description="LinkedIn post variations (3 versions)")
+
+
+class LocalImageContent(ImageContent):
+    """Generated image, with the path of its file on disk."""
+
+    local_path: str = Field(description="Path of the image file in the media cache")
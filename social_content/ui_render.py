@@ -0,0 +1,54 @@
+"""Streamlit views shared by the content generation app and page."""
+
+import streamlit as st
+
+from social_content.research_digest import ResearchDigest
+from social_content.runner import StreamedResultName
+from social_content.social_content_struct import MarketResearch
+
+
+def render_research(research: MarketResearch, from_cache: bool = False, digest: ResearchDigest | None = None):
+    """Show the competitor research summary."""
+    if from_cache:
+        st.info("♻️ Reusing cached competitor research for this company, topic and voice")
+    if digest is not None:
+        st.caption(f"✂️ Research digest: {digest.tokens_before} → {digest.tokens_after} estimated tokens per platform prompt ({digest.saved_ratio:.0%} saved)")
+    st.markdown('<div class="success-box">', unsafe_allow_html=True)
+    st.markdown("### 🎯 Competitor Research Complete!")
+    st.markdown(f"**Analyzed {len(research.insights)} top competitors in your industry**")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Show competitors
+    st.markdown("#### 📊 Competitors Analyzed:")
+    cols = st.columns(min(3, len(research.insights)))
+    for idx, insight in enumerate(research.insights):
+        with cols[idx % 3]:
+            st.markdown(f"""
+            <div class="competitor-card">
+                <strong>{insight.competitor_name}</strong><br>
+                <small><em>{insight.content_style[:80]}...</em></small>
+            </div>
+            """, unsafe_allow_html=True)
+
+    # Key trends
+    with st.expander("🔑 Key Trends & Recommendations", expanded=False):
+        st.markdown(f"**Key Trends:**\n{research.key_trends}")
+        st.markdown(f"**Recommendations:**\n{research.recommendations}")
+
+
+def render_post_preview(result_name: StreamedResultName, posts):
+    """Show the text of freshly generated posts while the rest is still running."""
+    match result_name:
+        case StreamedResultName.INSTAGRAM_POSTS:
+            for idx, post in enumerate(posts, 1):
+                st.markdown(f"**✨ Variation {idx}: {post.variation_angle.title()}**")
+                st.write(post.caption)
+        case StreamedResultName.TWITTER:
+            st.write(posts.tweet_text)
+        case StreamedResultName.LINKEDIN_POSTS:
+            for idx, post in enumerate(posts, 1):
+                st.markdown(f"**💼 Variation {idx}: {post.variation_angle.title()}**")
+                st.write(post.post_text)
+        case StreamedResultName.RESEARCH:
+            return
+    st.caption("🎨 Images are on their way...")
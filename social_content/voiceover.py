@@ -0,0 +1,210 @@
+"""Segmented text-to-speech: sentences are synthesized in parallel, cached one by one, then joined."""
+
+import asyncio
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from social_content.media_backend import MAX_CONCURRENT_PREDICTIONS, SPEECH_MODEL, build_speech_input, get_media_backend
+from social_content.media_cache import MediaCache, get_media_cache
+
+# A sentence ends with . ! ? or … (optionally followed by closing quotes or brackets), or at a line break
+SENTENCE_BOUNDARY = re.compile(r"(?:(?<=[.!?…])|(?<=[.!?…][\"'”’)\]]))\s+|\s*\n+\s*")
+
+# Bumped when the way segments are joined changes, so joined voiceovers cached before are not served
+VOICEOVER_JOIN_VERSION = 2
+
+# VBR tags written by encoders in a first, silent frame, describing the length of their own file
+_VBR_TAG_IDS = (b"Xing", b"Info", b"VBRI")
+
+# Layer III bitrates in kbps by bitrate index, for MPEG-1 then for MPEG-2 and 2.5
+_LAYER3_BITRATES = (
+    (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+)
+
+# Sample rates in Hz by sample rate index, per MPEG version bits (0: MPEG-2.5, 2: MPEG-2, 3: MPEG-1)
+_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+
+@dataclass(frozen=True)
+class VoiceSettings:
+    """Voice parameters of minimax/speech-02-hd, shared by every segment of a voiceover."""
+
+    voice_id: str = "Friendly_Person"
+    emotion: str = "happy"
+    speed: float = 1
+
+    def build_input(self, text: str) -> dict[str, object]:
+        return build_speech_input(text, voice_id=self.voice_id, emotion=self.emotion, speed=self.speed)
+
+
+def is_speakable(sentence: str) -> bool:
+    """Whether a sentence has something to read aloud: a letter or a digit, not only emojis or punctuation."""
+    return any(character.isalnum() for character in sentence)
+
+
+def split_sentences(script: str) -> list[str]:
+    """Split a script into sentences, dropping fragments with nothing to read aloud.
+
+    Args:
+        script: Text to read aloud
+
+    Returns:
+        Sentences in reading order
+    """
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(script) if is_speakable(sentence)]
+
+
+def _synthesize_segment(text: str, voice: VoiceSettings) -> Path:
+    """Synthesize one sentence, or reuse its cached audio (blocking).
+
+    The cache key covers the text and every voice setting, so a segment is only
+    re-synthesized when one of them changes.
+
+    Returns:
+        Path of the cached MP3 file
+    """
+    model_input = voice.build_input(text)
+    media_cache = get_media_cache()
+    cache_key = MediaCache.make_key(SPEECH_MODEL, model_input)
+
+    audio_path = media_cache.get(cache_key)
+    if audio_path is None:
+        media_backend = get_media_backend()
+        output_urls = media_backend.predict(SPEECH_MODEL, model_input)
+        audio_path = media_cache.put_stream(cache_key, media_backend.iter_output(output_urls[0]), suffix=".mp3")
+
+    return audio_path
+
+
+def _id3v2_size(data: bytes) -> int:
+    """Length of the ID3v2 tag opening an MP3, 0 if there is none."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    # Synchsafe integer: 7 bits per byte
+    tag_size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    has_footer = data[5] & 0x10
+    return 10 + tag_size + (10 if has_footer else 0)
+
+
+def _vbr_tag_frame_size(data: bytes, offset: int) -> int:
+    """Length of the Layer III frame at `offset` if it holds a Xing, Info or VBRI tag, else 0."""
+    header = data[offset : offset + 4]
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return 0
+    version_bits = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version_bits == 1 or layer_bits != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return 0
+    is_mpeg1 = version_bits == 3
+    is_mono = header[3] >> 6 == 3
+    side_info_size = (17 if is_mono else 32) if is_mpeg1 else (9 if is_mono else 17)
+    tag_offsets = (offset + 4 + side_info_size, offset + 36)
+    if not any(data[tag_offset : tag_offset + 4] in _VBR_TAG_IDS for tag_offset in tag_offsets):
+        return 0
+    bitrate = _LAYER3_BITRATES[0 if is_mpeg1 else 1][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (header[2] >> 1) & 0x01
+    return (144 if is_mpeg1 else 72) * bitrate // sample_rate + padding
+
+
+def strip_mp3_segment(data: bytes, is_first: bool, is_last: bool) -> bytes:
+    """Keep the audio frames of a segment MP3 that is joined to others.
+
+    The Xing/Info/VBRI frame is dropped from every segment, as it gives the length
+    of its segment only and would make players cut the joined track short. ID3v2
+    tags are only kept on the first segment and ID3v1 tags on the last, so no tag
+    lands between audio frames.
+
+    Args:
+        data: Content of the segment MP3
+        is_first: The segment opens the voiceover
+        is_last: The segment closes the voiceover
+
+    Returns:
+        The bytes to write to the joined file
+    """
+    id3v2_size = _id3v2_size(data)
+    vbr_tag_frame_size = _vbr_tag_frame_size(data, id3v2_size)
+    end = len(data)
+    if not is_last and end - id3v2_size >= 128 and data[-128:-125] == b"TAG":
+        end -= 128
+    audio_frames = data[id3v2_size + vbr_tag_frame_size : end]
+    return data[:id3v2_size] + audio_frames if is_first else audio_frames
+
+
+def _join_segments(segment_paths: list[Path]) -> Path:
+    """Concatenate segment MP3s into one voiceover stored in the media cache (blocking).
+
+    MP3 files are sequences of self-contained frames, so once the per-file tags are
+    stripped (see `strip_mp3_segment`) their frames play back as one track. The
+    joined file is cached under the list of its segments and named after its
+    content hash, so voiceovers never overwrite each other.
+
+    Returns:
+        Path of the joined MP3 file
+    """
+    media_cache = get_media_cache()
+    cache_key = MediaCache.make_key(
+        "voiceover",
+        {"segments": [segment_path.name for segment_path in segment_paths], "join_version": VOICEOVER_JOIN_VERSION},
+    )
+
+    voiceover_path = media_cache.get(cache_key)
+    if voiceover_path is None:
+        last_index_segment = len(segment_paths) - 1
+        chunks = (
+            strip_mp3_segment(segment_path.read_bytes(), is_first=index_segment == 0, is_last=index_segment == last_index_segment)
+            for index_segment, segment_path in enumerate(segment_paths)
+        )
+        voiceover_path = media_cache.put_stream(cache_key, chunks, suffix=".mp3")
+    return voiceover_path
+
+
+async def synthesize_voiceovers(scripts: list[str], voice: VoiceSettings | None = None) -> list[Path | None]:
+    """Synthesize the voiceovers of several scripts in one job.
+
+    Every script is split into sentences, skipping those with nothing to read aloud
+    (e.g. a line of emojis), and the distinct sentences of all scripts are
+    synthesized concurrently (at most MAX_CONCURRENT_PREDICTIONS at once), so a sentence
+    shared by two scripts is only synthesized once. Each voiceover is then joined from
+    its segments. A script with a failed segment is reported and comes back as None.
+
+    Args:
+        scripts: Texts to read aloud
+        voice: Voice parameters, defaults to VoiceSettings()
+
+    Returns:
+        Path of each voiceover (or None on failure), in the same order as the scripts
+    """
+    voice = voice or VoiceSettings()
+    script_sentences = [split_sentences(script) for script in scripts]
+    unique_sentences = list(dict.fromkeys(sentence for sentences in script_sentences for sentence in sentences))
+    semaphore = asyncio.Semaphore(max(1, MAX_CONCURRENT_PREDICTIONS))
+
+    async def synthesize_one(sentence: str) -> Path | None:
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(_synthesize_segment, sentence, voice)
+            except Exception as exc:
+                print(f"Error generating audio segment '{sentence[:40]}': {exc}")
+                return None
+
+    segment_paths = await asyncio.gather(*(synthesize_one(sentence) for sentence in unique_sentences))
+    path_by_sentence = dict(zip(unique_sentences, segment_paths, strict=True))
+
+    voiceover_paths: list[Path | None] = []
+    for index_script, sentences in enumerate(script_sentences):
+        paths = [path_by_sentence[sentence] for sentence in sentences]
+        if not paths or None in paths:
+            voiceover_paths.append(None)
+            continue
+        try:
+            voiceover_paths.append(await asyncio.to_thread(_join_segments, [path for path in paths if path is not None]))
+        except Exception as exc:
+            print(f"Error joining voiceover {index_script + 1}: {exc}")
+            voiceover_paths.append(None)
+    return voiceover_paths
@@ -0,0 +1,26 @@
+"""Deterministic pipe functions assembling the post analysis."""
+
+from pipelex.core.memory.working_memory import WorkingMemory
+from pipelex.system.registries.func_registry import pipe_func
+
+from social_media_analysis.analytics_struct import AnalysisOutput, Baselines, Diagnostics, PostKPIs, Recommendation
+
+
+@pipe_func(name="assemble_analysis")
+def assemble_analysis(working_memory: WorkingMemory) -> AnalysisOutput:
+    """Package the analysis components into AnalysisOutput, without an LLM round trip."""
+
+    # The components are already typed in working memory, so the KPIs and baselines pass through unchanged
+    kpis = working_memory.get_stuff_as("kpis", content_type=PostKPIs)
+    baselines = working_memory.get_stuff_as("baselines", content_type=Baselines)
+    diagnostics = working_memory.get_stuff_as("diagnostics", content_type=Diagnostics)
+    recommendations = working_memory.get_stuff_as_list("recommendations", item_type=Recommendation).items
+    summary = working_memory.get_stuff_as_str("summary")
+
+    return AnalysisOutput(
+        post_kpis=kpis,
+        platform_baselines=baselines,
+        diagnostics=diagnostics,
+        recommendations=list(recommendations),
+        summary_md=summary,
+    )
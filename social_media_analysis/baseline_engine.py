@@ -0,0 +1,214 @@
+"""Indexed platform and cohort baselines, replacing the LLM arithmetic of `calculate_baselines`.
+
+All posts are grouped once by platform and by (platform, topic, format) cohort,
+summing engagements, clicks and impressions per group in one vectorized pass.
+Baselines are then a dictionary lookup per group, however many posts there are,
+and the totals are kept up to date post by post as metrics come in or are corrected.
+
+Averages are pooled: total engagements (or clicks) over total impressions of the
+group, so a post with few impressions weighs less than a viral one and posts
+without impressions do not skew the average.
+"""
+
+import json
+import threading
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TypeVar
+
+import numpy as np
+from pipelex.core.memory.working_memory import WorkingMemory
+from pipelex.system.registries.func_registry import pipe_func
+
+from social_media_analysis.analytics_struct import Baselines, PostMetrics
+from social_media_analysis.kpi_engine import MetricColumns
+
+PlatformKey = str
+CohortKey = tuple[str, str, str]
+GroupKey = TypeVar("GroupKey", PlatformKey, CohortKey)
+
+# Parsed all-posts datasets kept in memory for `calculate_post_baselines`, the same JSON being analyzed once per post
+BASELINE_INDEX_CACHE_SIZE = 8
+
+
+def _normalize(label: str) -> str:
+    return label.strip().casefold()
+
+
+def platform_key(post: PostMetrics) -> PlatformKey:
+    return _normalize(post.platform)
+
+
+def cohort_key(post: PostMetrics) -> CohortKey:
+    return (_normalize(post.platform), _normalize(post.topic), _normalize(post.format))
+
+
+@dataclass(frozen=True)
+class GroupTotals:
+    """Summed counts of the posts of one group."""
+
+    nb_posts: int
+    engagements: float
+    clicks: float
+    impressions: float
+
+    @property
+    def engagement_rate(self) -> float:
+        return self.engagements / self.impressions * 100 if self.impressions > 0 else 0.0
+
+    @property
+    def click_through_rate(self) -> float:
+        return self.clicks / self.impressions * 100 if self.impressions > 0 else 0.0
+
+    @classmethod
+    def of_post(cls, post: PostMetrics) -> "GroupTotals":
+        return cls(
+            nb_posts=1,
+            engagements=float(post.likes + post.comments + post.shares + post.saves),
+            clicks=float(post.clicks),
+            impressions=float(post.impressions),
+        )
+
+    def __add__(self, other: "GroupTotals") -> "GroupTotals":
+        return GroupTotals(
+            nb_posts=self.nb_posts + other.nb_posts,
+            engagements=self.engagements + other.engagements,
+            clicks=self.clicks + other.clicks,
+            impressions=self.impressions + other.impressions,
+        )
+
+    def __sub__(self, other: "GroupTotals") -> "GroupTotals":
+        return GroupTotals(
+            nb_posts=self.nb_posts - other.nb_posts,
+            engagements=self.engagements - other.engagements,
+            clicks=self.clicks - other.clicks,
+            impressions=self.impressions - other.impressions,
+        )
+
+
+def _group_totals(keys: Sequence[GroupKey], columns: MetricColumns) -> dict[GroupKey, GroupTotals]:
+    """Sum the columns per distinct key, with one bincount per column."""
+    group_ids: dict[GroupKey, int] = {}
+    row_group_ids = np.fromiter((group_ids.setdefault(key, len(group_ids)) for key in keys), dtype=np.intp, count=len(keys))
+    nb_groups = len(group_ids)
+    nb_posts = np.bincount(row_group_ids, minlength=nb_groups)
+    engagements = np.bincount(row_group_ids, weights=columns.engagements, minlength=nb_groups)
+    clicks = np.bincount(row_group_ids, weights=columns.clicks, minlength=nb_groups)
+    impressions = np.bincount(row_group_ids, weights=columns.impressions, minlength=nb_groups)
+    return {
+        key: GroupTotals(
+            nb_posts=int(nb_posts[group_id]),
+            engagements=float(engagements[group_id]),
+            clicks=float(clicks[group_id]),
+            impressions=float(impressions[group_id]),
+        )
+        for key, group_id in group_ids.items()
+    }
+
+
+def _apply(groups: dict[GroupKey, GroupTotals], key: GroupKey, delta: GroupTotals, sign: int) -> None:
+    totals = groups.get(key)
+    if sign > 0:
+        groups[key] = totals + delta if totals else delta
+        return
+    if totals is None:
+        return
+    remaining = totals - delta
+    if remaining.nb_posts > 0:
+        groups[key] = remaining
+    else:
+        # An empty group is dropped, so its cohort falls back to the platform again
+        del groups[key]
+
+
+class BaselineIndex:
+    """Per-platform and per-cohort running totals of a set of posts.
+
+    The index is built in one O(n) pass, then kept fresh in O(1) per post with
+    `ingest` (a post already in, by `post_id`, is replaced) and `retract`.
+    """
+
+    def __init__(self, posts: Sequence[PostMetrics] = ()):
+        # The last metrics of a post win, like when they are ingested one by one
+        self._posts: dict[str, PostMetrics] = {post.post_id: post for post in posts}
+        unique_posts = list(self._posts.values())
+        columns = MetricColumns.from_posts(unique_posts)
+        self._lock = threading.Lock()
+        self.platforms: dict[PlatformKey, GroupTotals] = _group_totals([platform_key(post) for post in unique_posts], columns)
+        self.cohorts: dict[CohortKey, GroupTotals] = _group_totals([cohort_key(post) for post in unique_posts], columns)
+
+    @property
+    def nb_posts(self) -> int:
+        return len(self._posts)
+
+    def _apply_post(self, post: PostMetrics, sign: int) -> None:
+        delta = GroupTotals.of_post(post)
+        _apply(self.platforms, platform_key(post), delta, sign)
+        _apply(self.cohorts, cohort_key(post), delta, sign)
+
+    def copy(self) -> "BaselineIndex":
+        """Independent index of the same posts, to ingest into without touching this one."""
+        baseline_index = BaselineIndex()
+        with self._lock:
+            baseline_index._posts = dict(self._posts)
+            baseline_index.platforms = dict(self.platforms)
+            baseline_index.cohorts = dict(self.cohorts)
+        return baseline_index
+
+    def ingest(self, post: PostMetrics) -> None:
+        """Add the metrics of a post, or replace its previous metrics if it is already in."""
+        with self._lock:
+            previous_post = self._posts.get(post.post_id)
+            if previous_post is not None:
+                self._apply_post(previous_post, sign=-1)
+            self._posts[post.post_id] = post
+            self._apply_post(post, sign=1)
+
+    def retract(self, post_id: str) -> PostMetrics | None:
+        """Remove a post from the totals, returning its metrics or None if it was not in."""
+        with self._lock:
+            post = self._posts.pop(post_id, None)
+            if post is not None:
+                self._apply_post(post, sign=-1)
+        return post
+
+    def baselines_for(self, post: PostMetrics) -> Baselines:
+        """Baselines of the platform and cohort of `post`.
+
+        A cohort without posts falls back to its platform, and a platform without
+        posts to 0.
+        """
+        with self._lock:
+            platform_totals = self.platforms.get(platform_key(post))
+            cohort_totals = self.cohorts.get(cohort_key(post), platform_totals)
+        return Baselines(
+            platform_avg_engagement=platform_totals.engagement_rate if platform_totals else 0.0,
+            cohort_avg_engagement=cohort_totals.engagement_rate if cohort_totals else 0.0,
+            platform_avg_ctr=platform_totals.click_through_rate if platform_totals else 0.0,
+            cohort_avg_ctr=cohort_totals.click_through_rate if cohort_totals else 0.0,
+        )
+
+
+def parse_all_posts(all_posts_text: str) -> list[PostMetrics]:
+    """Parse the JSON list of all posts given to `campaign_analytics`."""
+    return [PostMetrics.model_validate(post) for post in json.loads(all_posts_text)]
+
+
+@lru_cache(maxsize=BASELINE_INDEX_CACHE_SIZE)
+def _shared_baseline_index(all_posts_text: str) -> BaselineIndex:
+    """Baseline index of an all-posts JSON, built once per distinct JSON.
+
+    The instance is shared by every analysis of the same JSON, so it is only ever
+    read: an index kept up to date is owned by its caller and passed to
+    `run_campaign_analytics` instead.
+    """
+    return BaselineIndex(parse_all_posts(all_posts_text))
+
+
+@pipe_func(name="calculate_post_baselines")
+def calculate_post_baselines(working_memory: WorkingMemory) -> Baselines:
+    """Look up the platform and cohort baselines of the analyzed post, without an LLM round trip."""
+    post = working_memory.get_stuff_as("post", content_type=PostMetrics)
+    all_posts_text = working_memory.get_stuff_as_str("all_posts")
+    return _shared_baseline_index(all_posts_text).baselines_for(post)
@@ -0,0 +1,263 @@
+"""Bulk campaign analysis of every post of a dataset, against baselines computed once.
+
+Posts are read from a .json list, a .jsonl or a .csv file of PostMetrics fields.
+The baseline index is built once for the whole dataset and shared by every
+analysis, which run with bounded concurrency. Each finished post is written to
+a JSONL or SQLite results file right away, so an interrupted run resumes from
+where it stopped:
+
+    python -m social_media_analysis.bulk posts.json --output results/posts.sqlite --concurrency 8
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sqlite3
+import time
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Protocol
+
+from pipelex.pipelex import Pipelex
+from pipelex.types import StrEnum
+
+from social_content.resumable import append_jsonl_record, load_completed_ids, open_jsonl_for_append, run_with_workers
+from social_media_analysis.analytics_struct import PostMetrics
+from social_media_analysis.baseline_engine import BaselineIndex
+from social_media_analysis.runner import run_campaign_analytics
+
+# Posts analyzed at the same time
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))
+
+
+class BulkPostStatus(StrEnum):
+    OK = "ok"
+    ERROR = "error"
+
+
+@dataclass
+class BulkReport:
+    """Progress, then outcome, of a bulk analysis."""
+
+    nb_posts: int = 0
+    nb_done: int = 0
+    nb_failed: int = 0
+    nb_skipped: int = 0  # analyzed by a previous run
+    duration_seconds: float = 0.0
+
+    @property
+    def nb_finished(self) -> int:
+        return self.nb_done + self.nb_failed + self.nb_skipped
+
+
+def load_posts(input_path: Path) -> list[PostMetrics]:
+    """Read the posts of a .json list, .jsonl or .csv file.
+
+    Empty CSV cells take the field default, so `clicks` and `saves` may be left blank.
+
+    Raises:
+        ValueError: The file extension is not supported
+    """
+    match input_path.suffix.lower():
+        case ".json":
+            rows = json.loads(input_path.read_text(encoding="utf-8"))
+        case ".jsonl":
+            with input_path.open(encoding="utf-8") as input_file:
+                rows = [json.loads(line) for line in input_file if line.strip()]
+        case ".csv":
+            with input_path.open(newline="", encoding="utf-8") as input_file:
+                rows = [{field: value for field, value in row.items() if value != ""} for row in csv.DictReader(input_file)]
+        case _:
+            raise ValueError(f"Unsupported posts file '{input_path}': expected a .json, .jsonl or .csv file")
+    return [PostMetrics.model_validate(row) for row in rows]
+
+
+class AnalysisSink(Protocol):
+    """Results file of a bulk analysis, written one post at a time."""
+
+    def completed_post_ids(self) -> set[str]: ...
+
+    def write(self, record: dict[str, Any]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class JsonlAnalysisSink:
+    """Appends one JSON line per post, flushed to disk before the next."""
+
+    def __init__(self, output_path: Path):
+        self.output_path = output_path
+        self._completed_post_ids = load_completed_ids(output_path, id_field="post_id", completed_status=BulkPostStatus.OK)
+        self._output_file = open_jsonl_for_append(output_path)
+
+    def completed_post_ids(self) -> set[str]:
+        return self._completed_post_ids
+
+    def write(self, record: dict[str, Any]) -> None:
+        append_jsonl_record(self._output_file, record)
+
+    def close(self) -> None:
+        self._output_file.close()
+
+
+class SqliteAnalysisSink:
+    """Upserts one row per post into an `analyses` table, committed before the next."""
+
+    def __init__(self, output_path: Path):
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(output_path, timeout=30)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "post_id TEXT PRIMARY KEY, status TEXT NOT NULL, analysis TEXT, error TEXT, "
+                "duration_seconds REAL NOT NULL, analyzed_at REAL NOT NULL)"
+            )
+
+    def completed_post_ids(self) -> set[str]:
+        rows = self._conn.execute("SELECT post_id FROM analyses WHERE status = ?", (BulkPostStatus.OK.value,)).fetchall()
+        return {post_id for (post_id,) in rows}
+
+    def write(self, record: dict[str, Any]) -> None:
+        analysis = record.get("analysis")
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (post_id, status, analysis, error, duration_seconds, analyzed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    record["post_id"],
+                    record["status"],
+                    json.dumps(analysis, ensure_ascii=False) if analysis is not None else None,
+                    record.get("error"),
+                    record["duration_seconds"],
+                    time.time(),
+                ),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def open_analysis_sink(output_path: Path) -> AnalysisSink:
+    """Open a .jsonl or .sqlite results file, created if needed.
+
+    Raises:
+        ValueError: The file extension is not supported
+    """
+    match output_path.suffix.lower():
+        case ".jsonl":
+            return JsonlAnalysisSink(output_path)
+        case ".sqlite" | ".db":
+            return SqliteAnalysisSink(output_path)
+        case _:
+            raise ValueError(f"Unsupported results file '{output_path}': expected a .jsonl or .sqlite file")
+
+
+async def _analyze_post(post: PostMetrics, baseline_index: BaselineIndex, use_cache: bool) -> dict[str, Any]:
+    start_time = time.perf_counter()
+    record: dict[str, Any] = {"post_id": post.post_id}
+    try:
+        analysis = await run_campaign_analytics(post, baseline_index, use_cache=use_cache)
+    except Exception as exc:
+        record.update(status=BulkPostStatus.ERROR, error=f"{type(exc).__name__}: {exc}")
+    else:
+        record.update(status=BulkPostStatus.OK, analysis=analysis.model_dump())
+    record["duration_seconds"] = round(time.perf_counter() - start_time, 2)
+    return record
+
+
+async def run_bulk_analysis(
+    posts: Sequence[PostMetrics],
+    output_path: Path,
+    concurrency: int = BULK_CONCURRENCY,
+    use_cache: bool = True,
+    on_progress: Callable[[BulkReport, dict[str, Any]], None] | None = None,
+    baseline_index: BaselineIndex | None = None,
+) -> BulkReport:
+    """Analyze every post of `posts` not yet in `output_path`.
+
+    A post_id listed several times is analyzed once, with its last metrics.
+
+    The baselines of all posts are indexed once, unless the caller keeps its own
+    index, then a fixed set of workers analyzes the posts; a failed post is
+    recorded with its error and retried on the next run. An error writing a
+    result, or raised by `on_progress`, stops the run and is raised.
+
+    Args:
+        posts: Every post of the dataset, also the population of the baselines
+        output_path: The .jsonl or .sqlite results file, created or added to
+        concurrency: Posts analyzed at the same time
+        use_cache: Set to False to run every step again
+        on_progress: Called with the report so far and the record of each finished post
+        baseline_index: Index of the posts kept up to date by the caller, instead of indexing `posts`
+
+    Returns:
+        The counts of the run
+    """
+    start_time = time.perf_counter()
+    # The last metrics of a post win, like in the baseline index
+    posts = list({post.post_id: post for post in posts}.values())
+    if baseline_index is None:
+        baseline_index = BaselineIndex(posts)
+    report = BulkReport(nb_posts=len(posts))
+    sink = open_analysis_sink(output_path)
+
+    async def analyze(post: PostMetrics) -> None:
+        record = await _analyze_post(post, baseline_index, use_cache=use_cache)
+        sink.write(record)
+        if record["status"] == BulkPostStatus.OK:
+            report.nb_done += 1
+        else:
+            report.nb_failed += 1
+        if on_progress is not None:
+            on_progress(report, record)
+
+    def posts_to_analyze() -> Iterator[PostMetrics]:
+        completed_post_ids = sink.completed_post_ids()
+        for post in posts:
+            if post.post_id in completed_post_ids:
+                report.nb_skipped += 1
+                continue
+            yield post
+
+    try:
+        await run_with_workers(posts_to_analyze(), analyze, concurrency=concurrency)
+    finally:
+        sink.close()
+
+    report.duration_seconds = time.perf_counter() - start_time
+    return report
+
+
+def _print_progress(report: BulkReport, record: dict[str, Any]) -> None:
+    if record["status"] == BulkPostStatus.ERROR:
+        print(f"Post {record['post_id']} failed: {record['error']}")
+    print(
+        f"[{report.nb_finished}/{report.nb_posts}: {report.nb_done} done, {report.nb_failed} failed, {report.nb_skipped} skipped] "
+        f"{record['post_id']}: {record['status']} in {record['duration_seconds']:.1f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Analyze every post of a JSON, JSONL or CSV file of post metrics")
+    parser.add_argument("input", type=Path, help="Posts with the PostMetrics fields")
+    parser.add_argument("--output", type=Path, help="JSONL or SQLite results file, defaults to results/<input name>.jsonl")
+    parser.add_argument("--concurrency", type=int, default=BULK_CONCURRENCY, help="Posts analyzed at the same time")
+    parser.add_argument("--no-cache", action="store_true", help="Run every step again instead of reading the pipe cache")
+    args = parser.parse_args()
+    output_path: Path = args.output or Path("results") / f"{args.input.stem}.jsonl"
+
+    posts = load_posts(args.input)
+    Pipelex.make()
+    report = asyncio.run(
+        run_bulk_analysis(posts, output_path, concurrency=args.concurrency, use_cache=not args.no_cache, on_progress=_print_progress)
+    )
+    print(
+        f"Bulk analysis finished in {report.duration_seconds:.0f}s: {report.nb_done} analyzed, {report.nb_failed} failed, "
+        f"{report.nb_skipped} already done. Results in {output_path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Vectorized KPI computation over post metrics, replacing the LLM arithmetic of `calculate_kpis`.
+
+Metrics are laid out as one NumPy column per field, so the KPIs of one post or
+of a million posts are computed in the same single pass. A post without
+impressions has all its rates at 0 rather than a division error or NaN.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+from pipelex.core.memory.working_memory import WorkingMemory
+from pipelex.system.registries.func_registry import pipe_func
+
+from social_media_analysis.analytics_struct import PostKPIs, PostMetrics
+
+
+@dataclass(frozen=True)
+class MetricColumns:
+    """Counts of posts laid out column by column, one row per post."""
+
+    likes: np.ndarray
+    comments: np.ndarray
+    shares: np.ndarray
+    saves: np.ndarray
+    clicks: np.ndarray
+    impressions: np.ndarray
+
+    @classmethod
+    def from_posts(cls, posts: Sequence[PostMetrics]) -> "MetricColumns":
+        def column(field_name: str) -> np.ndarray:
+            return np.fromiter((getattr(post, field_name) for post in posts), dtype=np.float64, count=len(posts))
+
+        return cls(
+            likes=column("likes"),
+            comments=column("comments"),
+            shares=column("shares"),
+            saves=column("saves"),
+            clicks=column("clicks"),
+            impressions=column("impressions"),
+        )
+
+    @property
+    def engagements(self) -> np.ndarray:
+        return self.likes + self.comments + self.shares + self.saves
+
+    def __len__(self) -> int:
+        return len(self.impressions)
+
+
+def rate_percent(numerators: np.ndarray, impressions: np.ndarray) -> np.ndarray:
+    """Element-wise `numerators / impressions * 100`, 0 where there are no impressions."""
+    rates = np.zeros(np.broadcast(numerators, impressions).shape, dtype=np.float64)
+    np.divide(numerators, impressions, out=rates, where=impressions > 0)
+    return rates * 100
+
+
+@dataclass(frozen=True)
+class KPIColumns:
+    """KPIs of posts laid out column by column, in percent."""
+
+    engagement_rate: np.ndarray
+    click_through_rate: np.ndarray
+    save_rate: np.ndarray
+    comment_rate: np.ndarray
+    share_rate: np.ndarray
+
+    def row(self, index: int) -> PostKPIs:
+        return PostKPIs(
+            engagement_rate=float(self.engagement_rate[index]),
+            click_through_rate=float(self.click_through_rate[index]),
+            save_rate=float(self.save_rate[index]),
+            comment_rate=float(self.comment_rate[index]),
+            share_rate=float(self.share_rate[index]),
+        )
+
+
+def compute_kpi_columns(columns: MetricColumns) -> KPIColumns:
+    """Compute the KPIs of every post in one vectorized pass."""
+    return KPIColumns(
+        engagement_rate=rate_percent(columns.engagements, columns.impressions),
+        click_through_rate=rate_percent(columns.clicks, columns.impressions),
+        save_rate=rate_percent(columns.saves, columns.impressions),
+        comment_rate=rate_percent(columns.comments, columns.impressions),
+        share_rate=rate_percent(columns.shares, columns.impressions),
+    )
+
+
+def compute_kpis(posts: Sequence[PostMetrics]) -> list[PostKPIs]:
+    """Compute the KPIs of many posts, in the order of `posts`."""
+    kpi_columns = compute_kpi_columns(MetricColumns.from_posts(posts))
+    return [kpi_columns.row(index) for index in range(len(posts))]
+
+
+def compute_post_kpis(post: PostMetrics) -> PostKPIs:
+    return compute_kpis([post])[0]
+
+
+@pipe_func(name="calculate_post_kpis")
+def calculate_post_kpis(working_memory: WorkingMemory) -> PostKPIs:
+    """Compute the KPIs of the analyzed post, without an LLM round trip."""
+    post = working_memory.get_stuff_as("post", content_type=PostMetrics)
+    return compute_post_kpis(post)
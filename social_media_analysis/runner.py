@@ -0,0 +1,73 @@
+"""Run the campaign analytics pipeline, serving the pipes opted in to the pipe cache from it."""
+
+from typing import Any
+
+from pipelex.types import StrEnum
+
+from social_content.pipe_cache import run_pipe_with_cache
+from social_media_analysis.analytics_struct import AnalysisOutput, PostMetrics
+from social_media_analysis.baseline_engine import BaselineIndex
+from social_media_analysis.kpi_engine import compute_post_kpis
+
+
+class AnalyticsMode(StrEnum):
+    """Pipe running the analysis: independent steps in parallel, or all one after the other."""
+
+    PARALLEL = "campaign_analytics"
+    SEQUENTIAL = "campaign_analytics_sequential"
+
+    @property
+    def metrics_pipe_code(self) -> str:
+        """Pipe analyzing a post whose KPIs and baselines are already computed."""
+        match self:
+            case AnalyticsMode.PARALLEL:
+                return "analyze_metrics"
+            case AnalyticsMode.SEQUENTIAL:
+                return "analyze_metrics_sequential"
+
+
+async def run_campaign_analytics(
+    post_metrics: PostMetrics,
+    all_posts: str | BaselineIndex,
+    use_cache: bool = True,
+    mode: AnalyticsMode = AnalyticsMode.PARALLEL,
+) -> AnalysisOutput:
+    """Analyze one post against all posts.
+
+    With a BaselineIndex, the KPIs and baselines are computed here and only the
+    LLM stages run in Pipelex. A pipe opted in to the pipe cache (see
+    LLM_CACHE_PIPES) is only billed the first time a post is analyzed with the
+    same data.
+
+    Args:
+        post_metrics: Metrics of the post to analyze
+        all_posts: JSON of all posts, or an index of them kept up to date by the caller
+        use_cache: Set to False to run every step again
+        mode: SEQUENTIAL to run the steps one after the other, for comparison
+
+    Returns:
+        The analysis of the post
+    """
+    inputs: dict[str, Any] = {
+        "post": {
+            "concept": "social_media_analysis.PostMetrics",
+            "content": post_metrics,
+        },
+    }
+    if isinstance(all_posts, BaselineIndex):
+        # Read at call time, so the baselines include the latest ingested metrics
+        pipe_code = mode.metrics_pipe_code
+        inputs["kpis"] = {
+            "concept": "social_media_analysis.PostKPIs",
+            "content": compute_post_kpis(post_metrics),
+        }
+        inputs["baselines"] = {
+            "concept": "social_media_analysis.Baselines",
+            "content": all_posts.baselines_for(post_metrics),
+        }
+    else:
+        pipe_code = mode.value
+        inputs["all_posts"] = all_posts
+
+    analysis = await run_pipe_with_cache(pipe_code=pipe_code, inputs=inputs, use_cache=use_cache)
+    return AnalysisOutput.model_validate(analysis)
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Caches default to directories read at import time: keep them out of the working tree
+os.environ.setdefault("MEDIA_CACHE_DIR", tempfile.mkdtemp(prefix="media-cache-tests-"))
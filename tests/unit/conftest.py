@@ -0,0 +1,42 @@
+import hashlib
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from social_content.media_backend import MediaBackend
+from social_content.media_cache import MediaCache
+from social_content.prompt_index import PromptIndex
+
+
+class FakeImageBackend(MediaBackend):
+    """Media backend whose outputs are the bytes of their prompt, counting predictions."""
+
+    def __init__(self) -> None:
+        self.predicted_prompts: list[str] = []
+        self._lock = threading.Lock()
+
+    def predict(self, model: str, model_input: dict[str, Any], cancel_event: threading.Event | None = None) -> list[str]:
+        with self._lock:
+            self.predicted_prompts.append(model_input["prompt"])
+        return [f"fake://{hashlib.sha256(model_input['prompt'].encode('utf-8')).hexdigest()}#{model_input['prompt']}"]
+
+    def iter_output(self, url: str) -> Iterator[bytes]:
+        yield url.split("#", 1)[1].encode("utf-8")
+
+
+@pytest.fixture
+def media_cache(tmp_path: Path) -> MediaCache:
+    return MediaCache(cache_dir=tmp_path / "media")
+
+
+@pytest.fixture
+def prompt_index(tmp_path: Path) -> PromptIndex:
+    return PromptIndex(db_path=tmp_path / "prompts.sqlite")
+
+
+@pytest.fixture
+def fake_image_backend() -> FakeImageBackend:
+    return FakeImageBackend()
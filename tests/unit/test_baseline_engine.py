@@ -0,0 +1,99 @@
+import pytest
+
+from social_media_analysis.analytics_struct import PostMetrics
+from social_media_analysis.baseline_engine import BaselineIndex
+from tests.unit.test_data import PostMetricsTestCases
+
+
+def _posts() -> list[PostMetrics]:
+    return [PostMetrics.model_validate(post) for post in PostMetricsTestCases.POSTS]
+
+
+def _assert_same_totals(baseline_index: BaselineIndex, expected_index: BaselineIndex) -> None:
+    assert baseline_index.nb_posts == expected_index.nb_posts
+    assert baseline_index.platforms.keys() == expected_index.platforms.keys()
+    assert baseline_index.cohorts.keys() == expected_index.cohorts.keys()
+    for key, totals in expected_index.platforms.items():
+        assert baseline_index.platforms[key].nb_posts == totals.nb_posts
+        assert baseline_index.platforms[key].engagements == pytest.approx(totals.engagements)
+        assert baseline_index.platforms[key].clicks == pytest.approx(totals.clicks)
+        assert baseline_index.platforms[key].impressions == pytest.approx(totals.impressions)
+    for key, totals in expected_index.cohorts.items():
+        assert baseline_index.cohorts[key].nb_posts == totals.nb_posts
+        assert baseline_index.cohorts[key].engagements == pytest.approx(totals.engagements)
+        assert baseline_index.cohorts[key].impressions == pytest.approx(totals.impressions)
+
+
+class TestBaselineEngine:
+    def test_pooled_platform_and_cohort_averages(self):
+        baselines = BaselineIndex(_posts()).baselines_for(_posts()[0])
+        # Instagram: 450 engagements and 90 clicks over 5000 impressions; AI images: 400 and 60 over 4000
+        assert baselines.platform_avg_engagement == pytest.approx(9.0)
+        assert baselines.platform_avg_ctr == pytest.approx(1.8)
+        assert baselines.cohort_avg_engagement == pytest.approx(10.0)
+        assert baselines.cohort_avg_ctr == pytest.approx(1.5)
+
+    def test_unknown_cohort_falls_back_to_platform(self):
+        video_post = PostMetrics.model_validate({**PostMetricsTestCases.POSTS[0], "post_id": "IG_009", "format": "video"})
+        baselines = BaselineIndex(_posts()).baselines_for(video_post)
+        assert baselines.cohort_avg_engagement == baselines.platform_avg_engagement == pytest.approx(9.0)
+        assert baselines.cohort_avg_ctr == baselines.platform_avg_ctr == pytest.approx(1.8)
+
+    def test_grouping_ignores_case_and_spaces(self):
+        relabeled_post = PostMetrics.model_validate(
+            {**PostMetricsTestCases.POSTS[1], "platform": " INSTAGRAM", "topic": "ai ", "format": "Image"}
+        )
+        posts = [relabeled_post if post.post_id == relabeled_post.post_id else post for post in _posts()]
+        assert BaselineIndex(posts).baselines_for(_posts()[0]) == BaselineIndex(_posts()).baselines_for(_posts()[0])
+        assert BaselineIndex(posts).platforms.keys() == {"instagram", "linkedin"}
+
+    def test_ingest_one_by_one_matches_full_rebuild(self):
+        baseline_index = BaselineIndex()
+        for post in _posts():
+            baseline_index.ingest(post)
+        _assert_same_totals(baseline_index, BaselineIndex(_posts()))
+
+    def test_ingest_replaces_post_by_id(self):
+        baseline_index = BaselineIndex(_posts())
+        corrected_post = PostMetrics.model_validate(PostMetricsTestCases.CORRECTED_IG_002)
+        baseline_index.ingest(corrected_post)
+
+        rebuilt_posts = [corrected_post if post.post_id == corrected_post.post_id else post for post in _posts()]
+        _assert_same_totals(baseline_index, BaselineIndex(rebuilt_posts))
+        assert baseline_index.baselines_for(corrected_post) == BaselineIndex(rebuilt_posts).baselines_for(corrected_post)
+
+    def test_ingest_new_post_and_retract_matches_full_rebuild(self):
+        baseline_index = BaselineIndex(_posts())
+        new_post = PostMetrics.model_validate(PostMetricsTestCases.NEW_POST)
+        baseline_index.ingest(new_post)
+        _assert_same_totals(baseline_index, BaselineIndex([*_posts(), new_post]))
+
+        assert baseline_index.retract(new_post.post_id) == new_post
+        assert baseline_index.retract(new_post.post_id) is None
+        _assert_same_totals(baseline_index, BaselineIndex(_posts()))
+
+    def test_retract_to_empty_cohort_falls_back_to_platform(self):
+        baseline_index = BaselineIndex(_posts())
+        carousel_post = next(post for post in _posts() if post.format == "carousel")
+        baseline_index.retract(carousel_post.post_id)
+
+        baselines = baseline_index.baselines_for(carousel_post)
+        assert baselines.cohort_avg_engagement == baselines.platform_avg_engagement
+        assert baselines.cohort_avg_ctr == baselines.platform_avg_ctr
+
+    def test_retract_whole_platform_gives_zero(self):
+        baseline_index = BaselineIndex(_posts())
+        linkedin_post = next(post for post in _posts() if post.platform == "LinkedIn")
+        baseline_index.retract(linkedin_post.post_id)
+
+        baselines = baseline_index.baselines_for(linkedin_post)
+        assert baselines.platform_avg_engagement == 0.0
+        assert baselines.cohort_avg_ctr == 0.0
+        assert "linkedin" not in baseline_index.platforms
+
+    def test_copy_is_independent(self):
+        baseline_index = BaselineIndex(_posts())
+        baseline_copy = baseline_index.copy()
+        baseline_copy.ingest(PostMetrics.model_validate(PostMetricsTestCases.NEW_POST))
+        baseline_copy.retract("IG_001")
+        _assert_same_totals(baseline_index, BaselineIndex(_posts()))
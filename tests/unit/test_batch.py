@@ -0,0 +1,103 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+
+from social_content.batch import BatchRowStatus, iter_batch_rows, load_completed_row_ids, run_batch
+from social_content.social_content_struct import CompanyInput, InstagramPost, LinkedInPost, SocialMediaContent, TwitterPost
+from tests.unit.test_data import BatchTestCases
+
+
+def _read_records(output_path: Path) -> list[dict[str, Any]]:
+    records: list[dict[str, Any]] = []
+    for line in output_path.read_text(encoding="utf-8").splitlines():
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
+
+class TestBatch:
+    @pytest.fixture
+    def briefs_path(self, tmp_path: Path) -> Path:
+        briefs_path = tmp_path / "briefs.csv"
+        briefs_path.write_text(BatchTestCases.BRIEFS_CSV, encoding="utf-8")
+        return briefs_path
+
+    @pytest.fixture
+    def failing_company(self) -> dict[str, str | None]:
+        return {"name": BatchTestCases.FAILING_COMPANY}
+
+    @pytest.fixture(autouse=True)
+    def fake_generation(self, mocker: MockerFixture, failing_company: dict[str, str | None]):
+        async def run_social_content(company_input: CompanyInput, force_refresh: bool = False) -> Any:
+            if company_input.company_name == failing_company["name"]:
+                raise RuntimeError("pipeline failed")
+            content = SocialMediaContent(
+                instagram=[InstagramPost(image_prompt="", caption=company_input.topic, hashtags="", variation_angle="")],
+                twitter=TwitterPost(image_prompt="", tweet_text=company_input.topic),
+                linkedin=[LinkedInPost(post_text=company_input.topic, variation_angle="")],
+            )
+            return mocker.Mock(content=content, research_from_cache=False, digest=None)
+
+        return mocker.patch("social_content.batch.run_social_content", side_effect=run_social_content)
+
+    def test_iter_batch_rows(self, briefs_path: Path):
+        """Unreadable rows come with their error, and colliding ids get a suffix."""
+        rows = list(iter_batch_rows(briefs_path))
+
+        assert [row.row_id for row in rows] == BatchTestCases.ROW_IDS
+        assert rows[1].company_input is None
+        assert rows[1].error == "Missing topic"
+        assert rows[2].company_input == CompanyInput(company_name="Initech", topic="Printers", brand_voice="professional")
+
+    def test_iter_batch_rows_with_torn_jsonl_line(self, tmp_path: Path):
+        briefs_path = tmp_path / "briefs.jsonl"
+        briefs_path.write_text(BatchTestCases.BRIEFS_JSONL, encoding="utf-8")
+
+        rows = list(iter_batch_rows(briefs_path))
+
+        assert [row.row_id for row in rows] == ["0", "1", "2"]
+        assert rows[1].error is not None and rows[1].error.startswith("Invalid JSON")
+        assert rows[2].company_input is not None
+
+    @pytest.mark.asyncio
+    async def test_invalid_row_does_not_abort_batch(self, tmp_path: Path, briefs_path: Path):
+        """Every readable row is generated, the others are recorded as errors."""
+        output_path = tmp_path / "results.jsonl"
+
+        report = await run_batch(briefs_path, output_path, concurrency=2)
+
+        records = {record["row_id"]: record for record in _read_records(output_path)}
+        assert (report.nb_done, report.nb_failed, report.nb_skipped) == (2, 2, 0)
+        assert records["1"]["status"] == BatchRowStatus.ERROR
+        assert records["1"]["error"] == "Missing topic"
+        assert records["brief-7"]["status"] == BatchRowStatus.ERROR
+        assert load_completed_row_ids(output_path) == {"0", "0#2"}
+
+    @pytest.mark.asyncio
+    async def test_resume(self, tmp_path: Path, briefs_path: Path, failing_company: dict[str, str | None]):
+        """A second run skips the generated rows, retries the failed ones, and survives a torn last line."""
+        output_path = tmp_path / "results.jsonl"
+        await run_batch(briefs_path, output_path, concurrency=2)
+        with output_path.open("a", encoding="utf-8") as output_file:
+            output_file.write('{"row_id": "brief-7", "sta')
+        failing_company["name"] = None
+
+        report = await run_batch(briefs_path, output_path, concurrency=2)
+
+        assert (report.nb_done, report.nb_failed, report.nb_skipped) == (1, 1, 2)
+        assert load_completed_row_ids(output_path) == {"0", "0#2", "brief-7"}
+        assert _read_records(output_path)[-1]["row_id"] in {"1", "brief-7"}
+
+    @pytest.mark.asyncio
+    async def test_failing_write_stops_the_batch(self, mocker: MockerFixture, tmp_path: Path, briefs_path: Path):
+        mocker.patch("social_content.batch.append_jsonl_record", side_effect=OSError("No space left on device"))
+
+        # One worker and a queue of two: a producer left alone would block on the remaining rows
+        with pytest.raises(OSError, match="No space left"):
+            await asyncio.wait_for(run_batch(briefs_path, tmp_path / "briefs.jsonl", concurrency=1), timeout=5)
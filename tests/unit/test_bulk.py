@@ -0,0 +1,53 @@
+import asyncio
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+
+from social_media_analysis import bulk
+from social_media_analysis.analytics_struct import PostMetrics
+from social_media_analysis.bulk import run_bulk_analysis
+from tests.unit.test_data import PostMetricsTestCases
+
+
+class TestBulk:
+    @pytest.mark.asyncio
+    async def test_duplicate_post_ids_are_analyzed_once(self, mocker: MockerFixture, tmp_path: Path):
+        analyzed_posts: list[PostMetrics] = []
+
+        async def fake_run_campaign_analytics(post: PostMetrics, all_posts: Any, **kwargs: Any) -> SimpleNamespace:
+            analyzed_posts.append(post)
+            return SimpleNamespace(model_dump=lambda: {"likes": post.likes})
+
+        mocker.patch.object(bulk, "run_campaign_analytics", side_effect=fake_run_campaign_analytics)
+        posts = [PostMetrics.model_validate(post) for post in PostMetricsTestCases.POSTS]
+        corrected_post = PostMetrics.model_validate(PostMetricsTestCases.CORRECTED_IG_002)
+        output_path = tmp_path / "posts.jsonl"
+
+        report = await run_bulk_analysis([*posts, corrected_post], output_path, concurrency=3)
+
+        assert report.nb_posts == report.nb_done == len(posts)
+        assert sorted(post.post_id for post in analyzed_posts) == sorted(post.post_id for post in posts)
+        assert next(post for post in analyzed_posts if post.post_id == corrected_post.post_id) == corrected_post
+        records = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+        assert len(records) == len(posts)
+
+    @pytest.mark.asyncio
+    async def test_failing_progress_callback_stops_the_run(self, mocker: MockerFixture, tmp_path: Path):
+        async def fake_run_campaign_analytics(post: PostMetrics, all_posts: Any, **kwargs: Any) -> SimpleNamespace:
+            return SimpleNamespace(model_dump=lambda: {"likes": post.likes})
+
+        def failing_progress(report: bulk.BulkReport, record: dict[str, Any]) -> None:
+            raise OSError("No space left on device")
+
+        mocker.patch.object(bulk, "run_campaign_analytics", side_effect=fake_run_campaign_analytics)
+        # More posts than the queue holds, so a producer left alone would block
+        posts = [PostMetrics.model_validate({**PostMetricsTestCases.POSTS[0], "post_id": f"IG_{index_post:03}"}) for index_post in range(20)]
+
+        with pytest.raises(OSError, match="No space left"):
+            await asyncio.wait_for(
+                run_bulk_analysis(posts, tmp_path / "posts.jsonl", concurrency=2, on_progress=failing_progress), timeout=5
+            )
@@ -0,0 +1,152 @@
+from typing import Any, ClassVar
+
+from social_content.plx_library import PipeDefinition
+
+
+class ImagePromptTestCases:
+    # A typical generated image prompt, about 48 words long
+    BASE_PROMPT = (
+        "A modern coffee shop interior at sunrise with warm wooden tables, a barista pouring latte art into a ceramic cup, "
+        "steam rising from fresh espresso, plants hanging from the ceiling, large windows showing a quiet city street, "
+        "customers working on laptops, cozy atmosphere, photorealistic, shallow depth of field, 35mm lens"
+    )
+    SIMILAR_PROMPT = BASE_PROMPT.replace("sunrise", "dawn")
+    DIFFERENT_PROMPT = (
+        "A snowy mountain summit under a starry night sky, a lone climber with a headlamp, aurora borealis in green and purple, "
+        "wide angle landscape, crisp cold air, dramatic lighting"
+    )
+    SCOPE = "test/image-model|1:1|"
+    CONCURRENCIES: ClassVar[list[int]] = [1, 5]
+
+
+class BatchTestCases:
+    # Row 1 misses its topic, row 2 claims the id of row 0, row 3 has an id
+    BRIEFS_CSV = (
+        "id,company_name,topic,brand_voice\n"
+        ",Acme,Rockets,playful\n"
+        ",Globex,,professional\n"
+        "0,Initech,Printers,\n"
+        "brief-7,Umbrella,Vaccines,serious\n"
+    )
+    BRIEFS_JSONL = '{"company_name": "Acme", "topic": "Rockets"}\n{"company_name": "Glo\n{"company_name": "Initech", "topic": "Printers"}\n'
+    ROW_IDS: ClassVar[list[str]] = ["0", "1", "0#2", "brief-7"]
+    FAILING_COMPANY = "Umbrella"
+
+
+class ModelRouterTestCases:
+    MODEL = "gpt-4o-mini"
+    BACKENDS: ClassVar[list[str]] = ["openai", "azure_openai"]
+    MIN_SAMPLES = 5
+    WINDOW_SECONDS = 600.0
+    SEQUENCE_PIPE = "analyze"
+    NB_LEAF_PIPES = 2
+
+    @staticmethod
+    def pipe_definitions() -> dict[str, PipeDefinition]:
+        """A sequence running an LLM pipe, then a parallel of the other one and a function."""
+        blueprints: dict[str, dict[str, Any]] = {
+            "analyze": {"type": "PipeSequence", "steps": [{"pipe": "diagnose"}, {"pipe": "advise"}]},
+            "advise": {"type": "PipeParallel", "parallels": [{"pipe": "summarize"}, {"pipe": "combine"}]},
+            "diagnose": {"type": "PipeLLM", "model": {"model": ModelRouterTestCases.MODEL, "temperature": 0.7}},
+            "summarize": {"type": "PipeLLM", "model": ModelRouterTestCases.MODEL},
+            "combine": {"type": "PipeFunc"},
+        }
+        return {pipe_code: PipeDefinition(code=pipe_code, domain="test", blueprint=blueprint) for pipe_code, blueprint in blueprints.items()}
+
+
+class PostMetricsTestCases:
+    # Two Instagram image posts on AI, one Instagram carousel and one LinkedIn post, with round counts
+    POSTS: ClassVar[list[dict[str, Any]]] = [
+        {
+            "post_id": "IG_001",
+            "platform": "Instagram",
+            "topic": "AI",
+            "format": "image",
+            "timestamp": "2024-01-15T10:00:00",
+            "likes": 80,
+            "comments": 10,
+            "shares": 5,
+            "impressions": 1000,
+            "clicks": 20,
+            "saves": 5,
+        },
+        {
+            "post_id": "IG_002",
+            "platform": "Instagram",
+            "topic": "AI",
+            "format": "image",
+            "timestamp": "2024-01-16T10:00:00",
+            "likes": 250,
+            "comments": 30,
+            "shares": 10,
+            "impressions": 3000,
+            "clicks": 40,
+            "saves": 10,
+        },
+        {
+            "post_id": "IG_003",
+            "platform": "Instagram",
+            "topic": "Launch",
+            "format": "carousel",
+            "timestamp": "2024-01-17T10:00:00",
+            "likes": 40,
+            "comments": 5,
+            "shares": 5,
+            "impressions": 1000,
+            "clicks": 30,
+            "saves": 0,
+        },
+        {
+            "post_id": "LI_001",
+            "platform": "LinkedIn",
+            "topic": "AI",
+            "format": "image",
+            "timestamp": "2024-01-16T09:00:00",
+            "likes": 30,
+            "comments": 10,
+            "shares": 10,
+            "impressions": 500,
+            "clicks": 25,
+            "saves": 0,
+        },
+    ]
+    CORRECTED_IG_002: ClassVar[dict[str, Any]] = {**POSTS[1], "likes": 550, "impressions": 5000}
+    NEW_POST: ClassVar[dict[str, Any]] = {**POSTS[3], "post_id": "LI_002", "topic": "Launch", "likes": 90, "impressions": 1500}
+    ZERO_IMPRESSIONS_POST: ClassVar[dict[str, Any]] = {**POSTS[0], "post_id": "IG_000", "impressions": 0}
+
+
+class VoiceoverTestCases:
+    SCRIPT = "Big news today! 🚀🔥\n✨✨\nOur new app is live… Try it now."
+    SPOKEN_SENTENCES: ClassVar[list[str]] = ["Big news today!", "Our new app is live…", "Try it now."]
+    # MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo, no padding: 417-byte frames
+    FRAME_HEADER = b"\xff\xfb\x90\x00"
+    FRAME_SIZE = 417
+    XING_OFFSET = 36
+
+
+class ResearchDigestTestCases:
+    REPEATED_SENTENCE = "Short-form video drives the most engagement."
+    # Verbose research, a sentence repeated across fields, more competitors than the digest keeps
+    COMPETITOR_NAMES: ClassVar[list[str]] = [f"Competitor {index_competitor}" for index_competitor in range(1, 8)]
+    CONTENT_STYLE = (
+        f"{REPEATED_SENTENCE} They post polished carousels three times a week. Captions open with a bold question. "
+        "Every post ends with a call to action. Their visuals use a consistent brand palette. "
+    ) * 3
+    ENGAGEMENT_TACTICS = "They answer every comment within an hour. Giveaways run monthly. User content is reposted on Fridays. " * 3
+    KEY_TRENDS = f"{REPEATED_SENTENCE}\n- Behind-the-scenes content builds trust.\n- Educational threads outperform promotions.\n" * 4
+    RECOMMENDATIONS = "Post consistently at peak hours. Invest in short-form video. Collaborate with micro-influencers. " * 4
+    MAX_TOKENS = 300
+
+
+class MediaErrorTestCases:
+    TRANSIENT_PREDICTION_ERRORS: ClassVar[list[str]] = [
+        "CUDA out of memory. Tried to allocate 2.00 GiB",
+        "Prediction timed out",
+        "Director: unexpected error handling prediction (E8765)",
+        "Internal error (fake failure injected by FAKE_REPLICATE_FAILURE_RATE)",
+    ]
+    PERMANENT_PREDICTION_ERRORS: ClassVar[list[str]] = [
+        "The input or output was flagged as sensitive. Please try again with different inputs. (E005)",
+        "NSFW content detected",
+        "Invalid width: must be a multiple of 8",
+    ]
@@ -0,0 +1,38 @@
+import math
+
+import numpy as np
+import pytest
+
+from social_media_analysis.analytics_struct import PostMetrics
+from social_media_analysis.kpi_engine import MetricColumns, compute_kpis, compute_post_kpis, rate_percent
+from tests.unit.test_data import PostMetricsTestCases
+
+
+class TestKpiEngine:
+    def test_rates_match_percent_formulas(self):
+        # The formulas of the former calculate_kpis prompt, e.g. (likes + comments + shares + saves) / impressions * 100
+        post_data = PostMetricsTestCases.POSTS[0]
+        kpis = compute_post_kpis(PostMetrics.model_validate(post_data))
+        impressions = post_data["impressions"]
+        engagements = post_data["likes"] + post_data["comments"] + post_data["shares"] + post_data["saves"]
+        assert kpis.engagement_rate == pytest.approx(engagements / impressions * 100)
+        assert kpis.click_through_rate == pytest.approx(post_data["clicks"] / impressions * 100)
+        assert kpis.save_rate == pytest.approx(post_data["saves"] / impressions * 100)
+        assert kpis.comment_rate == pytest.approx(post_data["comments"] / impressions * 100)
+        assert kpis.share_rate == pytest.approx(post_data["shares"] / impressions * 100)
+        assert kpis.engagement_rate == pytest.approx(10.0)
+
+    def test_zero_impressions_gives_zero_rates(self):
+        kpis = compute_post_kpis(PostMetrics.model_validate(PostMetricsTestCases.ZERO_IMPRESSIONS_POST))
+        for rate in kpis.model_dump().values():
+            assert rate == 0.0
+            assert not math.isnan(rate)
+
+    def test_rate_percent_has_no_nan(self):
+        rates = rate_percent(np.array([5.0, 0.0, 3.0]), np.array([0.0, 0.0, 300.0]))
+        assert rates.tolist() == [0.0, 0.0, 1.0]
+
+    def test_batch_matches_one_by_one(self):
+        posts = [PostMetrics.model_validate(post) for post in [*PostMetricsTestCases.POSTS, PostMetricsTestCases.ZERO_IMPRESSIONS_POST]]
+        assert compute_kpis(posts) == [compute_post_kpis(post) for post in posts]
+        assert len(MetricColumns.from_posts(posts)) == len(posts)
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from replicate.exceptions import ModelError, ReplicateError
+
+from social_content.media_backend import is_retryable_media_error
+from tests.unit.test_data import MediaErrorTestCases
+
+
+def _model_error(error: str | None, status: str = "failed") -> ModelError:
+    return ModelError(SimpleNamespace(id="prediction-id", status=status, error=error))
+
+
+class TestMediaBackend:
+    @pytest.mark.parametrize("error", MediaErrorTestCases.TRANSIENT_PREDICTION_ERRORS)
+    def test_transient_prediction_failure_is_retried(self, error: str):
+        assert is_retryable_media_error(_model_error(error))
+
+    @pytest.mark.parametrize("error", MediaErrorTestCases.PERMANENT_PREDICTION_ERRORS)
+    def test_rejected_prediction_is_not_retried(self, error: str):
+        assert not is_retryable_media_error(_model_error(error))
+
+    def test_cancelled_or_unexplained_prediction_is_not_retried(self):
+        assert not is_retryable_media_error(_model_error(None, status="canceled"))
+        assert not is_retryable_media_error(_model_error(None))
+
+    def test_http_errors(self):
+        assert is_retryable_media_error(httpx.ConnectError("connection refused"))
+        assert is_retryable_media_error(ReplicateError(status=429))
+        assert is_retryable_media_error(ReplicateError(status=503))
+        assert not is_retryable_media_error(ReplicateError(status=422))
+        assert not is_retryable_media_error(ValueError("bad input"))
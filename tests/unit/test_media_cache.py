@@ -0,0 +1,58 @@
+import itertools
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from social_content import media_cache as media_cache_module
+from social_content.media_cache import MediaCache
+
+
+@pytest.fixture
+def small_cache(tmp_path: Path, mocker: MockerFixture) -> MediaCache:
+    # Strictly increasing access times, so recency does not depend on the clock resolution
+    clock = itertools.count(1)
+    mocker.patch.object(media_cache_module.time, "time", side_effect=lambda: float(next(clock)))
+    return MediaCache(cache_dir=tmp_path / "media", max_bytes=25)
+
+
+def _key(name: str) -> str:
+    return MediaCache.make_key("test/model", {"prompt": name})
+
+
+class TestMediaCache:
+    def test_make_key_ignores_input_order(self):
+        assert MediaCache.make_key("test/model", {"a": 1, "b": 2}) == MediaCache.make_key("test/model", {"b": 2, "a": 1})
+        assert MediaCache.make_key("test/model", {"a": 1}) != MediaCache.make_key("other/model", {"a": 1})
+
+    def test_least_recently_used_is_evicted(self, small_cache: MediaCache):
+        small_cache.put(_key("first"), b"1" * 10, suffix=".bin")
+        small_cache.put(_key("second"), b"2" * 10, suffix=".bin")
+        assert small_cache.get(_key("first")) is not None
+
+        small_cache.put(_key("third"), b"3" * 10, suffix=".bin")
+
+        assert small_cache.get(_key("second")) is None
+        assert small_cache.get(_key("first")) is not None
+        assert small_cache.get(_key("third")) is not None
+
+    def test_shared_blob_survives_eviction_of_one_key(self, small_cache: MediaCache):
+        shared_path = small_cache.put(_key("first"), b"same" * 3, suffix=".bin")
+        small_cache.put(_key("other"), b"o" * 5, suffix=".bin")
+        small_cache.put(_key("second"), b"same" * 3, suffix=".bin")
+
+        small_cache.put(_key("third"), b"3" * 10, suffix=".bin")
+
+        assert small_cache.get(_key("first")) is None
+        assert small_cache.get(_key("other")) is None
+        assert small_cache.get(_key("second")) == shared_path
+        assert shared_path.exists()
+
+    def test_entry_larger_than_cap_is_kept(self, small_cache: MediaCache):
+        blob_path = small_cache.put(_key("huge"), b"h" * 100, suffix=".bin")
+        assert small_cache.get(_key("huge")) == blob_path
+
+    def test_missing_blob_is_forgotten(self, small_cache: MediaCache):
+        blob_path = small_cache.put(_key("first"), b"1" * 10, suffix=".bin")
+        blob_path.unlink()
+        assert small_cache.get(_key("first")) is None
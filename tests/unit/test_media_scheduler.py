@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+
+from social_content import image_derivation
+from social_content.image_derivation import CropFormat
+from social_content.media_backend import ImageFormat
+from social_content.media_scheduler import PLATFORM_IMAGES_JOB, MediaResult, MediaScheduler, PlatformImages
+from social_content.runner import StreamedResult, StreamedResultName
+from tests.unit.test_data import ImagePromptTestCases
+
+
+async def _fake_render_images(prompts: list[str], image_format: ImageFormat, label: str = "") -> list[Any]:
+    return [SimpleNamespace(url=f"{image_format}|{prompt}") for prompt in prompts]
+
+
+async def _fake_derive_crop(master: Any, crop_format: CropFormat) -> str:
+    return f"{master.url}|{crop_format}"
+
+
+def _posts(*image_prompts: str) -> list[SimpleNamespace]:
+    return [SimpleNamespace(image_prompt=image_prompt) for image_prompt in image_prompts]
+
+
+async def _run_images_job(instagram_prompts: list[str], linkedin_prompts: list[str]) -> PlatformImages:
+    done = asyncio.get_running_loop().create_future()
+    scheduler = MediaScheduler([PLATFORM_IMAGES_JOB], on_done=done.set_result)
+    scheduler.add_result(StreamedResult(name=StreamedResultName.INSTAGRAM_POSTS, content=_posts(*instagram_prompts)))
+    scheduler.add_result(StreamedResult(name=StreamedResultName.LINKEDIN_POSTS, content=_posts(*linkedin_prompts)))
+    media_result: MediaResult = await done
+    assert media_result.error is None
+    return media_result.content
+
+
+class TestMediaScheduler:
+    @pytest.fixture(autouse=True)
+    def fake_renders(self, mocker: MockerFixture):
+        mocker.patch.object(image_derivation, "render_images", side_effect=_fake_render_images)
+        mocker.patch.object(image_derivation, "derive_crop", side_effect=_fake_derive_crop)
+        mocker.patch.object(image_derivation, "get_prompt_index", return_value=SimpleNamespace(threshold=0.85))
+
+    @pytest.mark.asyncio
+    async def test_linkedin_renders_its_own_concept(self):
+        platform_images = await _run_images_job(["cafe", "barista", "latte"], ["boardroom", "chart"])
+
+        assert [crops[CropFormat.SQUARE] for crops in platform_images.instagram] == ["1:1|cafe|square", "1:1|barista|square"]
+        assert [crops[CropFormat.LANDSCAPE] for crops in platform_images.linkedin] == ["16:9|boardroom|landscape"]
+        assert platform_images.twitter == "1:1|cafe|twitter"
+        assert platform_images.nb_master_renders == 3
+        assert platform_images.nb_derived_crops == 6
+
+    @pytest.mark.asyncio
+    async def test_near_duplicate_linkedin_concept_is_cut_from_instagram_master(self):
+        instagram_prompt = ImagePromptTestCases.BASE_PROMPT
+        linkedin_prompt = ImagePromptTestCases.SIMILAR_PROMPT
+
+        platform_images = await _run_images_job(["cafe", instagram_prompt], [linkedin_prompt])
+
+        assert platform_images.linkedin == [
+            {
+                CropFormat.LANDSCAPE: f"1:1|{instagram_prompt}|landscape",
+                CropFormat.TWITTER: f"1:1|{instagram_prompt}|twitter",
+            }
+        ]
+        assert platform_images.nb_master_renders == 2
+        assert platform_images.nb_derived_crops == 5
+
+    @pytest.mark.asyncio
+    async def test_twitter_falls_back_to_linkedin_concept(self):
+        platform_images = await _run_images_job(["none", ""], ["boardroom"])
+
+        assert platform_images.instagram == []
+        assert platform_images.twitter == "16:9|boardroom|twitter"
@@ -0,0 +1,166 @@
+import asyncio
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+
+from social_content import model_router
+from social_content.model_router import ModelRouter, RoutingMode, execute_routed_pipeline
+from tests.unit.test_data import ModelRouterTestCases
+
+
+@dataclass(frozen=True)
+class FakeModelSpec:
+    backend_name: str
+    name: str
+
+
+class FakeLLMWorker:
+    def __init__(self, backend: str) -> None:
+        self.backend = backend
+
+    async def gen_text(self, llm_job: Any) -> str:
+        await asyncio.sleep(0.01)
+        return self.backend
+
+
+class FakeInferenceManager:
+    """Like Pipelex's: one worker per model, built from the deck on first use and returned as is."""
+
+    def __init__(self, model_deck: SimpleNamespace) -> None:
+        self.model_deck = model_deck
+        self.llm_workers: dict[str, Any] = {}
+
+    def get_llm_worker(self, llm_handle: str) -> Any:
+        if llm_worker := self.llm_workers.get(llm_handle):
+            return llm_worker
+        llm_worker = FakeLLMWorker(self.model_deck.inference_models[llm_handle].backend_name)
+        self.llm_workers[llm_handle] = llm_worker
+        return llm_worker
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _make_router(clock: FakeClock, explore_rate: float = 0.0, seed: int | None = 0) -> ModelRouter:
+    return ModelRouter(
+        min_samples=ModelRouterTestCases.MIN_SAMPLES,
+        explore_rate=explore_rate,
+        max_error_rate=0.5,
+        window_seconds=ModelRouterTestCases.WINDOW_SECONDS,
+        clock=clock,
+        seed=seed,
+    )
+
+
+def _record_calls(router: ModelRouter, backend: str, seconds: float, is_error: bool = False) -> None:
+    for _ in range(ModelRouterTestCases.MIN_SAMPLES):
+        router.record(backend, ModelRouterTestCases.MODEL, seconds, is_error=is_error)
+
+
+class TestModelRouter:
+    def test_fastest_healthy_backend_wins(self):
+        router = _make_router(FakeClock())
+        primary_backend, other_backend = ModelRouterTestCases.BACKENDS
+        _record_calls(router, primary_backend, seconds=3.0)
+        _record_calls(router, other_backend, seconds=1.0)
+        assert router.choose_backend(ModelRouterTestCases.MODEL, ModelRouterTestCases.BACKENDS) == other_backend
+
+    def test_recovered_backend_wins_traffic_back(self):
+        clock = FakeClock()
+        router = _make_router(clock)
+        primary_backend, other_backend = ModelRouterTestCases.BACKENDS
+        _record_calls(router, primary_backend, seconds=0.5, is_error=True)
+        _record_calls(router, other_backend, seconds=2.0)
+        assert router.choose_backend(ModelRouterTestCases.MODEL, ModelRouterTestCases.BACKENDS) == other_backend
+
+        # The errors age out of the window, so the primary backend is explored again, then preferred once fast
+        clock.now += ModelRouterTestCases.WINDOW_SECONDS + 1
+        _record_calls(router, other_backend, seconds=2.0)
+        assert router.health(primary_backend, ModelRouterTestCases.MODEL).nb_samples == 0
+        _record_calls(router, primary_backend, seconds=0.5)
+        assert router.choose_backend(ModelRouterTestCases.MODEL, ModelRouterTestCases.BACKENDS) == primary_backend
+
+    def test_stale_median_expires(self):
+        clock = FakeClock()
+        router = _make_router(clock)
+        primary_backend, other_backend = ModelRouterTestCases.BACKENDS
+        _record_calls(router, primary_backend, seconds=0.5)
+        _record_calls(router, other_backend, seconds=1.0)
+        clock.now += ModelRouterTestCases.WINDOW_SECONDS / 2
+        # The primary backend slowed down: its fresh calls replace the fast median once the old ones expire
+        _record_calls(router, primary_backend, seconds=5.0)
+        _record_calls(router, other_backend, seconds=1.0)
+        clock.now += ModelRouterTestCases.WINDOW_SECONDS / 2 + 1
+        assert router.health(primary_backend, ModelRouterTestCases.MODEL).median_seconds == 5.0
+        assert router.choose_backend(ModelRouterTestCases.MODEL, ModelRouterTestCases.BACKENDS) == other_backend
+
+    def test_failing_backend_is_probed_at_explore_rate(self):
+        router = _make_router(FakeClock(), explore_rate=0.2, seed=42)
+        primary_backend, other_backend = ModelRouterTestCases.BACKENDS
+        _record_calls(router, primary_backend, seconds=0.5, is_error=True)
+        _record_calls(router, other_backend, seconds=2.0)
+        nb_choices = 2000
+        nb_probes = sum(
+            router.choose_backend(ModelRouterTestCases.MODEL, ModelRouterTestCases.BACKENDS) == primary_backend for _ in range(nb_choices)
+        )
+        assert 0.15 < nb_probes / nb_choices < 0.25
+
+    def test_no_healthy_backend_tries_unexplored_first(self):
+        router = _make_router(FakeClock())
+        primary_backend, other_backend = ModelRouterTestCases.BACKENDS
+        _record_calls(router, primary_backend, seconds=0.5, is_error=True)
+        assert router.choose_backend(ModelRouterTestCases.MODEL, ModelRouterTestCases.BACKENDS) == other_backend
+
+    @pytest.mark.asyncio
+    async def test_routes_every_model_of_a_sequence_for_its_own_run_only(self, mocker: MockerFixture):
+        primary_backend, other_backend = ModelRouterTestCases.BACKENDS
+        model_deck = SimpleNamespace(inference_models={ModelRouterTestCases.MODEL: FakeModelSpec(primary_backend, ModelRouterTestCases.MODEL)})
+        models_manager = mocker.MagicMock()
+        models_manager.model_deck = model_deck
+        models_manager.inference_backend_library.get_all_models_and_possible_backends.return_value = {
+            ModelRouterTestCases.MODEL: ModelRouterTestCases.BACKENDS
+        }
+        models_manager.get_required_inference_backend.side_effect = lambda backend: SimpleNamespace(
+            get_model_spec=lambda model: FakeModelSpec(backend, model)
+        )
+        inference_manager = FakeInferenceManager(model_deck)
+        mocker.patch.object(model_router, "get_models_manager", return_value=models_manager)
+        mocker.patch.object(model_router, "get_inference_manager", return_value=inference_manager)
+        mocker.patch.object(model_router, "_model_specs", {})
+        mocker.patch.object(model_router, "load_pipe_definitions", return_value=ModelRouterTestCases.pipe_definitions())
+        router = _make_router(FakeClock())
+        mocker.patch.object(router, "choose_backend", side_effect=[other_backend, primary_backend])
+        mocker.patch.object(model_router, "get_model_router", return_value=router)
+
+        async def fake_execute_pipeline(pipe_code: str, inputs: dict[str, Any]) -> list[str]:
+            # One LLM call per leaf pipe
+            served_backends: list[str] = []
+            for _ in range(ModelRouterTestCases.NB_LEAF_PIPES):
+                llm_worker = inference_manager.get_llm_worker(llm_handle=ModelRouterTestCases.MODEL)
+                served_backends.append(await llm_worker.gen_text(llm_job=None))
+            return served_backends
+
+        mocker.patch.object(model_router, "execute_pipeline", side_effect=fake_execute_pipeline)
+
+        served_backends = await asyncio.gather(
+            execute_routed_pipeline(ModelRouterTestCases.SEQUENCE_PIPE, inputs={}, routing_mode=RoutingMode.LATENCY),
+            execute_routed_pipeline(ModelRouterTestCases.SEQUENCE_PIPE, inputs={}, routing_mode=RoutingMode.LATENCY),
+        )
+
+        assert served_backends == [[other_backend] * ModelRouterTestCases.NB_LEAF_PIPES, [primary_backend] * ModelRouterTestCases.NB_LEAF_PIPES]
+        assert model_deck.inference_models.get(ModelRouterTestCases.MODEL).backend_name == primary_backend
+        for backend in ModelRouterTestCases.BACKENDS:
+            assert router.health(backend, ModelRouterTestCases.MODEL).nb_samples == ModelRouterTestCases.NB_LEAF_PIPES
+
+    def test_pipe_models_walks_the_pipe_tree(self, mocker: MockerFixture):
+        mocker.patch.object(model_router, "load_pipe_definitions", return_value=ModelRouterTestCases.pipe_definitions())
+        assert model_router.pipe_models(ModelRouterTestCases.SEQUENCE_PIPE) == [ModelRouterTestCases.MODEL]
+        assert model_router.pipe_models("combine") == []
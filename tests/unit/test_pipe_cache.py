@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockerFixture
+
+from social_content import pipe_cache
+from social_content.pipe_cache import PipeCache, make_pipe_cache_key, run_pipe_with_cache, uncacheable_pipes
+from social_media_analysis.runner import AnalyticsMode
+from tests.unit.test_data import PostMetricsTestCases
+
+
+class TestPipeCache:
+    def test_key_ignores_json_formatting(self):
+        compact_inputs = {"all_posts": json.dumps(PostMetricsTestCases.POSTS, separators=(",", ":"))}
+        indented_inputs = {"all_posts": json.dumps(PostMetricsTestCases.POSTS, indent=2)}
+        assert make_pipe_cache_key("campaign_analytics", compact_inputs) == make_pipe_cache_key("campaign_analytics", indented_inputs)
+
+    def test_key_changes_with_data(self):
+        changed_posts = [{**PostMetricsTestCases.POSTS[0], "likes": 81}, *PostMetricsTestCases.POSTS[1:]]
+        assert make_pipe_cache_key("campaign_analytics", {"all_posts": json.dumps(PostMetricsTestCases.POSTS)}) != make_pipe_cache_key(
+            "campaign_analytics", {"all_posts": json.dumps(changed_posts)}
+        )
+
+    @pytest.mark.asyncio
+    async def test_opted_in_pipe_runs_once(self, mocker: MockerFixture, tmp_path: Path):
+        mocker.patch.object(pipe_cache, "LLM_CACHE_PIPES", frozenset({"analyze_metrics"}))
+        mocker.patch.object(pipe_cache, "get_pipe_cache", return_value=PipeCache(db_path=tmp_path / "pipes.sqlite"))
+        pipe_output = SimpleNamespace(main_stuff=SimpleNamespace(content=SimpleNamespace(smart_dump=lambda: {"summary_md": "Done"})))
+        execute_mock = mocker.patch.object(pipe_cache, "execute_routed_pipeline", return_value=pipe_output)
+        inputs = {"post": {"concept": "social_media_analysis.PostMetrics", "content": PostMetricsTestCases.POSTS[0]}}
+
+        first_output = await run_pipe_with_cache("analyze_metrics", inputs)
+        second_output = await run_pipe_with_cache("analyze_metrics", inputs)
+        await run_pipe_with_cache("analyze_metrics", inputs, use_cache=False)
+
+        assert first_output == second_output == {"summary_md": "Done"}
+        assert execute_mock.call_count == 2
+
+    def test_every_analytics_pipe_is_cacheable(self):
+        analytics_pipes = {pipe_code for mode in AnalyticsMode for pipe_code in (mode.value, mode.metrics_pipe_code)}
+        assert uncacheable_pipes(frozenset(analytics_pipes)) == []
+
+    def test_steps_of_a_pipe_are_reported_uncacheable(self):
+        assert uncacheable_pipes(frozenset({"analyze_metrics", "diagnose_performance"})) == ["diagnose_performance"]
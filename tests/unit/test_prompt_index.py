@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from social_content.media_cache import MediaCache
+from social_content.prompt_index import PromptIndex, jaccard, minhash_signature, shingles
+from tests.unit.test_data import ImagePromptTestCases
+
+
+def _render(media_cache: MediaCache, prompt: str) -> str:
+    cache_key = MediaCache.make_key("test/image-model", {"prompt": prompt})
+    media_cache.put(cache_key, prompt.encode("utf-8"), suffix=".png")
+    return cache_key
+
+
+class TestPromptIndex:
+    def test_shingles_ignore_case_and_punctuation(self):
+        assert shingles("A red, RED car!") == {"a red", "red red", "red car"}
+        assert shingles("Sunset") == {"sunset"}
+        assert shingles("!!") == set()
+
+    def test_minhash_tracks_jaccard(self):
+        base_shingles = shingles(ImagePromptTestCases.BASE_PROMPT)
+        similar_shingles = shingles(ImagePromptTestCases.SIMILAR_PROMPT)
+        base_signature = minhash_signature(base_shingles)
+        similar_signature = minhash_signature(similar_shingles)
+        estimated_similarity = sum(a == b for a, b in zip(base_signature, similar_signature)) / len(base_signature)
+        assert abs(estimated_similarity - jaccard(base_shingles, similar_shingles)) < 0.2
+        assert minhash_signature(base_shingles) == base_signature
+
+    def test_similar_prompt_reuses_render(self, prompt_index: PromptIndex, media_cache: MediaCache):
+        cache_key = _render(media_cache, ImagePromptTestCases.BASE_PROMPT)
+        prompt_index.add(ImagePromptTestCases.SCOPE, ImagePromptTestCases.BASE_PROMPT, cache_key)
+
+        reuse = prompt_index.find_reusable(ImagePromptTestCases.SCOPE, ImagePromptTestCases.SIMILAR_PROMPT, media_cache=media_cache)
+
+        assert reuse is not None
+        assert reuse.matched_prompt == ImagePromptTestCases.BASE_PROMPT
+        assert reuse.similarity >= prompt_index.threshold
+        assert reuse.path == media_cache.get(cache_key)
+        assert prompt_index.reuses == [reuse]
+
+    def test_different_prompt_or_scope_is_rendered(self, prompt_index: PromptIndex, media_cache: MediaCache):
+        cache_key = _render(media_cache, ImagePromptTestCases.BASE_PROMPT)
+        prompt_index.add(ImagePromptTestCases.SCOPE, ImagePromptTestCases.BASE_PROMPT, cache_key)
+
+        assert prompt_index.find_reusable(ImagePromptTestCases.SCOPE, ImagePromptTestCases.DIFFERENT_PROMPT, media_cache=media_cache) is None
+        assert prompt_index.find_reusable("test/image-model|16:9|", ImagePromptTestCases.SIMILAR_PROMPT, media_cache=media_cache) is None
+
+    def test_evicted_render_is_skipped(self, prompt_index: PromptIndex, media_cache: MediaCache):
+        cache_key = _render(media_cache, ImagePromptTestCases.BASE_PROMPT)
+        prompt_index.add(ImagePromptTestCases.SCOPE, ImagePromptTestCases.BASE_PROMPT, cache_key)
+        Path(media_cache.get(cache_key)).unlink()
+
+        assert prompt_index.find_reusable(ImagePromptTestCases.SCOPE, ImagePromptTestCases.SIMILAR_PROMPT, media_cache=media_cache) is None
+
+    def test_threshold_above_one_disables_reuse(self, tmp_path: Path, media_cache: MediaCache):
+        prompt_index = PromptIndex(db_path=tmp_path / "disabled.sqlite", threshold=1.01)
+        cache_key = _render(media_cache, ImagePromptTestCases.BASE_PROMPT)
+        prompt_index.add(ImagePromptTestCases.SCOPE, ImagePromptTestCases.BASE_PROMPT, cache_key)
+
+        assert prompt_index.find_reusable(ImagePromptTestCases.SCOPE, ImagePromptTestCases.BASE_PROMPT, media_cache=media_cache) is None
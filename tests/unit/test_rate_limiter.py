@@ -0,0 +1,66 @@
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+from social_content.rate_limiter import RateLimit, RateLimiter
+from social_content.resilience import CallCancelledError
+
+BUCKET = "test/model"
+
+
+class TestRateLimiter:
+    @pytest.fixture
+    def rate_limiter(self, tmp_path: Path) -> RateLimiter:
+        # 2 tokens per second, burst of 2
+        return RateLimiter(db_path=tmp_path / "rate_limits.sqlite", limits={BUCKET: RateLimit(per_minute=120, burst=2)})
+
+    def test_burst_then_sustained_rate(self, rate_limiter: RateLimiter):
+        """The burst is granted at once, the next token after 1 / rate seconds."""
+        wait_seconds = [rate_limiter.acquire(BUCKET) for _ in range(3)]
+
+        assert wait_seconds[0] < 0.1
+        assert wait_seconds[1] < 0.1
+        assert 0.3 < wait_seconds[2] < 1.0
+        stats = rate_limiter.stats(BUCKET)
+        assert (stats.acquired, stats.waited, stats.queue_depth) == (3, 1, 0)
+
+    def test_cancel_leaves_the_queue(self, rate_limiter: RateLimiter):
+        rate_limiter.acquire(BUCKET)
+        rate_limiter.acquire(BUCKET)
+        cancel_event = threading.Event()
+        cancel_event.set()
+
+        with pytest.raises(CallCancelledError):
+            rate_limiter.acquire(BUCKET, cancel_event=cancel_event)
+        assert rate_limiter.queue_depth(BUCKET) == 0
+
+    def test_expired_ticket_is_queued_again(self, rate_limiter: RateLimiter):
+        """A waiter whose ticket was swept while it stalled still gets a token instead of polling forever."""
+        rate_limiter.acquire(BUCKET)
+        rate_limiter.acquire(BUCKET)
+        cancel_event = threading.Event()
+        outcome: dict[str, float | BaseException] = {}
+
+        def wait_for_token() -> None:
+            try:
+                outcome["wait_seconds"] = rate_limiter.acquire(BUCKET, cancel_event=cancel_event)
+            except BaseException as exc:
+                outcome["error"] = exc
+
+        waiter = threading.Thread(target=wait_for_token)
+        waiter.start()
+        time.sleep(0.1)
+        # Another process sweeps the waiter as stale, as after a long pause of its caller
+        with closing(sqlite3.connect(rate_limiter.db_path, timeout=30)) as conn, conn:
+            conn.execute("DELETE FROM waiters")
+        waiter.join(timeout=3)
+        cancel_event.set()
+        waiter.join()
+
+        assert "error" not in outcome
+        assert outcome["wait_seconds"] < 3
+        assert rate_limiter.queue_depth(BUCKET) == 0
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from social_content.media_backend import ImageFormat
+from social_content.media_cache import MediaCache
+from social_content.prompt_index import PromptIndex, jaccard, shingles
+from social_content.replicate_functions import INSTAGRAM_STYLE_VARIATIONS, ImageGenerationMode, render_images, render_style_variations, style_prompt
+from tests.unit.conftest import FakeImageBackend
+from tests.unit.test_data import ImagePromptTestCases
+
+
+@pytest.mark.asyncio(loop_scope="class")
+class TestRenderStyleVariations:
+    @pytest.fixture(autouse=True)
+    def patch_media(self, mocker: MockerFixture, media_cache: MediaCache, prompt_index: PromptIndex, fake_image_backend: FakeImageBackend):
+        mocker.patch("social_content.replicate_functions.get_media_cache", return_value=media_cache)
+        mocker.patch("social_content.replicate_functions.get_prompt_index", return_value=prompt_index)
+        mocker.patch("social_content.replicate_functions.get_media_backend", return_value=fake_image_backend)
+
+    @pytest.mark.parametrize("max_concurrent_predictions", ImagePromptTestCases.CONCURRENCIES)
+    async def test_variations_are_never_reused(
+        self,
+        mocker: MockerFixture,
+        prompt_index: PromptIndex,
+        fake_image_backend: FakeImageBackend,
+        max_concurrent_predictions: int,
+    ):
+        """Style variations close enough to the base prompt to pass the threshold still get their own render."""
+        mocker.patch("social_content.replicate_functions.MAX_CONCURRENT_PREDICTIONS", max_concurrent_predictions)
+        base_prompt = ImagePromptTestCases.BASE_PROMPT
+        styled_prompt = style_prompt(base_prompt, INSTAGRAM_STYLE_VARIATIONS[1])
+        assert jaccard(shingles(base_prompt), shingles(styled_prompt)) >= prompt_index.threshold
+
+        # The base prompt is rendered and indexed first, as by an earlier run
+        await render_images([base_prompt], ImageFormat.SQUARE)
+        images = await render_style_variations(base_prompt, INSTAGRAM_STYLE_VARIATIONS, ImageFormat.SQUARE, mode=ImageGenerationMode.FAN_OUT)
+
+        assert [image.source_prompt for image in images if image is not None] == [
+            style_prompt(base_prompt, style) for style in INSTAGRAM_STYLE_VARIATIONS
+        ]
+        assert len({image.url for image in images if image is not None}) == len(INSTAGRAM_STYLE_VARIATIONS)
+        assert all(image is not None and Path(image.local_path).is_file() for image in images)
+        assert prompt_index.reuses == []
+        # Only the plain variation is served from the media cache, by its identical inputs
+        assert len(fake_image_backend.predicted_prompts) == len(INSTAGRAM_STYLE_VARIATIONS)
+
+    async def test_similar_prompt_of_same_variation_is_reused(self, prompt_index: PromptIndex, fake_image_backend: FakeImageBackend):
+        """A near-duplicate prompt in the same variation still reuses the earlier render."""
+        style = INSTAGRAM_STYLE_VARIATIONS[1]
+        await render_style_variations(ImagePromptTestCases.BASE_PROMPT, [style], ImageFormat.SQUARE, mode=ImageGenerationMode.FAN_OUT)
+        images = await render_style_variations(ImagePromptTestCases.SIMILAR_PROMPT, [style], ImageFormat.SQUARE, mode=ImageGenerationMode.FAN_OUT)
+
+        assert images[0] is not None
+        assert images[0].source_prompt == style_prompt(ImagePromptTestCases.BASE_PROMPT, style)
+        assert len(prompt_index.reuses) == 1
+        assert len(fake_image_backend.predicted_prompts) == 1
@@ -0,0 +1,53 @@
+from social_content.research_digest import RESEARCH_DIGEST_MAX_COMPETITORS, compact_research, estimate_tokens
+from social_content.social_content_struct import CompetitorInsight, MarketResearch
+from tests.unit.test_data import ResearchDigestTestCases
+
+
+def _verbose_research() -> MarketResearch:
+    return MarketResearch(
+        insights=[
+            CompetitorInsight(
+                competitor_name=competitor_name,
+                content_style=ResearchDigestTestCases.CONTENT_STYLE,
+                engagement_tactics=ResearchDigestTestCases.ENGAGEMENT_TACTICS,
+            )
+            for competitor_name in ResearchDigestTestCases.COMPETITOR_NAMES
+        ],
+        key_trends=ResearchDigestTestCases.KEY_TRENDS,
+        recommendations=ResearchDigestTestCases.RECOMMENDATIONS,
+    )
+
+
+class TestResearchDigest:
+    def test_digest_fits_token_budget(self):
+        research = _verbose_research()
+        digest = compact_research(research, max_tokens=ResearchDigestTestCases.MAX_TOKENS)
+
+        assert digest.tokens_after <= ResearchDigestTestCases.MAX_TOKENS
+        assert digest.tokens_after == estimate_tokens(digest.research.rendered_plain())
+        assert digest.tokens_before == estimate_tokens(research.rendered_plain())
+        assert digest.saved_ratio > 0.5
+        assert len(digest.research.insights) == RESEARCH_DIGEST_MAX_COMPETITORS
+
+    def test_digest_is_deterministic(self):
+        first_digest = compact_research(_verbose_research(), max_tokens=ResearchDigestTestCases.MAX_TOKENS)
+        second_digest = compact_research(_verbose_research(), max_tokens=ResearchDigestTestCases.MAX_TOKENS)
+        assert first_digest == second_digest
+
+    def test_repeated_sentences_are_kept_once(self):
+        digest = compact_research(_verbose_research(), max_tokens=10_000)
+        rendered_fields = [digest.research.key_trends, digest.research.recommendations]
+        for insight in digest.research.insights:
+            rendered_fields.extend((insight.content_style, insight.engagement_tactics))
+        assert sum(field.count(ResearchDigestTestCases.REPEATED_SENTENCE) for field in rendered_fields) == 1
+        assert digest.research.key_trends.startswith(ResearchDigestTestCases.REPEATED_SENTENCE)
+
+    def test_compact_research_is_kept_as_is(self):
+        research = MarketResearch(
+            insights=[CompetitorInsight(competitor_name="Solo", content_style="Memes.", engagement_tactics="Polls.")],
+            key_trends="Video.",
+            recommendations="Post daily.",
+        )
+        digest = compact_research(research)
+        assert digest.research == research
+        assert digest.saved_ratio == 0.0
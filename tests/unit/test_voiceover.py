@@ -0,0 +1,66 @@
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+
+from social_content import voiceover
+from social_content.media_cache import MediaCache
+from social_content.voiceover import split_sentences, strip_mp3_segment
+from tests.unit.test_data import VoiceoverTestCases
+
+
+def _id3v2_tag(title: bytes) -> bytes:
+    frame = b"TIT2" + len(title).to_bytes(4, "big") + b"\x00\x00" + title
+    return b"ID3\x04\x00\x00" + bytes([0, 0, len(frame) >> 7, len(frame) & 0x7F]) + frame
+
+
+def _frame(payload: bytes) -> bytes:
+    return VoiceoverTestCases.FRAME_HEADER + payload.ljust(VoiceoverTestCases.FRAME_SIZE - 4, b"\x00")
+
+
+def _xing_frame() -> bytes:
+    side_info = b"\x00" * (VoiceoverTestCases.XING_OFFSET - 4)
+    return _frame(side_info + b"Info" + b"\x00\x00\x00\x0f")
+
+
+def _segment(label: bytes, nb_frames: int = 3) -> bytes:
+    audio_frames = b"".join(_frame(label + bytes([index_frame])) for index_frame in range(nb_frames))
+    id3v1_tag = b"TAG" + label.ljust(125, b"\x00")
+    return _id3v2_tag(label) + _xing_frame() + audio_frames + id3v1_tag
+
+
+class TestVoiceover:
+    def test_split_sentences_skips_unspeakable(self):
+        assert split_sentences(VoiceoverTestCases.SCRIPT) == VoiceoverTestCases.SPOKEN_SENTENCES
+
+    def test_strip_keeps_first_id3v2_and_last_id3v1(self):
+        segment = _segment(b"one")
+        first_segment = strip_mp3_segment(segment, is_first=True, is_last=False)
+        middle_segment = strip_mp3_segment(segment, is_first=False, is_last=False)
+        last_segment = strip_mp3_segment(segment, is_first=False, is_last=True)
+
+        assert first_segment.startswith(b"ID3")
+        assert middle_segment.startswith(VoiceoverTestCases.FRAME_HEADER)
+        assert len(middle_segment) == 3 * VoiceoverTestCases.FRAME_SIZE
+        assert last_segment[-128:-125] == b"TAG"
+        for stripped_segment in (first_segment, middle_segment, last_segment):
+            assert b"Info" not in stripped_segment
+
+    def test_strip_leaves_untagged_audio_alone(self):
+        audio_frames = _frame(b"a") + _frame(b"b")
+        assert strip_mp3_segment(audio_frames, is_first=False, is_last=False) == audio_frames
+
+    def test_join_segments_leaves_no_tag_between_frames(self, mocker: MockerFixture, media_cache: MediaCache, tmp_path: Path):
+        mocker.patch.object(voiceover, "get_media_cache", return_value=media_cache)
+        segment_paths = []
+        for label in (b"one", b"two", b"three"):
+            segment_path = tmp_path / f"{label.decode()}.mp3"
+            segment_path.write_bytes(_segment(label))
+            segment_paths.append(segment_path)
+
+        joined = voiceover._join_segments(segment_paths).read_bytes()
+
+        assert joined.count(b"ID3") == 1
+        assert joined.count(b"TAG") == 1
+        assert b"Info" not in joined
+        id3v2_size = len(_id3v2_tag(b"one"))
+        assert len(joined) == id3v2_size + 9 * VoiceoverTestCases.FRAME_SIZE + 128